@@ -2,16 +2,45 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
 
-from .const import CONF_SYNC_INTERVAL, DEFAULT_SYNC_INTERVAL, DOMAIN
+from .aggregate import parse_room_groups
+from .capture import loex_capture
+from .const import (
+    CAPTURE_FILENAME,
+    CONF_CAPTURE,
+    CONF_HISTORY,
+    CONF_HISTORY_MAX_SIZE,
+    CONF_ROOM_GROUPS,
+    CONF_SYNC_INTERVAL,
+    CONF_TRACE_EXPORT,
+    DEFAULT_CAPTURE,
+    DEFAULT_HISTORY,
+    DEFAULT_HISTORY_MAX_SIZE,
+    DEFAULT_ROOM_GROUPS,
+    DEFAULT_SYNC_INTERVAL,
+    DEFAULT_TRACE_EXPORT,
+    DEVICE_NAME,
+    DOMAIN,
+    HISTORY_DIRNAME,
+    TRACE_FILENAME,
+)
 from .coordinator import loex_coordinator
-from .loex_api import loex_api
+from .history import loex_history
+from .loex_api import loex_api, parse_device_ids
+from .scheduler import async_get_scheduler
+from .services import async_setup_services, async_unload_services
+from .websocket_api import async_close_subscriptions, async_setup_websocket
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
 
-PLATFORMS: list[Platform] = [Platform.CLIMATE, Platform.SENSOR]
+PLATFORMS: list[Platform] = [Platform.BINARY_SENSOR, Platform.CLIMATE, Platform.SENSOR]
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -20,23 +49,76 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if hass.data.get(DOMAIN) is None:
         hass.data.setdefault(DOMAIN, {})
 
+    device_ids = parse_device_ids(entry.data["deviceId"])
+
     # Create API instance
     loex = loex_api()
-    # Validate the API connection (and authentication)
-    await hass.async_add_executor_job(
-        loex.authenticate,
-        entry.data["username"],
-        entry.data["password"],
-        entry.data["deviceId"],
-        entry.data["plant"],
+    # Validate the API connection (and authentication), the capture file opens
+    # meanwhile
+    await asyncio.gather(
+        hass.async_add_executor_job(
+            loex.authenticate,
+            entry.data["username"],
+            entry.data["password"],
+            device_ids[0],
+            entry.data["plant"],
+        ),
+        async_update_capture(hass, entry, loex, device_ids[0]),
     )
 
     sync_interval = entry.options.get(CONF_SYNC_INTERVAL, DEFAULT_SYNC_INTERVAL)
 
     coordinator = loex_coordinator(hass, api=loex, update_interval=sync_interval)
+    # Keep the data the coordinator was built from, options changes are applied in place
+    coordinator.entry_data = dict(entry.data)
+    # The other devices share the session of the first one, and are refreshed in
+    # its cycle
+    apis = [loex_api(session=loex.session) for _ in device_ids[1:]]
+    authenticated = await asyncio.gather(
+        *(
+            hass.async_add_executor_job(
+                api.authenticate,
+                entry.data["username"],
+                entry.data["password"],
+                device_id,
+                entry.data["plant"],
+            )
+            for api, device_id in zip(apis, device_ids[1:])
+        ),
+        return_exceptions=True,
+    )
+
+    for api, device_id, logged_in in zip(apis, device_ids[1:], authenticated):
+        if logged_in is not True:
+            # The device stays unavailable, its polls log in again
+            _LOGGER.warning("Login to device %s failed, retrying on poll", device_id)
+
+        device = loex_coordinator(hass, api=api, update_interval=sync_interval)
+        device.device_key = f"{loex.host}-{device_id}"
+        device.device_name = f"{DEVICE_NAME} {device_id}"
+        coordinator.devices.append(device)
+
+    for device in coordinator.entry_devices:
+        device.async_apply_options(entry.options)
+    async_update_tracing(hass, entry, coordinator)
+    await asyncio.gather(
+        *(
+            async_update_capture(hass, entry, device.api, device.api.device_id)
+            for device in coordinator.devices
+        ),
+        async_update_history(hass, entry, coordinator),
+        *(device.duty_cycle.async_load() for device in coordinator.entry_devices),
+        *(device.outbox.async_load() for device in coordinator.entry_devices),
+        async_load_statistics(coordinator),
+    )
     await coordinator.async_refresh()
 
+    # The entities are built from the first snapshot of their device, those of
+    # the other devices failing it follow their first good poll
     if not coordinator.last_update_success:
+        for device in coordinator.entry_devices:
+            device.api.release()
+        await async_close_files(hass, coordinator)
         raise ConfigEntryNotReady
 
     # Store an API object for your platforms to access
@@ -44,7 +126,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    entry.add_update_listener(async_reload_entry)
+    await async_setup_services(hass)
+    async_setup_websocket(hass)
+
+    # Poll in a phase staggered with the other plants of the host
+    entry.async_on_unload(async_get_scheduler(hass).async_add(coordinator))
+
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     return True
 
@@ -55,12 +143,146 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unloaded = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
     if unloaded:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        # The dashboards subscribe again to the reloaded entry
+        async_close_subscriptions(hass, entry.entry_id)
+
+        for device in coordinator.entry_devices:
+            # Send the values of the controls still settling
+            await device.debouncer.async_flush()
+
+            if device.statistics is not None:
+                await device.statistics.async_save()
+
+            await device.duty_cycle.async_save()
+            await device.outbox.async_save()
+            device.api.release()
+            await hass.async_add_executor_job(device.api.hedge.close)
+
+        await async_close_files(hass, coordinator)
+
+        if not hass.data[DOMAIN]:
+            await async_unload_services(hass)
 
     return unloaded
 
 
-async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload entries."""
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply entry changes, reloading only when the entities change.
+
+    The device identity and the room groups, which have their own sensors,
+    need a reload.
+    """
+    coordinator: loex_coordinator = hass.data[DOMAIN][entry.entry_id]
+    room_groups = parse_room_groups(
+        entry.options.get(CONF_ROOM_GROUPS, DEFAULT_ROOM_GROUPS)
+    )
+
+    if (
+        dict(entry.data) != coordinator.entry_data
+        or room_groups != coordinator.room_groups
+    ):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    for device in coordinator.entry_devices:
+        device.async_apply_options(entry.options)
+    async_update_tracing(hass, entry, coordinator)
+    await asyncio.gather(
+        *(
+            async_update_capture(hass, entry, device.api, device.api.device_id)
+            for device in coordinator.entry_devices
+        ),
+        async_update_history(hass, entry, coordinator),
+        async_load_statistics(coordinator),
+    )
+
+
+async def async_load_statistics(coordinator: loex_coordinator) -> None:
+    """Restore the open hourly buckets of the devices importing statistics."""
+    await asyncio.gather(
+        *(
+            device.statistics.async_load()
+            for device in coordinator.entry_devices
+            if device.statistics is not None
+        )
+    )
+
+
+def device_file_id(entry: ConfigEntry, device_id: str) -> str:
+    """Return the id in the file names of a device of an entry.
+
+    The first device keeps the files of a single device entry.
+    """
+    if device_id == parse_device_ids(entry.data["deviceId"])[0]:
+        return entry.entry_id
+
+    return f"{entry.entry_id}_{device_id}"
+
+
+async def async_close_files(
+    hass: HomeAssistant, coordinator: loex_coordinator
+) -> None:
+    """Close the capture files and the poll logs of the devices of an entry."""
+    for device in coordinator.entry_devices:
+        if device.api.capture is not None:
+            await hass.async_add_executor_job(device.api.capture.close)
+        if device.history is not None:
+            await hass.async_add_executor_job(device.history.close)
+
+
+@callback
+def async_update_tracing(
+    hass: HomeAssistant, entry: ConfigEntry, coordinator: loex_coordinator
+) -> None:
+    """Start or stop exporting the traces of the polls and commands."""
+    enabled = entry.options.get(CONF_TRACE_EXPORT, DEFAULT_TRACE_EXPORT)
+
+    for device in coordinator.entry_devices:
+        if enabled:
+            device.tracer.export_path = hass.config.path(
+                TRACE_FILENAME.format(device_file_id(entry, device.api.device_id))
+            )
+        else:
+            device.tracer.export_path = None
+
+
+async def async_update_capture(
+    hass: HomeAssistant, entry: ConfigEntry, loex: loex_api, device_id: str
+) -> None:
+    """Start or stop recording the raw cloud payloads for offline replay."""
+    enabled = entry.options.get(CONF_CAPTURE, DEFAULT_CAPTURE)
+
+    if enabled and loex.capture is None:
+        loex.capture = await hass.async_add_executor_job(
+            loex_capture,
+            hass.config.path(CAPTURE_FILENAME.format(device_file_id(entry, device_id))),
+        )
+    elif not enabled and loex.capture is not None:
+        capture, loex.capture = loex.capture, None
+        await hass.async_add_executor_job(capture.close)
+
+
+async def async_update_history(
+    hass: HomeAssistant, entry: ConfigEntry, coordinator: loex_coordinator
+) -> None:
+    """Start or stop logging every snapshot to disk for offline analysis."""
+    enabled = entry.options.get(CONF_HISTORY, DEFAULT_HISTORY)
+    max_bytes = (
+        entry.options.get(CONF_HISTORY_MAX_SIZE, DEFAULT_HISTORY_MAX_SIZE) * 1024 * 1024
+    )
+
+    for device in coordinator.entry_devices:
+        if enabled and device.history is None:
+            device.history = await hass.async_add_executor_job(
+                loex_history,
+                hass.config.path(
+                    HISTORY_DIRNAME.format(device_file_id(entry, device.api.device_id))
+                ),
+                max_bytes,
+            )
+        elif not enabled and device.history is not None:
+            history, device.history = device.history, None
+            await hass.async_add_executor_job(history.close)
+        elif device.history is not None:
+            device.history.max_bytes = max_bytes
@@ -0,0 +1,107 @@
+"""Plant-wide and room group aggregates of the Loex Xsmart snapshots."""
+
+from __future__ import annotations
+
+import math
+
+# Group of all the active rooms
+PLANT_GROUP = "Plant"
+
+# Aggregates of a group: key -> (name, field)
+AGGREGATES = {
+    "average_temperature": ("Average Temperature", "temperature"),
+    "min_temperature": ("Minimum Temperature", "temperature"),
+    "heating_rooms": ("Rooms Calling for Heat", "output_valve"),
+    "max_humidity": ("Maximum Humidity", "humidity"),
+}
+
+
+def parse_room_groups(text: str) -> dict[str, list[str]]:
+    """Parse room groups written as "Ground floor: Kitchen, Living; Attic: Study".
+
+    Groups are separated by semicolons or new lines. Raise ValueError when a
+    group has no name or no rooms, or is defined twice.
+    """
+    groups: dict[str, list[str]] = {}
+
+    for definition in text.replace("\n", ";").split(";"):
+        if not definition.strip():
+            continue
+
+        name, separator, rooms = definition.partition(":")
+        name = name.strip()
+        rooms = [room.strip() for room in rooms.split(",") if room.strip()]
+
+        if not separator or not name or not rooms:
+            raise ValueError(f"Invalid room group: {definition.strip()}")
+        if name.casefold() in (group.casefold() for group in [PLANT_GROUP, *groups]):
+            raise ValueError(f"Duplicate room group: {name}")
+
+        groups[name] = rooms
+
+    return groups
+
+
+def _reading(value) -> float | None:
+    """Return a reading, None when the register is missing."""
+    if isinstance(value, (int, float)) and math.isfinite(value):
+        return value
+
+    return None
+
+
+def compute_aggregates(
+    data: dict, rooms: dict[int, str], groups: dict[str, list[str]]
+) -> dict[str, dict]:
+    """Return the aggregates of the plant and of every room group.
+
+    The active rooms are read once, each reading is accumulated into the plant
+    and the groups of the room. Rooms are matched to the groups by name,
+    ignoring case. Aggregates without readings are None.
+    """
+    members: dict[str, list[str]] = {}
+    for group, names in groups.items():
+        for room_name in {room_name.casefold() for room_name in names}:
+            members.setdefault(room_name, []).append(group)
+
+    # Per group: rooms, temperature sum and count, minimum, heating, humidity
+    totals = {group: [0, 0.0, 0, None, 0, None] for group in [PLANT_GROUP, *groups]}
+
+    for room_id, room_name in rooms.items():
+        room = data[room_id]
+        temperature = _reading(room["temperature"])
+        humidity = _reading(room["humidity"])
+        valve = _reading(room["output_valve"])
+        heating = valve is not None and valve > 0
+
+        for group in [PLANT_GROUP, *members.get(room_name.casefold(), ())]:
+            total = totals[group]
+            total[0] += 1
+            if temperature is not None:
+                total[1] += temperature
+                total[2] += 1
+                if total[3] is None or temperature < total[3]:
+                    total[3] = temperature
+            total[4] += heating
+            if humidity is not None and (total[5] is None or humidity > total[5]):
+                total[5] = humidity
+
+    return {
+        group: {
+            "rooms": count,
+            "average_temperature": round(temperature_sum / temperatures, 2)
+            if temperatures
+            else None,
+            "min_temperature": minimum,
+            "heating_rooms": heating if count else None,
+            "max_humidity": humidity,
+        }
+        for group, (
+            count,
+            temperature_sum,
+            temperatures,
+            minimum,
+            heating,
+            humidity,
+        ) in totals.items()
+    }
@@ -0,0 +1,122 @@
+"""Binary Sensor Platform for Loex Xsmart Integration."""
+
+from dataclasses import dataclass
+import logging
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorDeviceClass,
+    BinarySensorEntity,
+    BinarySensorEntityDescription,
+)
+from homeassistant.core import HomeAssistant, callback
+
+from .coordinator import loex_coordinator
+from .entity import (
+    async_remove_entity,
+    async_setup_devices,
+    loex_described_entity,
+    loex_entity_description,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class loex_binary_sensor_entity_description(
+    loex_entity_description, BinarySensorEntityDescription
+):
+    """Description of a Loex binary sensor."""
+
+    # Extras, enabled from the entity settings
+    entity_registry_enabled_default: bool = False
+
+
+CIRCUIT_BINARY_SENSORS = (
+    loex_binary_sensor_entity_description(
+        key="deumidification_active",
+        name="Dehumidification",
+        section="circuit",
+        field="deumidification_active",
+        device_class=BinarySensorDeviceClass.RUNNING,
+        icon="mdi:air-humidifier",
+    ),
+)
+
+ROOM_BINARY_SENSORS = (
+    loex_binary_sensor_entity_description(
+        key="output_valve",
+        name="Valve",
+        section="room",
+        field="output_valve",
+        device_class=BinarySensorDeviceClass.OPENING,
+        icon="mdi:valve",
+    ),
+)
+
+
+async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities) -> None:
+    """Create setup entry."""
+    async_setup_devices(hass, entry, async_add_entities, async_setup_device)
+
+
+@callback
+def async_setup_device(
+    hass: HomeAssistant, entry, coordinator: loex_coordinator, async_add_entities
+) -> None:
+    """Create the binary sensors of a device of the entry."""
+    entities: list[loex_description_binary_sensor] = [
+        loex_description_binary_sensor(coordinator, entry, description)
+        for description in CIRCUIT_BINARY_SENSORS
+    ]
+
+    room_sensors: dict[int, list[loex_description_binary_sensor]] = {}
+
+    def create_room_sensors(
+        rooms: dict[int, str]
+    ) -> list[loex_description_binary_sensor]:
+        """Create the binary sensors of the given rooms."""
+        new_entities = []
+
+        for room_id, room_name in rooms.items():
+            room_sensors[room_id] = [
+                loex_description_binary_sensor(
+                    coordinator, entry, description, room_id, room_name
+                )
+                for description in ROOM_BINARY_SENSORS
+            ]
+            new_entities.extend(room_sensors[room_id])
+
+        return new_entities
+
+    @callback
+    def async_update_rooms(added, removed, renamed) -> None:
+        """Add, remove or rename the binary sensors of the changed rooms."""
+        for room_id in removed:
+            for sensor in room_sensors.pop(room_id):
+                async_remove_entity(hass, sensor)
+
+        for room_id, room_name in renamed.items():
+            for sensor in room_sensors[room_id]:
+                sensor.description = room_name
+
+        if added:
+            async_add_entities(create_room_sensors(added))
+
+    entities.extend(create_room_sensors(coordinator.rooms))
+
+    async_add_entities(entities)
+
+    entry.async_on_unload(coordinator.async_add_topology_listener(async_update_rooms))
+
+
+class loex_description_binary_sensor(loex_described_entity, BinarySensorEntity):
+    """Loex binary sensor of a snapshot field, as its description says."""
+
+    entity_description: loex_binary_sensor_entity_description
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return whether the field is set, e.g. the valve is open."""
+        value = self.value
+
+        return None if value is None else value > 0
@@ -0,0 +1,152 @@
+"""Estimation of the refresh cadence of the Loex Xsmart cloud data."""
+
+from __future__ import annotations
+
+from collections import deque
+import math
+import statistics
+
+from .const import (
+    CADENCE_MARGIN,
+    CADENCE_MAX_PERIOD,
+    CADENCE_MAX_SPREAD,
+    CADENCE_MIN_SAMPLES,
+)
+
+# Number of changes and aligned polls remembered
+_HISTORY = 20
+
+
+class loex_cadence:
+    """Estimate when the device refreshes the cloud copy of input.json.
+
+    Every poll reports whether the data changed since the previous poll, a
+    change happened at some point between the two polls. The period is the
+    median spacing of the changes, the phase the circular mean of the narrow
+    change intervals. The alignment only shifts the polls onto the refresh,
+    they stay at most the fixed interval apart, so a device refreshing more
+    often than the estimate shows. An aligned poll whose outcome the estimate
+    did not predict, unchanged data although a refresh was due or a change
+    although none was, is a miss, the polls fall back to the fixed interval
+    until the next change, and too many misses restart the estimation. Times
+    are in seconds since the epoch.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._last_poll: float | None = None
+        # Intervals holding a change
+        self._changes: deque[tuple[float, float]] = deque(maxlen=_HISTORY)
+        # Outcome of the aligned polls, True for a miss
+        self._aligned: deque[bool] = deque(maxlen=_HISTORY)
+        self._missed = False
+        self.period: float | None = None
+        self.phase: float | None = None
+        # Delay of the aligned polls after the estimated refresh
+        self.margin = CADENCE_MARGIN
+
+    @property
+    def reliable(self) -> bool:
+        """Return whether polls can be aligned on the estimate."""
+        return self.period is not None and self.phase is not None
+
+    def add_poll(self, now: float, changed: bool, min_period: float) -> bool:
+        """Account a successful poll, return whether the schedule must change.
+
+        Periods shorter than min_period, the fixed poll interval, are not worth
+        aligning on.
+        """
+        aligned = self.reliable and not self._missed
+
+        miss = aligned and changed != self._refresh_due(self._last_poll, now)
+
+        if aligned:
+            self._aligned.append(miss)
+
+            if len(self._aligned) >= 4 and sum(self._aligned) > len(self._aligned) / 4:
+                # The estimate drifted away from the device, start over
+                self._changes.clear()
+                self._aligned.clear()
+                self.period = self.phase = None
+
+        self._missed = miss
+
+        if changed and self._last_poll is not None:
+            self._changes.append((self._last_poll, now))
+            self._estimate(min_period)
+
+        self._last_poll = now
+
+        return aligned != (self.reliable and not self._missed)
+
+    def _estimate(self, min_period: float) -> None:
+        """Estimate the period and the phase from the changes."""
+        self.period = self.phase = None
+
+        if len(self._changes) <= CADENCE_MIN_SAMPLES:
+            return
+
+        changes = [(start + end) / 2 for start, end in self._changes]
+        spacings = [later - earlier for earlier, later in zip(changes, changes[1:])]
+        period = statistics.median(spacings)
+        spread = statistics.median(abs(spacing - period) for spacing in spacings)
+
+        if not min_period <= period <= CADENCE_MAX_PERIOD:
+            return
+        if spread > CADENCE_MAX_SPREAD * period:
+            return
+
+        # Only the intervals narrow enough locate the phase
+        narrow = [
+            (start, end) for start, end in self._changes if end - start <= period / 2
+        ]
+        if not narrow:
+            return
+
+        angles = [
+            2 * math.pi * ((start + end) / 2 % period) / period for start, end in narrow
+        ]
+        phase = math.atan2(
+            sum(math.sin(angle) for angle in angles),
+            sum(math.cos(angle) for angle in angles),
+        )
+
+        self.period = period
+        self.phase = (phase / (2 * math.pi) * period) % period
+        # The mean of the intervals is closer to the refresh than their width
+        self.margin = CADENCE_MARGIN + statistics.median(
+            end - start for start, end in narrow
+        ) / 4
+
+    def _refresh_due(self, since: float, until: float) -> bool:
+        """Return whether the estimate places a refresh between two times."""
+        return math.floor((until - self.phase) / self.period) > math.floor(
+            (since - self.phase) / self.period
+        )
+
+    def next_poll(self, after: float, min_period: float) -> float | None:
+        """Return the first aligned poll time after a time, None for fixed polling.
+
+        The poll is never later than min_period, the fixed poll interval, after
+        the given time.
+        """
+        if not self.reliable or self._missed:
+            return None
+
+        # Poll just after the refresh, leaving room for the estimate error
+        offset = self.phase + self.margin
+        cycles = math.floor((after - offset) / self.period) + 1
+
+        return min(offset + cycles * self.period, after + min_period)
+
+    def diagnostics(self) -> dict:
+        """Return the estimate."""
+        return {
+            "reliable": self.reliable,
+            "period": None if self.period is None else round(self.period, 2),
+            "phase": None if self.phase is None else round(self.phase, 2),
+            "margin": round(self.margin, 2),
+            "changes": len(self._changes),
+            "aligned_polls": len(self._aligned),
+            "aligned_misses": sum(self._aligned),
+        }
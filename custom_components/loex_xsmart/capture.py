@@ -0,0 +1,152 @@
+"""Record and replay of Loex Xsmart cloud payloads."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator
+import gzip
+import json
+import logging
+import threading
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# Record kinds
+KIND_INPUT = "i"
+KIND_OUTPUT = "o"
+
+# Number of records buffered by the gzip stream before it is flushed
+_FLUSH_EVERY = 20
+
+
+class loex_capture:
+    """Append raw input.json bodies and output.json payloads to a capture file.
+
+    The file is a gzip compressed JSON-lines stream, one record per line:
+    {"t": <unix timestamp>, "k": "i" | "o", "b": <body>}.
+    Methods are blocking and meant to run in the executor, like loex_api.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialize."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = 0
+        # Appending starts a new gzip member, readers handle that transparently
+        self._file = gzip.open(path, "ab")
+
+    def _write(self, kind: str, body) -> None:
+        """Write a single record."""
+        line = json.dumps(
+            {"t": round(time.time(), 3), "k": kind, "b": body},
+            separators=(",", ":"),
+        )
+
+        with self._lock:
+            if self._file is None:
+                return
+
+            self._file.write(line.encode() + b"\n")
+            self._pending += 1
+
+            if self._pending >= _FLUSH_EVERY:
+                self._file.flush()
+                self._pending = 0
+
+    def record_input(self, body: dict) -> None:
+        """Record a raw input.json body."""
+        self._write(KIND_INPUT, body)
+
+    def record_output(self, payload: str) -> None:
+        """Record an output.json payload the plant took."""
+        self._write(KIND_OUTPUT, payload)
+
+    def close(self) -> None:
+        """Close the capture file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_capture(path: str) -> Iterator[tuple[float, str, dict | str]]:
+    """Iterate over the (timestamp, kind, body) records of a capture file."""
+    with gzip.open(path, "rt") as capture:
+        try:
+            for line in capture:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A truncated last line is expected if Home Assistant
+                    # stopped abruptly
+                    _LOGGER.debug("Skipping malformed capture line in %s", path)
+                    continue
+
+                yield record["t"], record["k"], record["b"]
+        except EOFError:
+            # The file is still being recorded
+            _LOGGER.debug("Capture %s ends with an open gzip member", path)
+
+
+def _summary(samples: list[float]) -> dict:
+    """Summarize a list of timings, in milliseconds."""
+    if not samples:
+        return {"count": 0}
+
+    ordered = sorted(samples)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+async def async_replay(coordinator, path: str, realtime: bool = False) -> dict:
+    """Replay a capture file through loex_api and a loex_coordinator.
+
+    Every recorded input.json body is parsed by extract_from_api_data, processed
+    by the coordinator and pushed to its listeners, but not added to its duty
+    cycles, statistics or poll log. With realtime set, the original spacing
+    between records is reproduced, otherwise the capture is replayed at full
+    speed. Returns parse and fan-out timings.
+    """
+    records = await coordinator.hass.async_add_executor_job(
+        lambda: list(read_capture(path))
+    )
+
+    parse_times = []
+    fanout_times = []
+    outputs = 0
+    previous = None
+
+    for timestamp, kind, body in records:
+        if realtime and previous is not None and timestamp > previous:
+            await asyncio.sleep(timestamp - previous)
+        previous = timestamp
+
+        if kind == KIND_OUTPUT:
+            outputs += 1
+            continue
+
+        start = time.perf_counter()
+        data = coordinator.api.extract_from_api_data(body)
+        parsed = time.perf_counter()
+        coordinator.async_handle_snapshot(data, record=False)
+        coordinator.async_set_updated_data(data)
+        done = time.perf_counter()
+
+        parse_times.append(parsed - start)
+        fanout_times.append(done - parsed)
+
+        # Give the listeners scheduled by the fan-out a chance to run
+        await asyncio.sleep(0)
+
+    return {
+        "inputs": len(parse_times),
+        "outputs": outputs,
+        "parse": _summary(parse_times),
+        "fanout": _summary(fanout_times),
+    }
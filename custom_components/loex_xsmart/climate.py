@@ -13,7 +13,7 @@ from homeassistant.components.climate.const import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import UnitOfTemperature
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 
 from .const import (
     CONTROL_VALUE,
@@ -24,7 +24,7 @@ from .const import (
     LoexSeason,
 )
 from .coordinator import loex_coordinator
-from .entity import loex_entity
+from .entity import async_remove_entity, async_setup_devices, loex_entity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -33,38 +33,58 @@ async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities
 ) -> None:
     """Add entries."""
-    coordinator: loex_coordinator
+    async_setup_devices(hass, entry, async_add_entities, async_setup_device)
 
-    coordinator = hass.data[DOMAIN][entry.entry_id]
 
-    entities = []
-
-    for room_id in coordinator.data:
-        if room_id == "external":
-            continue
-
-        if room_id == "circuit":
-            main_circuit = loex_main_circuit(
-                coordinator,
-                entry,
-                "main_circuit",
-                coordinator.data["circuit"]["name"],
-                "mdi:thermostat",
-            )
-            entities.extend([main_circuit])
-            continue
+@callback
+def async_setup_device(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: loex_coordinator,
+    async_add_entities,
+) -> None:
+    """Create the thermostats of a device of the entry."""
+    thermostats: dict[int, loex_thermostat] = {}
 
-        if (coordinator.data[room_id]["validity"]) == 6:
-            thermostat = loex_thermostat(
+    def create_thermostats(rooms: dict[int, str]) -> list[loex_thermostat]:
+        """Create the thermostats of the given rooms."""
+        for room_id, room_name in rooms.items():
+            thermostats[room_id] = loex_thermostat(
                 coordinator,
                 entry,
                 room_id,
-                coordinator.data[room_id]["room_name"],
+                room_name,
                 "mdi:thermostat",
             )
-            entities.extend([thermostat])
 
-    async_add_entities(entities, True)
+        return [thermostats[room_id] for room_id in rooms]
+
+    @callback
+    def async_update_rooms(added, removed, renamed) -> None:
+        """Add, remove or rename the thermostats of the changed rooms."""
+        for room_id in removed:
+            async_remove_entity(hass, thermostats.pop(room_id))
+
+        for room_id, room_name in renamed.items():
+            thermostats[room_id].description = room_name
+
+        if added:
+            async_add_entities(create_thermostats(added))
+
+    main_circuit = loex_main_circuit(
+        coordinator,
+        entry,
+        "main_circuit",
+        coordinator.data["circuit"]["name"],
+        "mdi:thermostat",
+    )
+
+    entities = [main_circuit, *create_thermostats(coordinator.rooms)]
+
+    # The coordinator holds the first snapshot, updating first would poll again
+    async_add_entities(entities)
+
+    entry.async_on_unload(coordinator.async_add_topology_listener(async_update_rooms))
 
 
 class loex_main_circuit(loex_entity, ClimateEntity):
@@ -105,67 +125,90 @@ class loex_main_circuit(loex_entity, ClimateEntity):
         """Turn the entity on."""
         if self._hvac_mode == HVACMode.HEAT_COOL:
             if self._preset_mode == PRESET_COMFORT:
-                await self.coordinator.async_set_circuit_mode(
-                    LoexCircuitMode.LOEX_MODE_COMFORT
-                )
+                await self._async_set_circuit_mode(LoexCircuitMode.LOEX_MODE_COMFORT)
             elif self._preset_mode == PRESET_ECO:
-                await self.coordinator.async_set_circuit_mode(
-                    LoexCircuitMode.LOEX_MODE_ECO
-                )
+                await self._async_set_circuit_mode(LoexCircuitMode.LOEX_MODE_ECO)
         elif self._hvac_mode == HVACMode.AUTO:
-            await self.coordinator.async_set_circuit_mode(
-                LoexCircuitMode.LOEX_MODE_AUTO
-            )
+            await self._async_set_circuit_mode(LoexCircuitMode.LOEX_MODE_AUTO)
 
     async def async_turn_off(self):
         """Turn the entity off."""
-        await self.coordinator.async_set_circuit_mode(LoexCircuitMode.LOEX_MODE_OFF)
+        await self._async_set_circuit_mode(LoexCircuitMode.LOEX_MODE_OFF)
 
     async def async_set_temperature(self, **kwargs: Any) -> None:
         """Set Temperature."""
 
-        mode = self.coordinator.data["circuit"]["mode"]
+        mode = self._mode
 
         if mode == LoexCircuitMode.LOEX_MODE_OFF:
             return  # TODO: define what to do
         if mode == LoexCircuitMode.LOEX_MODE_AUTO:
             return  # Do Nothing
 
-        target = int(kwargs.get("temperature") * 10)
+        temperature = kwargs.get("temperature")
+        target = round(temperature * 10)
 
-        await self.coordinator.async_set_circuit_target_temperature(mode, target)
+        await self.async_write_debounced(
+            "temperature",
+            temperature,
+            lambda: self.coordinator.async_set_circuit_target_temperature(mode, target),
+        )
+
+    async def _async_set_circuit_mode(self, mode: LoexCircuitMode) -> None:
+        """Set the circuit mode, once the control settles."""
+        await self.async_write_debounced(
+            "mode", mode, lambda: self.coordinator.async_set_circuit_mode(mode)
+        )
 
     async def async_set_hvac_mode(self, hvac_mode: str) -> None:
         """Set HVAC Mode."""
 
         # Turn on the device if not already on
         if hvac_mode == HVACMode.OFF:
-            await self.coordinator.async_set_circuit_mode(LoexCircuitMode.LOEX_MODE_OFF)
+            await self._async_set_circuit_mode(LoexCircuitMode.LOEX_MODE_OFF)
         elif hvac_mode == HVACMode.HEAT_COOL:
             if self._preset_mode == PRESET_COMFORT:
-                await self.coordinator.async_set_circuit_mode(
-                    LoexCircuitMode.LOEX_MODE_COMFORT
-                )
+                await self._async_set_circuit_mode(LoexCircuitMode.LOEX_MODE_COMFORT)
             elif self._preset_mode == PRESET_ECO:
-                await self.coordinator.async_set_circuit_mode(
-                    LoexCircuitMode.LOEX_MODE_ECO
-                )
+                await self._async_set_circuit_mode(LoexCircuitMode.LOEX_MODE_ECO)
         elif hvac_mode == HVACMode.AUTO:
-            await self.coordinator.async_set_circuit_mode(
-                LoexCircuitMode.LOEX_MODE_AUTO
-            )
+            await self._async_set_circuit_mode(LoexCircuitMode.LOEX_MODE_AUTO)
         else:
             _LOGGER.warning(
                 "Unsupported mode for this device (%s): %s", self.name, hvac_mode
             )
             return
 
+    def publish_channels(self) -> dict:
+        """Return the noisy values throttled by the publish filter."""
+        return {
+            "temperature": self.current_temperature,
+            "humidity": self.current_humidity,
+        }
+
+    def publish_fingerprint(self):
+        """Return the state, other than the channels, that is always published."""
+        return (
+            self.name,
+            self.hvac_mode,
+            self.hvac_action,
+            self.preset_mode,
+            self.target_temperature,
+            self.target_humidity,
+        )
+
+    @property
+    def _mode(self) -> int:
+        """Return the circuit mode, as written until a snapshot confirms it."""
+        return self.optimistic("mode", self.coordinator.data["circuit"]["mode"])
+
     @property
     def hvac_mode(self) -> str | None:
         """Return current operation."""
-        if self.coordinator.data["circuit"]["mode"] == LoexCircuitMode.LOEX_MODE_OFF:
+        mode = self._mode
+        if mode == LoexCircuitMode.LOEX_MODE_OFF:
             return HVACMode.OFF
-        if self.coordinator.data["circuit"]["mode"] == LoexCircuitMode.LOEX_MODE_AUTO:
+        if mode == LoexCircuitMode.LOEX_MODE_AUTO:
             return HVACMode.AUTO
 
         season = self.coordinator.data["circuit"]["season"]
@@ -236,7 +279,9 @@ class loex_main_circuit(loex_entity, ClimateEntity):
     @property
     def target_temperature(self) -> float:
         """Get Target Temperature."""
-        return self.coordinator.data["circuit"]["temperature"]
+        return self.optimistic(
+            "temperature", self.coordinator.data["circuit"]["temperature"]
+        )
 
     @property
     def target_humidity(self) -> int:
@@ -258,7 +303,7 @@ class loex_main_circuit(loex_entity, ClimateEntity):
     @property
     def preset_mode(self) -> str:
         """Return current operation."""
-        preset_mode = self.coordinator.data["circuit"]["mode"]
+        preset_mode = self._mode
         if preset_mode == LoexCircuitMode.LOEX_MODE_COMFORT:
             self._preset_mode = PRESET_COMFORT
         elif preset_mode == LoexCircuitMode.LOEX_MODE_ECO:
@@ -294,7 +339,7 @@ class loex_main_circuit(loex_entity, ClimateEntity):
     @property
     def unique_id(self) -> str:
         """Get Unique Id."""
-        return f"{DOMAIN}-{self._id}-{self.coordinator.api.host}"
+        return f"{DOMAIN}-{self._id}-{self.coordinator.device_key}"
 
 
 class loex_thermostat(loex_entity, ClimateEntity):
@@ -315,8 +360,7 @@ class loex_thermostat(loex_entity, ClimateEntity):
         self._icon = icon
         self.current_temperature_value = None
         self.current_humidity_value = None
-        self.set_target_temperature_pending = False
-        self.set_target_temperature = -1
+        self.room_id = idx
 
         self._preset_mode = PRESET_COMFORT
         self._room_mode = HVACMode.OFF
@@ -338,22 +382,14 @@ class loex_thermostat(loex_entity, ClimateEntity):
         """Set Hvac Mode."""
         # Turn on the device if not already on
         if hvac_mode == HVACMode.OFF:
-            await self.coordinator.async_set_room_mode(
-                self._id, LoexRoomMode.LOEX_ROOM_MODE_OFF
-            )
+            await self._async_set_room_mode(LoexRoomMode.LOEX_ROOM_MODE_OFF)
         elif hvac_mode == HVACMode.HEAT_COOL:
             if self._preset_mode == PRESET_COMFORT:
-                await self.coordinator.async_set_room_mode(
-                    self._id, LoexRoomMode.LOEX_ROOM_MODE_COMFORT
-                )
+                await self._async_set_room_mode(LoexRoomMode.LOEX_ROOM_MODE_COMFORT)
             elif self._preset_mode == PRESET_ECO:
-                await self.coordinator.async_set_room_mode(
-                    self._id, LoexRoomMode.LOEX_ROOM_MODE_ECO
-                )
+                await self._async_set_room_mode(LoexRoomMode.LOEX_ROOM_MODE_ECO)
         elif hvac_mode == HVACMode.AUTO:
-            await self.coordinator.async_set_room_mode(
-                self._id, LoexRoomMode.LOEX_ROOM_MODE_AUTO
-            )
+            await self._async_set_room_mode(LoexRoomMode.LOEX_ROOM_MODE_AUTO)
         else:
             _LOGGER.warning(
                 "Unsupported mode for this device (%s): %s", self.name, hvac_mode
@@ -364,23 +400,15 @@ class loex_thermostat(loex_entity, ClimateEntity):
         """Turn the entity on."""
         if self._room_mode == HVACMode.HEAT_COOL:
             if self._preset_mode == PRESET_COMFORT:
-                await self.coordinator.async_set_room_mode(
-                    self._id, LoexRoomMode.LOEX_ROOM_MODE_COMFORT
-                )
+                await self._async_set_room_mode(LoexRoomMode.LOEX_ROOM_MODE_COMFORT)
             elif self._preset_mode == PRESET_ECO:
-                await self.coordinator.async_set_room_mode(
-                    self._id, LoexRoomMode.LOEX_ROOM_MODE_ECO
-                )
+                await self._async_set_room_mode(LoexRoomMode.LOEX_ROOM_MODE_ECO)
         elif self._room_mode == HVACMode.AUTO:
-            await self.coordinator.async_set_room_mode(
-                self._id, LoexRoomMode.LOEX_ROOM_MODE_AUTO
-            )
+            await self._async_set_room_mode(LoexRoomMode.LOEX_ROOM_MODE_AUTO)
 
     async def async_turn_off(self):
         """Turn the entity off."""
-        await self.coordinator.async_set_room_mode(
-            self._id, LoexRoomMode.LOEX_ROOM_MODE_OFF
-        )
+        await self._async_set_room_mode(LoexRoomMode.LOEX_ROOM_MODE_OFF)
 
     async def async_set_temperature(self, **kwargs: Any) -> None:
         """Set Temperature."""
@@ -393,16 +421,50 @@ class loex_thermostat(loex_entity, ClimateEntity):
             kwargs.get("temperature") - self.coordinator.data["circuit"]["temperature"]
         ) * 10
 
-        self.set_target_temperature_pending = True
-        self.set_target_temperature = kwargs.get("temperature")
+        await self.async_write_debounced(
+            "temperature",
+            kwargs.get("temperature"),
+            lambda: self.coordinator.async_set_room_target_temperature(
+                self._id, round(target)
+            ),
+        )
 
-        await self.coordinator.async_set_room_target_temperature(self._id, int(target))
+    async def _async_set_room_mode(self, mode: LoexRoomMode) -> None:
+        """Set the room mode, once the control settles."""
+        await self.async_write_debounced(
+            "mode",
+            mode,
+            lambda: self.coordinator.async_set_room_mode(self._id, mode),
+        )
 
     async def async_set_preset_mode(self, preset_mode: str) -> None:
         """Set preset mode."""
         # await self._device.async_set_mode(ThermostatV3Mode[preset_mode])
         _LOGGER.debug("Set present mode %s", preset_mode)
 
+    def publish_channels(self) -> dict:
+        """Return the noisy values throttled by the publish filter."""
+        return {
+            "temperature": self.current_temperature,
+            "humidity": self.current_humidity,
+        }
+
+    def publish_fingerprint(self):
+        """Return the state, other than the channels, that is always published."""
+        return (
+            self.name,
+            self.hvac_mode,
+            self.hvac_action,
+            self.preset_mode,
+            self.target_temperature,
+            self.min_temp,
+        )
+
+    @property
+    def _mode(self) -> int:
+        """Return the room mode, as written until a snapshot confirms it."""
+        return self.optimistic("mode", self.coordinator.data[self._id]["room_mode"])
+
     @property
     def hvac_mode(self) -> HVACMode:
         """Return current operation."""
@@ -412,7 +474,7 @@ class loex_thermostat(loex_entity, ClimateEntity):
             # If the circuit is off we set the room to off.
             self._room_mode = HVACMode.OFF
         else:
-            mode = self.coordinator.data[self._id]["room_mode"]
+            mode = self._mode
             if mode == LoexRoomMode.LOEX_ROOM_MODE_OFF:
                 self._room_mode = HVACMode.OFF
             elif mode == LoexRoomMode.LOEX_ROOM_MODE_AUTO:
@@ -429,7 +491,7 @@ class loex_thermostat(loex_entity, ClimateEntity):
     @property
     def preset_mode(self) -> str:
         """Return current active preset."""
-        preset_mode = self.coordinator.data[self._id]["room_mode"]
+        preset_mode = self._mode
         if preset_mode == LoexCircuitMode.LOEX_MODE_COMFORT:
             self._preset_mode = PRESET_COMFORT
         elif preset_mode == LoexCircuitMode.LOEX_MODE_ECO:
@@ -506,17 +568,10 @@ class loex_thermostat(loex_entity, ClimateEntity):
     @property
     def target_temperature(self) -> float:
         """Get target temperature."""
-        # This check is to avoid the problem that the data sent from the sistem get the update after some time
-        if self.set_target_temperature_pending:
-            if (
-                self.coordinator.data[self._id]["target_temperature"]
-                == self.set_target_temperature
-            ):
-                self.set_target_temperature_pending = False
-
-            return self.set_target_temperature
-
-        return self.coordinator.data[self._id]["target_temperature"]
+        # The cloud data gets the written value only after some time
+        return self.optimistic(
+            "temperature", self.coordinator.data[self._id]["target_temperature"]
+        )
 
     @property
     def current_humidity(self) -> int:
@@ -553,4 +608,4 @@ class loex_thermostat(loex_entity, ClimateEntity):
     @property
     def unique_id(self) -> str:
         """Get unique id."""
-        return f"{DOMAIN}-{self._id}-{self.coordinator.api.host}"
+        return f"{DOMAIN}-{self._id}-{self.coordinator.device_key}"
@@ -10,8 +10,39 @@ from homeassistant import config_entries, exceptions
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .const import CONF_SYNC_INTERVAL, DEFAULT_SYNC_INTERVAL, DOMAIN
-from .loex_api import loex_api
+from .aggregate import parse_room_groups
+from .const import (
+    CONF_CAPTURE,
+    CONF_HISTORY,
+    CONF_HISTORY_MAX_SIZE,
+    CONF_HUMIDITY_DEADBAND,
+    CONF_IMPORT_STATISTICS,
+    CONF_MAX_PUBLISH_INTERVAL,
+    CONF_MIN_PUBLISH_INTERVAL,
+    CONF_OUTBOX_TTL,
+    CONF_ROOM_GROUPS,
+    CONF_STALENESS_BUDGET,
+    CONF_SYNC_INTERVAL,
+    CONF_TEMPERATURE_DEADBAND,
+    CONF_TRACE_EXPORT,
+    CONF_TRACE_SLOW_THRESHOLD,
+    DEFAULT_CAPTURE,
+    DEFAULT_HISTORY,
+    DEFAULT_HISTORY_MAX_SIZE,
+    DEFAULT_HUMIDITY_DEADBAND,
+    DEFAULT_IMPORT_STATISTICS,
+    DEFAULT_MAX_PUBLISH_INTERVAL,
+    DEFAULT_MIN_PUBLISH_INTERVAL,
+    DEFAULT_OUTBOX_TTL,
+    DEFAULT_ROOM_GROUPS,
+    DEFAULT_STALENESS_BUDGET,
+    DEFAULT_SYNC_INTERVAL,
+    DEFAULT_TEMPERATURE_DEADBAND,
+    DEFAULT_TRACE_EXPORT,
+    DEFAULT_TRACE_SLOW_THRESHOLD,
+    DOMAIN,
+)
+from .loex_api import loex_api, parse_device_ids
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,19 +62,35 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
     """
 
-    loex = loex_api()
-
-    authenticated = await hass.async_add_executor_job(
-        loex.authenticate,
-        data["username"],
-        data["password"],
-        data["deviceId"],
-        data["plant"],
-    )
-
-    if not authenticated:
+    device_ids = parse_device_ids(data["deviceId"])
+    if not device_ids:
         raise InvalidAuth
 
+    apis: list[loex_api] = []
+
+    try:
+        # Every device of the entry must accept the credentials, each logs in
+        # once over the session of the first one
+        for device_id in device_ids:
+            api = loex_api(session=apis[0].session if apis else None)
+            apis.append(api)
+            authenticated = await hass.async_add_executor_job(
+                api.authenticate,
+                data["username"],
+                data["password"],
+                device_id,
+                data["plant"],
+            )
+
+            if not authenticated:
+                raise InvalidAuth
+    finally:
+        # The entry counts its plants once set up
+        for api in apis:
+            api.release()
+        if apis[0].session is not None:
+            await hass.async_add_executor_job(apis[0].session.close)
+
     # Return info that you want to store in the config entry.
     return {"title": data["plant"]}
 
@@ -98,9 +145,18 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_user(self, user_input=None):
         """Step User setup."""
+        errors: dict[str, str] = {}
         if user_input is not None:
+            # Shown again for correction when invalid
             self.options.update(user_input)
-            return await self._update_options()
+            try:
+                parse_room_groups(
+                    self.options.get(CONF_ROOM_GROUPS, DEFAULT_ROOM_GROUPS)
+                )
+            except ValueError:
+                errors[CONF_ROOM_GROUPS] = "invalid_room_groups"
+            else:
+                return await self._update_options()
 
         return self.async_show_form(
             step_id="user",
@@ -111,9 +167,78 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                         default=self.options.get(
                             CONF_SYNC_INTERVAL, DEFAULT_SYNC_INTERVAL
                         ),
-                    ): vol.All(vol.Coerce(int))
+                    ): vol.All(vol.Coerce(int)),
+                    vol.Required(
+                        CONF_TEMPERATURE_DEADBAND,
+                        default=self.options.get(
+                            CONF_TEMPERATURE_DEADBAND, DEFAULT_TEMPERATURE_DEADBAND
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_HUMIDITY_DEADBAND,
+                        default=self.options.get(
+                            CONF_HUMIDITY_DEADBAND, DEFAULT_HUMIDITY_DEADBAND
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_MIN_PUBLISH_INTERVAL,
+                        default=self.options.get(
+                            CONF_MIN_PUBLISH_INTERVAL, DEFAULT_MIN_PUBLISH_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_MAX_PUBLISH_INTERVAL,
+                        default=self.options.get(
+                            CONF_MAX_PUBLISH_INTERVAL, DEFAULT_MAX_PUBLISH_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_STALENESS_BUDGET,
+                        default=self.options.get(
+                            CONF_STALENESS_BUDGET, DEFAULT_STALENESS_BUDGET
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_OUTBOX_TTL,
+                        default=self.options.get(CONF_OUTBOX_TTL, DEFAULT_OUTBOX_TTL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_TRACE_SLOW_THRESHOLD,
+                        default=self.options.get(
+                            CONF_TRACE_SLOW_THRESHOLD, DEFAULT_TRACE_SLOW_THRESHOLD
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_TRACE_EXPORT,
+                        default=self.options.get(CONF_TRACE_EXPORT, DEFAULT_TRACE_EXPORT),
+                    ): bool,
+                    vol.Required(
+                        CONF_CAPTURE,
+                        default=self.options.get(CONF_CAPTURE, DEFAULT_CAPTURE),
+                    ): bool,
+                    vol.Required(
+                        CONF_HISTORY,
+                        default=self.options.get(CONF_HISTORY, DEFAULT_HISTORY),
+                    ): bool,
+                    vol.Required(
+                        CONF_HISTORY_MAX_SIZE,
+                        default=self.options.get(
+                            CONF_HISTORY_MAX_SIZE, DEFAULT_HISTORY_MAX_SIZE
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Required(
+                        CONF_IMPORT_STATISTICS,
+                        default=self.options.get(
+                            CONF_IMPORT_STATISTICS, DEFAULT_IMPORT_STATISTICS
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_ROOM_GROUPS,
+                        default=self.options.get(CONF_ROOM_GROUPS, DEFAULT_ROOM_GROUPS),
+                    ): str,
                 }
             ),
+            errors=errors,
         )
 
     async def _update_options(self):
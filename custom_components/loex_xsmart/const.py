@@ -14,8 +14,145 @@ CONF_SYNC_INTERVAL = "sync_interval"
 
 DEFAULT_SYNC_INTERVAL = 10  # seconds
 
+CONF_CAPTURE = "capture"
+
+DEFAULT_CAPTURE = False
+
+CONF_IMPORT_STATISTICS = "import_statistics"
+
+DEFAULT_IMPORT_STATISTICS = False
+
+CONF_TEMPERATURE_DEADBAND = "temperature_deadband"
+
+DEFAULT_TEMPERATURE_DEADBAND = 0.2  # °C
+
+CONF_HUMIDITY_DEADBAND = "humidity_deadband"
+
+DEFAULT_HUMIDITY_DEADBAND = 1.0  # %
+
+CONF_MIN_PUBLISH_INTERVAL = "min_publish_interval"
+
+DEFAULT_MIN_PUBLISH_INTERVAL = 30  # seconds
+
+CONF_MAX_PUBLISH_INTERVAL = "max_publish_interval"
+
+DEFAULT_MAX_PUBLISH_INTERVAL = 600  # seconds
+
+CONF_STALENESS_BUDGET = "staleness_budget"
+
+DEFAULT_STALENESS_BUDGET = 300  # seconds
+
+CONF_TRACE_SLOW_THRESHOLD = "trace_slow_threshold"
+
+DEFAULT_TRACE_SLOW_THRESHOLD = 5.0  # seconds
+
+CONF_TRACE_EXPORT = "trace_export"
+
+DEFAULT_TRACE_EXPORT = False
+
+TRACE_FILENAME = "loex_xsmart_trace_{}.jsonl"
+
+CAPTURE_FILENAME = "loex_xsmart_capture_{}.jsonl.gz"
+
+SERVICE_REPLAY_CAPTURE = "replay_capture"
+
+CONF_HISTORY = "history"
+
+DEFAULT_HISTORY = False
+
+CONF_HISTORY_MAX_SIZE = "history_max_size"
+
+DEFAULT_HISTORY_MAX_SIZE = 100  # MiB
+
+HISTORY_DIRNAME = "loex_xsmart_history_{}"
+
+HISTORY_EXPORT_FILENAME = "loex_xsmart_history_{}_{}.{}"
+
+SERVICE_EXPORT_HISTORY = "export_history"
+
+# Age of the writes queued during a cloud outage before they are dropped, 0
+# fails the writes instead
+CONF_OUTBOX_TTL = "outbox_ttl"
+
+DEFAULT_OUTBOX_TTL = 10  # minutes
+
+# Room groups with aggregate sensors, e.g. "Ground floor: Kitchen, Living"
+CONF_ROOM_GROUPS = "room_groups"
+
+DEFAULT_ROOM_GROUPS = ""
+
+# Port of the Prometheus endpoint of the headless poller
+DEFAULT_EXPORTER_PORT = 9651
+
+SERVICE_PROFILE = "profile"
+
+PROFILE_FILENAME = "loex_xsmart_profile_{}.txt"
+
+# Token bucket shared by all the plants of an account, the rate and capacity
+# are those of one plant and grow with the plants using the account
+RATE_LIMIT_RATE = 0.5  # tokens per second
+RATE_LIMIT_CAPACITY = 10
+RATE_LIMIT_WRITE_RESERVE = 3  # tokens polls cannot use
+
+# Maximum time a write waits for the rate limiter
+WRITE_RATE_LIMIT_WAIT = 10  # seconds
+
+# Time budget of a write, from the service call to the cloud response
+WRITE_DEADLINE = 30  # seconds
+
+# Timeout of the write requests sent without a deadline
+WRITE_TIMEOUT = 10  # seconds
+
+# Quiet time a control needs before its last value is written, e.g. the end of
+# a slider drag, and the longest a write is held while the control keeps moving
+WRITE_DEBOUNCE = 0.5  # seconds
+WRITE_DEBOUNCE_MAX = 2  # seconds
+
+# Shortest interval between two messages of a websocket subscription, clients
+# may ask for a longer one
+SUBSCRIBE_MIN_INTERVAL = 1  # seconds
+
+# Random shift of the poll phases, as a fraction of the spacing between plants
+POLL_PHASE_JITTER = 0.1
+
+# Changes observed before the refresh cadence of the cloud data is trusted
+CADENCE_MIN_SAMPLES = 6
+
+# Largest median deviation of the refresh spacing, relative to the period
+CADENCE_MAX_SPREAD = 0.1
+
+# Longest refresh period polls are aligned on
+CADENCE_MAX_PERIOD = 900  # seconds
+
+# Minimum delay of an aligned poll after the estimated refresh
+CADENCE_MARGIN = 2  # seconds
+
+# Hedged input.json fetches: a second request is sent once the first one is
+# slower than the HEDGE_PERCENTILE of the recent latencies
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_DELAY = 0.5  # seconds
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MAX_RATE = 0.1  # fraction of the fetches
+
+# Poll log: rows of a segment, about 3 hours at the default sync interval,
+# and segments of a data file, the unit of rotation
+HISTORY_SEGMENT_ROWS = 1024
+HISTORY_FILE_SEGMENTS = 64
+
+# Duty-cycle windows: name -> (length in seconds, number of buckets)
+DUTY_CYCLE_WINDOWS = {
+    "hour": (3600, 60),
+    "day": (86400, 96),
+}
+
+# Longer gaps between two polls are not integrated in the duty cycles
+DUTY_CYCLE_MAX_GAP = 900  # seconds
+
 MAX_ROOMS = 32
 
+# Room validity register value of an active room
+ROOM_VALIDITY_ACTIVE = 6
+
 CONTROL_VALUE = 20
 
 
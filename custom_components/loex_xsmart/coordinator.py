@@ -1,13 +1,64 @@
 """Coordinator for the Loex Xsmart Integration integration."""
 
-from datetime import timedelta
+import asyncio
+from collections import Counter
+from collections.abc import Callable
+from contextvars import copy_context
+from datetime import datetime, timedelta
 import logging
+import math
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
-from .loex_api import loex_api
+from .aggregate import compute_aggregates, parse_room_groups
+from .const import (
+    CONF_HUMIDITY_DEADBAND,
+    CONF_IMPORT_STATISTICS,
+    CONF_MAX_PUBLISH_INTERVAL,
+    CONF_MIN_PUBLISH_INTERVAL,
+    CONF_OUTBOX_TTL,
+    CONF_ROOM_GROUPS,
+    CONF_STALENESS_BUDGET,
+    CONF_SYNC_INTERVAL,
+    CONF_TEMPERATURE_DEADBAND,
+    CONF_TRACE_SLOW_THRESHOLD,
+    DEFAULT_HUMIDITY_DEADBAND,
+    DEFAULT_IMPORT_STATISTICS,
+    DEFAULT_MAX_PUBLISH_INTERVAL,
+    DEFAULT_MIN_PUBLISH_INTERVAL,
+    DEFAULT_OUTBOX_TTL,
+    DEFAULT_ROOM_GROUPS,
+    DEFAULT_STALENESS_BUDGET,
+    DEFAULT_SYNC_INTERVAL,
+    DEFAULT_TEMPERATURE_DEADBAND,
+    DEFAULT_TRACE_SLOW_THRESHOLD,
+    DEVICE_NAME,
+    DOMAIN,
+    MAX_ROOMS,
+    ROOM_VALIDITY_ACTIVE,
+    WRITE_DEADLINE,
+    WRITE_DEBOUNCE,
+    WRITE_DEBOUNCE_MAX,
+)
+from .cadence import loex_cadence
+from .debounce import loex_write_debouncer
+from .duty_cycle import loex_duty_cycle
+from .history import loex_history, snapshot_values
+from .loex_api import (
+    CannotConnect,
+    RateLimited,
+    WriteTimeout,
+    loex_api,
+    loex_deadline,
+    write_deadline,
+)
+from .outbox import loex_outbox
+from .statistics import loex_statistics
+from .throttle import loex_publish_filter, loex_publisher
+from .tracing import current_span, loex_span, loex_tracer, span
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
@@ -21,52 +72,514 @@ class loex_coordinator(DataUpdateCoordinator):
         """Initialize."""
         self.api = api
         self.platforms = []
+        self.entry_data = {}
+        # Identifies the device in the unique ids, the first device of an entry
+        # keeps the ids of the entries holding a single device
+        self.device_key = api.host
+        self.device_name = DEVICE_NAME
+        # Coordinators of the other devices of the entry, refreshed in the cycle
+        # of this one
+        self.devices: list[loex_coordinator] = []
+        # Active rooms (room id -> room name) of the last snapshot
+        self.rooms: dict[int, str] = {}
+        self._topology_listeners: list[Callable] = []
+        # Snapshot fields read by the enabled entities: field -> entities
+        self._required_fields: Counter[str] = Counter()
+        # Room groups (group name -> room names) and the aggregates of the last
+        # snapshot, per group and for the whole plant
+        self.room_groups: dict[str, list[str]] = {}
+        self.aggregates: dict[str, dict] = {}
+        # Room groups matching no active room, logged once
+        self._empty_groups: set[str] = set()
+        self.duty_cycle = loex_duty_cycle(hass, api.device_id)
+        # Writes queued while the cloud is unreachable
+        self.outbox = loex_outbox(hass, api.device_id)
+        # Writes of the interactive controls, sent once the controls settle
+        self.debouncer = loex_write_debouncer(hass, WRITE_DEBOUNCE, WRITE_DEBOUNCE_MAX)
+        self._replaying = False
+        self.publish_filter = loex_publish_filter(
+            {
+                "temperature": DEFAULT_TEMPERATURE_DEADBAND,
+                "humidity": DEFAULT_HUMIDITY_DEADBAND,
+            },
+            DEFAULT_MIN_PUBLISH_INTERVAL,
+            DEFAULT_MAX_PUBLISH_INTERVAL,
+        )
+        # Polls are driven by the loex_scheduler of the integration
+        self.poll_interval = timedelta(seconds=update_interval)
+        self.scheduler = None
+        # Refresh cadence of the cloud data, polls are aligned on it when known
+        self.cadence = loex_cadence()
+        # Hourly long-term statistics, when enabled
+        self.statistics: loex_statistics | None = None
+        # On-disk log of every snapshot, when enabled
+        self.history: loex_history | None = None
+        # Time of the last good snapshot, served until it exceeds the budget
+        self.data_time: datetime | None = None
+        # Snapshots handled so far, tells a newer snapshot came in
+        self.snapshot_count = 0
+        self.staleness_budget = timedelta(seconds=DEFAULT_STALENESS_BUDGET)
+        self.stale_polls = 0
+        # Whether the last good snapshot stands in for the failed polls
+        self.stale = False
+        self._serving_stale = False
+        self.tracer = loex_tracer(hass)
+        # Confirmation spans of the commands not confirmed by a poll yet
+        self._unconfirmed: list[loex_span] = []
 
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
-            update_interval=timedelta(seconds=update_interval),
         )
 
+    @callback
+    def async_apply_options(self, options) -> None:
+        """Apply the runtime options of the config entry."""
+        poll_interval = timedelta(
+            seconds=options.get(CONF_SYNC_INTERVAL, DEFAULT_SYNC_INTERVAL)
+        )
+
+        if poll_interval != self.poll_interval:
+            self.poll_interval = poll_interval
+            # Reschedule the next poll with the new interval
+            if self.scheduler is not None:
+                self.scheduler.async_reschedule(self)
+
+        self.publish_filter.deadbands = {
+            "temperature": options.get(
+                CONF_TEMPERATURE_DEADBAND, DEFAULT_TEMPERATURE_DEADBAND
+            ),
+            "humidity": options.get(CONF_HUMIDITY_DEADBAND, DEFAULT_HUMIDITY_DEADBAND),
+        }
+        self.publish_filter.min_interval = options.get(
+            CONF_MIN_PUBLISH_INTERVAL, DEFAULT_MIN_PUBLISH_INTERVAL
+        )
+        self.publish_filter.max_interval = options.get(
+            CONF_MAX_PUBLISH_INTERVAL, DEFAULT_MAX_PUBLISH_INTERVAL
+        )
+
+        self.staleness_budget = timedelta(
+            seconds=options.get(CONF_STALENESS_BUDGET, DEFAULT_STALENESS_BUDGET)
+        )
+        self.tracer.slow_threshold = options.get(
+            CONF_TRACE_SLOW_THRESHOLD, DEFAULT_TRACE_SLOW_THRESHOLD
+        )
+        self.outbox.ttl = options.get(CONF_OUTBOX_TTL, DEFAULT_OUTBOX_TTL) * 60
+        # Validated by the options flow, the sensors follow on reload
+        self.room_groups = parse_room_groups(
+            options.get(CONF_ROOM_GROUPS, DEFAULT_ROOM_GROUPS)
+        )
+
+        if options.get(CONF_IMPORT_STATISTICS, DEFAULT_IMPORT_STATISTICS):
+            if self.statistics is None:
+                self.statistics = loex_statistics(self.hass, self.api.device_id)
+        elif self.statistics is not None:
+            # The current hour carries on if the import is enabled again
+            self.hass.async_create_task(self.statistics.async_save())
+            self.statistics = None
+
+    @callback
+    def async_handle_snapshot(self, data: dict, record: bool = True) -> None:
+        """Process a freshly fetched snapshot before it is published.
+
+        Unless record is False, e.g. for a replayed snapshot, it is also added
+        to the duty cycles, the statistics and the poll log.
+        """
+        rooms = self._active_rooms(data)
+        now = dt_util.utcnow()
+        self.data_time = now
+        self.snapshot_count += 1
+        self.aggregates = compute_aggregates(data, rooms, self.room_groups)
+
+        for group in self.room_groups:
+            if not self.aggregates[group]["rooms"] and group not in self._empty_groups:
+                self._empty_groups.add(group)
+                _LOGGER.warning(
+                    "Room group %s of %s matches no active room, check its room names",
+                    group,
+                    self.device_name,
+                )
+
+        if not record:
+            return
+
+        self.duty_cycle.async_add_snapshot(data, rooms, now)
+
+        if self.statistics is not None:
+            self.statistics.async_add_snapshot(data, rooms, now)
+
+        if self.history is not None and self.history.add(
+            now.timestamp(), snapshot_values(data, rooms)
+        ):
+            self.hass.async_add_executor_job(self.history.flush)
+
+    @callback
+    def async_add_topology_listener(self, update_callback: Callable) -> CALLBACK_TYPE:
+        """Listen for rooms being added, removed or renamed.
+
+        The callback receives the added rooms, the removed room ids and the
+        renamed rooms, before the coordinator listeners are updated.
+        """
+        self._topology_listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._topology_listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_require_field(self, field: str) -> CALLBACK_TYPE:
+        """Decode an optional field of the snapshots until the callback is called.
+
+        Fields that are always decoded are counted all the same.
+        """
+        self._required_fields[field] += 1
+        self.api.decode_fields = frozenset(+self._required_fields)
+
+        @callback
+        def release_field() -> None:
+            self._required_fields[field] -= 1
+            self.api.decode_fields = frozenset(+self._required_fields)
+
+        return release_field
+
+    def data_age(self) -> float | None:
+        """Return the age of the data in seconds."""
+        if self.data_time is None:
+            return None
+
+        return (dt_util.utcnow() - self.data_time).total_seconds()
+
+    def _serve_stale(self) -> bool:
+        """Return whether the last good snapshot may stand in for a failed poll."""
+        age = self.data_age()
+
+        return (
+            self.data is not None
+            and age is not None
+            and age < self.staleness_budget.total_seconds()
+        )
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the room topology, then all the listeners."""
+        if self._serving_stale:
+            # Nothing changed, the entities keep their state and availability
+            self._serving_stale = False
+            return
+
+        if self.data is not None:
+            self._async_update_rooms(self.data)
+
+        updates = [
+            update_callback
+            for update_callback, context in list(self._listeners.values())
+            if self.async_publishes(context)
+        ]
+
+        with span("fanout", listeners=len(updates)):
+            for update_callback in updates:
+                update_callback()
+
+    @callback
+    def async_publishes(self, context) -> bool:
+        """Return whether a listener is notified of the update.
+
+        Listeners registered with a loex_publisher as context, the entities and
+        the websocket feeds, go through the publish filter. Turning stale or
+        fresh changes their state, so it is part of the fingerprint.
+        """
+        if not isinstance(context, loex_publisher):
+            return True
+
+        if not context.available:
+            # Its next state is published unconditionally
+            self.publish_filter.forget(context.publish_key)
+            return True
+
+        channels = context.publish_channels()
+
+        return not channels or self.publish_filter.should_publish(
+            context.publish_key,
+            channels,
+            (context.publish_fingerprint(), self.stale),
+        )
+
+    def _active_rooms(self, data) -> dict[int, str]:
+        """Return the active rooms of a snapshot."""
+        rooms = {}
+
+        for room_id in range(MAX_ROOMS):
+            validity = data[room_id]["validity"]
+
+            if validity == "N/A":
+                # Missing register, keep the room as it was
+                if room_id in self.rooms:
+                    rooms[room_id] = self.rooms[room_id]
+            elif validity == ROOM_VALIDITY_ACTIVE:
+                rooms[room_id] = data[room_id]["room_name"]
+
+        return rooms
+
+    @callback
+    def _async_update_rooms(self, data) -> None:
+        """Detect the rooms enabled, retired or renamed since the last poll."""
+        rooms = self._active_rooms(data)
+
+        added = {
+            room_id: name for room_id, name in rooms.items() if room_id not in self.rooms
+        }
+        removed = self.rooms.keys() - rooms.keys()
+        renamed = {
+            room_id: name
+            for room_id, name in rooms.items()
+            if room_id in self.rooms and self.rooms[room_id] != name
+        }
+
+        self.rooms = rooms
+
+        if not (added or removed or renamed):
+            return
+
+        _LOGGER.debug(
+            "Rooms changed, added: %s, removed: %s, renamed: %s",
+            added,
+            removed,
+            renamed,
+        )
+
+        for update_callback in list(self._topology_listeners):
+            update_callback(added, removed, renamed)
+
+    @property
+    def entry_devices(self) -> list["loex_coordinator"]:
+        """Return the coordinators of all the devices of the entry."""
+        return [self, *self.devices]
+
+    @property
+    def snapshots(self) -> dict[str, dict | None]:
+        """Return the last snapshot of every device of the entry, by device id."""
+        return {device.api.device_id: device.data for device in self.entry_devices}
+
+    async def async_refresh(self) -> None:
+        """Refresh the data of every device of the entry, traced as polls.
+
+        The devices are fetched concurrently, each keeps its own snapshot and
+        availability, so a device the cloud fails to serve does not hold back
+        or invalidate the others.
+        """
+        await asyncio.gather(
+            self._async_refresh_device(),
+            *(device.async_refresh() for device in self.devices),
+        )
+
+    async def _async_refresh_device(self) -> None:
+        """Refresh the data of the device, traced as a poll."""
+        with self.tracer.span("poll", root=True, device=self.api.device_id):
+            await super().async_refresh()
+
     async def _async_update_data(self):
+        self._serving_stale = False
+
         try:
-            return await self.hass.async_add_executor_job(self.api.get_data)
+            # The copied context carries the trace into the executor
+            data = await self.hass.async_add_executor_job(
+                copy_context().run, self.api.get_data
+            )
         except Exception as exception:
-            raise UpdateFailed from exception
+            # Keep serving the last good snapshot until it exceeds the budget
+            if not self._serve_stale():
+                self.stale = False
+                raise UpdateFailed from exception
 
-    async def async_set_room_target_temperature(self, room_id, target_temperature):
-        """Set room target temperature."""
-        try:
-            return await self.hass.async_add_executor_job(
-                self.api.set_room_target_temperature, room_id, target_temperature
+            if isinstance(exception, RateLimited):
+                _LOGGER.debug("Poll skipped, request budget exhausted")
+            else:
+                _LOGGER.debug(
+                    "Poll failed, serving data %.0f seconds old: %s",
+                    self.data_age(),
+                    exception,
+                )
+
+            self.stale_polls += 1
+            # The entities are updated once, to show the time of their data
+            self._serving_stale = self.stale
+            self.stale = True
+            return self.data
+
+        self.stale = False
+
+        now = dt_util.utcnow()
+        if (
+            self.cadence.add_poll(
+                now.timestamp(), data != self.data, self.poll_interval.total_seconds()
             )
+            and self.scheduler is not None
+        ):
+            # Switch between aligned and fixed polling right away
+            self.scheduler.async_reschedule(self, now + timedelta(seconds=1))
+
+        with span("snapshot"):
+            self.async_handle_snapshot(data)
+
+        self._async_confirm_commands()
+
+        if len(self.outbox) and not self._replaying:
+            # The cloud is reachable again
+            self.hass.async_create_task(self.async_replay_outbox())
+
+        return data
+
+    @callback
+    def _async_confirm_commands(self) -> None:
+        """End the confirmations of the commands written before the current poll."""
+        poll = current_span()
+
+        for confirmation in self._unconfirmed:
+            confirmation.attributes["confirmed_by"] = poll and poll.trace_id
+            self.tracer.end_span(confirmation)
+
+        self._unconfirmed.clear()
+
+    async def _async_write(
+        self, operation: str, target: Callable, *args, replay: bool = False
+    ):
+        """Write to the plant, traced as a command.
+
+        The command ends with its request. The wait for the poll confirming it
+        is traced on its own, as a confirmation, which is exported but never
+        logged as slow.
+
+        The write runs within the deadline of the calling service, WRITE_DEADLINE
+        seconds unless the caller set a shorter one. When the caller is
+        cancelled or the deadline passes, the executor thread drops the write if
+        it was not sent yet, and its request times out with the deadline.
+
+        A write the cloud could not be reached for, or timing out once sent, is
+        queued in the outbox, and replayed after the next successful poll,
+        unless it is a replay.
+        """
+        deadline = write_deadline.get() or loex_deadline(WRITE_DEADLINE)
+        token = write_deadline.set(deadline)
+        command = self.tracer.start_span(
+            "command",
+            root=True,
+            device=self.api.device_id,
+            operation=operation,
+            args=list(args),
+        )
+
+        try:
+            with self.tracer.use(command), span("write"):
+                try:
+                    async with asyncio.timeout(deadline.remaining()):
+                        result = await self.hass.async_add_executor_job(
+                            copy_context().run, target, *args
+                        )
+                except TimeoutError as exception:
+                    # Queued like a request timing out, if it was sent
+                    deadline.cancelled.set()
+                    raise WriteTimeout from exception
+        except asyncio.CancelledError:
+            deadline.cancelled.set()
+            self.tracer.end_span(command, "cancelled")
+            raise
+        except (CannotConnect, WriteTimeout) as exception:
+            if deadline.payload is None or not self.outbox.ttl or replay:
+                self.tracer.end_span(command, repr(exception))
+                raise
+
+            self.outbox.async_queue(deadline.payload, operation)
+            self.tracer.end_span(command, "queued")
+            return None
+        except HomeAssistantError as exception:
+            # Cancellations, rejected credentials, HTTP and rate limit errors
+            self.tracer.end_span(command, repr(exception))
+            raise
         except Exception as exception:
+            self.tracer.end_span(command, repr(exception))
             raise UpdateFailed from exception
+        finally:
+            write_deadline.reset(token)
+
+        if deadline.payload is not None:
+            # A newer value than the queued one
+            self.outbox.async_discard(deadline.payload)
+
+        self.tracer.end_span(command)
+        self._unconfirmed.append(
+            self.tracer.start_span(
+                "confirmation",
+                root=True,
+                # Bound by the poll schedule, not by the cloud
+                slow_threshold=math.inf,
+                device=self.api.device_id,
+                command=command.trace_id,
+            )
+        )
+
+        return result
+
+    async def async_replay_outbox(self) -> None:
+        """Send the writes queued while the cloud was unreachable, in order.
+
+        The replay stops at the first failure, the writes left are queued again.
+        """
+        writes = self.outbox.async_take()
+
+        if not writes:
+            return
+
+        _LOGGER.info("Cloud reachable, replaying %s queued writes", len(writes))
+        self._replaying = True
+
+        try:
+            for index, write in enumerate(writes):
+                try:
+                    await self._async_write(
+                        write["operation"],
+                        self.api.save_data,
+                        write["payload"],
+                        replay=True,
+                    )
+                except (HomeAssistantError, UpdateFailed) as exception:
+                    _LOGGER.debug("Replay interrupted: %r", exception)
+                    for left in writes[index:]:
+                        self.outbox.async_queue(
+                            left["payload"], left["operation"], left["queued"]
+                        )
+                    return
+
+                self.outbox.replayed += 1
+        finally:
+            self._replaying = False
+
+    async def async_set_room_target_temperature(self, room_id, target_temperature):
+        """Set room target temperature."""
+        return await self._async_write(
+            "set_room_target_temperature",
+            self.api.set_room_target_temperature,
+            room_id,
+            target_temperature,
+        )
 
     async def async_set_circuit_target_temperature(self, mode, target_temperature):
         """Set circuit target temperature."""
-        try:
-            return await self.hass.async_add_executor_job(
-                self.api.set_circuit_target_temperature, mode, target_temperature
-            )
-        except Exception as exception:
-            raise UpdateFailed from exception
+        return await self._async_write(
+            "set_circuit_target_temperature",
+            self.api.set_circuit_target_temperature,
+            mode,
+            target_temperature,
+        )
 
     async def async_set_room_mode(self, room_id, mode):
         """Set room mode temperature."""
-        try:
-            return await self.hass.async_add_executor_job(
-                self.api.set_room_mode, room_id, mode
-            )
-        except Exception as exception:
-            raise UpdateFailed from exception
+        return await self._async_write(
+            "set_room_mode", self.api.set_room_mode, room_id, mode
+        )
 
     async def async_set_circuit_mode(self, mode):
         """Set circuit mode temperature."""
-        try:
-            return await self.hass.async_add_executor_job(
-                self.api.set_circuit_mode, mode
-            )
-        except Exception as exception:
-            raise UpdateFailed from exception
+        return await self._async_write("set_circuit_mode", self.api.set_circuit_mode, mode)
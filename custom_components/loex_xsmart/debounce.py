@@ -0,0 +1,150 @@
+"""Trailing-edge debouncing of the Loex Xsmart writes of interactive controls."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _held_write:
+    """The last write asked for a control, waiting for the control to settle."""
+
+    def __init__(self, first: float) -> None:
+        """Initialize."""
+        self.first = first
+        self.write: Callable[[], Awaitable] | None = None
+        self.handle: asyncio.TimerHandle | None = None
+        # Callers waiting for the outcome of the write
+        self.waiters: list[asyncio.Future] = []
+
+
+class loex_write_debouncer:
+    """Coalesce the bursts of writes of a control into the last one.
+
+    Dragging a slider asks for the same write many times a second. A write is
+    held until its control has been quiet for delay seconds, but not longer
+    than max_delay after the first held write, so the final value is sent
+    promptly. A write still in flight when a newer one is asked for is
+    cancelled, before its request if it is still waiting for it. The callers of
+    coalesced writes all wait for the write of the last value, and get its
+    outcome.
+    """
+
+    def __init__(self, hass: HomeAssistant, delay: float, max_delay: float) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.delay = delay
+        self.max_delay = max_delay
+        self._held: dict[Hashable, _held_write] = {}
+        # control -> (task, waiters) of the write in flight
+        self._in_flight: dict[Hashable, tuple[asyncio.Task, list]] = {}
+        self.asked = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.superseded = 0
+
+    async def async_write(
+        self, control: Hashable, write: Callable[[], Awaitable]
+    ) -> None:
+        """Write once the control settles, return once the last value is written."""
+        loop = self.hass.loop
+        self.asked += 1
+
+        held = self._held.get(control)
+        if held is None:
+            held = self._held[control] = _held_write(loop.time())
+        else:
+            held.handle.cancel()
+            self.coalesced += 1
+
+        in_flight = self._in_flight.pop(control, None)
+        if in_flight is not None:
+            task, waiters = in_flight
+            # Its callers now wait for this write
+            task.cancel()
+            held.waiters.extend(waiters)
+            self.superseded += 1
+            _LOGGER.debug("Write of %s superseded while in flight", control)
+
+        held.write = write
+        waiter = loop.create_future()
+        held.waiters.append(waiter)
+
+        delay = min(self.delay, held.first + self.max_delay - loop.time())
+        held.handle = loop.call_later(max(delay, 0), self._async_send, control)
+
+        await waiter
+
+    @callback
+    def _async_send(self, control: Hashable) -> None:
+        """Send the held write of a control."""
+        held = self._held.pop(control)
+        task = self.hass.async_create_task(self._async_run(control, held))
+        self._in_flight[control] = (task, held.waiters)
+
+    def _is_in_flight(self, control: Hashable, task: asyncio.Task) -> bool:
+        """Return whether a task runs the write in flight of a control."""
+        in_flight = self._in_flight.get(control)
+
+        return in_flight is not None and in_flight[0] is task
+
+    async def _async_run(self, control: Hashable, held: _held_write) -> None:
+        """Run a write and hand its outcome to its callers."""
+        task = asyncio.current_task()
+        self.sent += 1
+
+        try:
+            await held.write()
+        except asyncio.CancelledError:
+            if self._is_in_flight(control, task):
+                # Cancelled from outside, not superseded
+                del self._in_flight[control]
+                for waiter in held.waiters:
+                    waiter.cancel()
+            raise
+        except Exception as exception:  # pylint: disable=broad-except
+            outcome = exception
+        else:
+            outcome = None
+
+        if not self._is_in_flight(control, task):
+            # Superseded once sent, the newer write answers its callers
+            return
+
+        del self._in_flight[control]
+
+        for waiter in held.waiters:
+            if waiter.done():
+                continue
+            if outcome is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(outcome)
+
+    async def async_flush(self) -> None:
+        """Send the held writes now and wait for the writes in flight."""
+        for control, held in list(self._held.items()):
+            held.handle.cancel()
+            self._async_send(control)
+
+        tasks = [task for task, _ in self._in_flight.values()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def diagnostics(self) -> dict:
+        """Return the debouncing statistics."""
+        return {
+            "delay": self.delay,
+            "max_delay": self.max_delay,
+            "held": len(self._held),
+            "in_flight": len(self._in_flight),
+            "asked": self.asked,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "superseded": self.superseded,
+        }
@@ -0,0 +1,54 @@
+"""Diagnostics support for the Loex Xsmart Integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import loex_coordinator
+
+TO_REDACT = {"username", "password"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: loex_coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "rate_limiter": coordinator.api.limiter.diagnostics(),
+        "hedge": coordinator.api.hedge.diagnostics(),
+        "tracing": coordinator.tracer.diagnostics(),
+        "outbox": coordinator.outbox.diagnostics(),
+        "debounce": coordinator.debouncer.diagnostics(),
+        "history": coordinator.history.diagnostics()
+        if coordinator.history is not None
+        else None,
+        "schedule": coordinator.scheduler.diagnostics(coordinator)
+        if coordinator.scheduler is not None
+        else None,
+        "freshness": {
+            "data_age": coordinator.data_age(),
+            "staleness_budget": coordinator.staleness_budget.total_seconds(),
+            "stale_polls": coordinator.stale_polls,
+        },
+        "aggregates": coordinator.aggregates,
+        "data": coordinator.data,
+        "devices": [
+            {
+                "device_id": device.api.device_id,
+                "last_update_success": device.last_update_success,
+                "data_age": device.data_age(),
+                "stale_polls": device.stale_polls,
+                "outbox": device.outbox.diagnostics(),
+                "data": device.data,
+            }
+            for device in coordinator.devices
+        ],
+    }
@@ -0,0 +1,193 @@
+"""Incremental valve duty-cycle engine for the Loex Xsmart rooms."""
+
+from __future__ import annotations
+
+from datetime import datetime
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+
+from .const import DOMAIN, DUTY_CYCLE_MAX_GAP, DUTY_CYCLE_WINDOWS
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Delay before the engine state is written to storage
+_SAVE_DELAY = 300  # seconds
+
+# Key of the whole plant, open while any room valve is open
+PLANT = "plant"
+
+
+class loex_rolling_window:
+    """Open and observed time over a rolling window, kept in fixed-size buckets.
+
+    Running totals are updated as buckets fill and expire, so adding a sample
+    and reading the ratio cost O(1) amortized whatever the window length.
+    """
+
+    def __init__(self, length: float, count: int) -> None:
+        """Initialize."""
+        self.width = length / count
+        self.count = count
+        self.open = [0.0] * count
+        self.observed = [0.0] * count
+        self.open_total = 0.0
+        self.observed_total = 0.0
+        # Absolute index of the newest bucket
+        self.index: int | None = None
+
+    def _advance(self, index: int) -> None:
+        """Expire the buckets that left the window."""
+        if self.index is None:
+            self.index = index
+            return
+
+        if index <= self.index:
+            return
+
+        for absolute in range(max(self.index + 1, index - self.count + 1), index + 1):
+            slot = absolute % self.count
+            self.open_total -= self.open[slot]
+            self.observed_total -= self.observed[slot]
+            self.open[slot] = 0.0
+            self.observed[slot] = 0.0
+
+        self.index = index
+
+    def add(self, start: float, end: float, is_open: bool) -> None:
+        """Account the [start, end) interval, in seconds since the epoch."""
+        time = start
+
+        while time < end:
+            index = int(time // self.width)
+            self._advance(index)
+
+            span = min(end, (index + 1) * self.width) - time
+            slot = index % self.count
+            self.observed[slot] += span
+            self.observed_total += span
+            if is_open:
+                self.open[slot] += span
+                self.open_total += span
+
+            time += span
+
+    def ratio(self, now: float) -> float | None:
+        """Return the open ratio over the window ending now."""
+        self._advance(int(now // self.width))
+
+        if self.observed_total <= 0:
+            return None
+
+        return max(0.0, min(1.0, self.open_total / self.observed_total))
+
+    def as_dict(self) -> dict:
+        """Return a serializable state."""
+        return {"index": self.index, "open": self.open, "observed": self.observed}
+
+    def restore(self, state: dict) -> None:
+        """Restore a state returned by as_dict."""
+        if len(state["open"]) != self.count:
+            return
+
+        self.index = state["index"]
+        self.open = list(state["open"])
+        self.observed = list(state["observed"])
+        self.open_total = sum(self.open)
+        self.observed_total = sum(self.observed)
+
+
+class loex_duty_cycle:
+    """Integrate the valve open time per room and for the whole plant."""
+
+    def __init__(self, hass: HomeAssistant, device_id: str) -> None:
+        """Initialize."""
+        self.hass = hass
+        self._store = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.duty_cycle.{slugify(device_id)}"
+        )
+        self._windows: dict[str | int, dict[str, loex_rolling_window]] = {}
+        # Valve state of every key at the last snapshot
+        self._open: dict[str | int, bool] = {}
+        self._last: float | None = None
+
+    def _key_windows(self, key: str | int) -> dict[str, loex_rolling_window]:
+        """Return the windows of a room or of the plant."""
+        windows = self._windows.get(key)
+
+        if windows is None:
+            windows = self._windows[key] = {
+                window: loex_rolling_window(length, count)
+                for window, (length, count) in DUTY_CYCLE_WINDOWS.items()
+            }
+
+        return windows
+
+    async def async_load(self) -> None:
+        """Restore the state saved before a restart."""
+        stored = await self._store.async_load()
+
+        if not stored:
+            return
+
+        self._last = stored["last"]
+
+        for key, windows in stored["windows"].items():
+            key = PLANT if key == PLANT else int(key)
+
+            for window, state in windows.items():
+                if window in DUTY_CYCLE_WINDOWS:
+                    self._key_windows(key)[window].restore(state)
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Return the state to save."""
+        return {
+            "last": self._last,
+            "windows": {
+                str(key): {window: rolling.as_dict() for window, rolling in windows.items()}
+                for key, windows in self._windows.items()
+            },
+        }
+
+    @callback
+    def async_add_snapshot(self, data: dict, rooms: dict[int, str], now: datetime):
+        """Integrate the valve states held since the previous snapshot."""
+        now_ts = now.timestamp()
+
+        if self._last is not None and 0 < now_ts - self._last <= DUTY_CYCLE_MAX_GAP:
+            for key, is_open in self._open.items():
+                for rolling in self._key_windows(key).values():
+                    rolling.add(self._last, now_ts, is_open)
+
+        self._last = now_ts
+        self._open = {}
+
+        for room_id in rooms:
+            output_valve = data[room_id]["output_valve"]
+            if isinstance(output_valve, (int, float)):
+                self._open[room_id] = output_valve > 0
+
+        if self._open:
+            self._open[PLANT] = any(self._open.values())
+
+        self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+
+    async def async_save(self) -> None:
+        """Save the state now."""
+        await self._store.async_save(self._data_to_save())
+
+    def duty_cycle(self, key: str | int, window: str, now: datetime) -> float | None:
+        """Return the duty cycle of a room or of the plant, in percent."""
+        windows = self._windows.get(key)
+
+        if windows is None:
+            return None
+
+        ratio = windows[window].ratio(now.timestamp())
+
+        return None if ratio is None else round(ratio * 100, 1)
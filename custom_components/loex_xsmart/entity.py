@@ -1,41 +1,256 @@
 """The Loex Xsmart Loex Entity."""
 
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
 import logging
+from typing import Any
 
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import Entity, EntityDescription
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DEVICE_NAME, DEVICE_VERSION, DOMAIN, MANUFACTURER
+from .const import DEVICE_VERSION, DOMAIN, MANUFACTURER
 from .coordinator import loex_coordinator
+from .throttle import loex_publisher
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 
 class loex_entity(
     CoordinatorEntity,
+    loex_publisher,
 ):
     """Loex Entity clas."""
 
+    # Changes with every poll, meaningless in the history
+    _unrecorded_attributes = frozenset({"data_time"})
+
     def __init__(self, coordinator: loex_coordinator, entry) -> None:
         """Initialize."""
-        super().__init__(coordinator)
+        # The coordinator asks the entity whether its update is published
+        super().__init__(coordinator, self)
         self.entry = entry
+        # Room the entity belongs to, None for plant-wide entities
+        self.room_id = None
+        # Values written but not confirmed by a snapshot yet: control -> value
+        self._optimistic: dict[str, Any] = {}
+        # Controls written: control -> snapshots handled when the write was done,
+        # a newer snapshot replaces their value
+        self._written: dict[str, Any] = {}
 
     @property
     def device_info(self):
         """Return Device Info."""
         return {
-            "identifiers": {(DOMAIN, self.coordinator.api.host)},
-            "name": DEVICE_NAME,
+            "identifiers": {(DOMAIN, self.coordinator.device_key)},
+            "name": self.coordinator.device_name,
             "model": DEVICE_VERSION,
             "manufacturer": MANUFACTURER,
         }
 
+    def optimistic(self, control: str, value):
+        """Return the value written for a control until a snapshot confirms it.
+
+        The written value is dropped by the first snapshot polled once the write
+        is done, whether the plant took it or not.
+        """
+        if control in self._optimistic:
+            polled = (
+                control in self._written
+                and self._written[control] != self.coordinator.snapshot_count
+            )
+            if not polled and self._optimistic[control] != value:
+                return self._optimistic[control]
+            del self._optimistic[control]
+            self._written.pop(control, None)
+
+        return value
+
+    async def async_write_debounced(
+        self, control: str, value, write: Callable[[], Awaitable]
+    ) -> None:
+        """Show the value of a control right away, write it once it settles."""
+        self._optimistic[control] = value
+        self._written.pop(control, None)
+        self.async_write_ha_state()
+
+        try:
+            await self.coordinator.debouncer.async_write(
+                (self.unique_id, control), write
+            )
+        except Exception:
+            # Unless a newer value is shown already
+            if self._optimistic.get(control) == value:
+                del self._optimistic[control]
+                self.async_write_ha_state()
+            raise
+
+        if self._optimistic.get(control) == value:
+            self._written[control] = self.coordinator.snapshot_count
+
     @property
     def _available(self) -> bool:
         """Return whether is available."""
         return self.coordinator.data
 
+    @property
+    def available(self) -> bool:
+        """Return whether the entity is available."""
+        return super().available and (
+            self.room_id is None or self.room_id in self.coordinator.rooms
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """Return when the data was polled, while it stands in for failed polls."""
+        if not self.coordinator.stale:
+            return None
+
+        return {"data_time": self.coordinator.data_time}
+
+    @property
+    def publish_key(self):
+        """Return the key of the entity in the publish filter."""
+        return self.unique_id
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Forget the entity in the publish filter."""
+        await super().async_will_remove_from_hass()
+        self.coordinator.publish_filter.forget(self.publish_key)
+
     @property
     def should_poll(self) -> bool:
         """Return the possibility to poll."""
         return False
+
+
+@dataclass(frozen=True, kw_only=True)
+class loex_entity_description(EntityDescription):
+    """Description of an entity reading one field of the snapshot."""
+
+    # "external", "circuit" or "room"
+    section: str
+    field: str
+    # Turns the decoded value into the state
+    value_fn: Callable = lambda value: value
+
+
+class loex_described_entity(loex_entity):
+    """Entity reading one field of the snapshot, of the plant or of a room.
+
+    The field is decoded by the coordinator only while an entity reading it is
+    enabled.
+    """
+
+    entity_description: loex_entity_description
+
+    def __init__(
+        self,
+        coordinator: loex_coordinator,
+        entry,
+        entity_description: loex_entity_description,
+        room_id: int | None = None,
+        room_name: str | None = None,
+    ) -> None:
+        """Initialize."""
+        super().__init__(coordinator, entry)
+        self.entity_description = entity_description
+        self.room_id = room_id
+        # Room name, updated when the room is renamed
+        self.description = room_name
+        self._id = (
+            entity_description.key
+            if room_id is None
+            else f"{room_id}_{entity_description.key}"
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Decode the field while the entity is enabled."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_require_field(self.entity_description.field)
+        )
+
+    @property
+    def value(self):
+        """Return the field of the last snapshot, None when missing."""
+        section = (
+            self.room_id
+            if self.entity_description.section == "room"
+            else self.entity_description.section
+        )
+        value = self.coordinator.data[section].get(self.entity_description.field)
+
+        if value is None or value == "N/A":
+            return None
+
+        return self.entity_description.value_fn(value)
+
+    @property
+    def name(self) -> str:
+        """Get name."""
+        if self.room_id is None:
+            return f"{self.entity_description.name}"
+
+        return f"{self.description} {self.entity_description.name}"
+
+    @property
+    def id(self):
+        """Get id."""
+        return f"{DOMAIN}_{self._id}"
+
+    @property
+    def unique_id(self):
+        """Get unique id."""
+        return f"{DOMAIN}-{self._id}-{self.coordinator.device_key}"
+
+
+@callback
+def async_setup_devices(
+    hass: HomeAssistant, entry, async_add_entities, setup_device: Callable
+) -> None:
+    """Create the entities of every device of the entry.
+
+    The entities are built from the first snapshot of their device, so those of
+    a device that did not answer during the setup follow its first good poll.
+    """
+    for coordinator in hass.data[DOMAIN][entry.entry_id].entry_devices:
+        if coordinator.data is not None:
+            setup_device(hass, entry, coordinator, async_add_entities)
+        else:
+            _async_setup_when_ready(
+                hass, entry, coordinator, async_add_entities, setup_device
+            )
+
+
+@callback
+def _async_setup_when_ready(
+    hass: HomeAssistant,
+    entry,
+    coordinator: loex_coordinator,
+    async_add_entities,
+    setup_device: Callable,
+) -> None:
+    """Create the entities of a device once its rooms are first polled."""
+    ready = False
+
+    @callback
+    def async_device_ready(added, removed, renamed) -> None:
+        nonlocal ready
+
+        if not ready:
+            ready = True
+            setup_device(hass, entry, coordinator, async_add_entities)
+
+    entry.async_on_unload(coordinator.async_add_topology_listener(async_device_ready))
+
+
+@callback
+def async_remove_entity(hass: HomeAssistant, entity: Entity) -> None:
+    """Remove an entity of a retired room, along with its registry entry."""
+    if entity.registry_entry is not None:
+        # The platform removes the entity when its registry entry goes away
+        er.async_get(hass).async_remove(entity.entity_id)
+    elif entity.hass is not None:
+        hass.async_create_task(entity.async_remove())
@@ -0,0 +1,336 @@
+"""Headless poller of Loex Xsmart plants serving Prometheus metrics.
+
+Runs without Home Assistant, from a JSON file listing the plants as
+[{"username": ..., "password": ..., "deviceId": ..., "plant": ...}, ...]:
+
+    python custom_components/loex_xsmart/run_headless.py plants.json --port 9651
+
+With --once, every plant is polled once and the metrics are printed, e.g. for
+the textfile collector of the node exporter.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import sys
+import threading
+import time
+
+from .const import (
+    DEFAULT_EXPORTER_PORT,
+    DEFAULT_SYNC_INTERVAL,
+    MAX_ROOMS,
+    ROOM_VALIDITY_ACTIVE,
+)
+from .loex_api import CannotConnect, loex_api
+
+_LOGGER = logging.getLogger(__name__)
+
+# Room gauges: name -> (help, field)
+_ROOM_GAUGES = {
+    "loex_room_temperature_celsius": ("Room temperature.", "temperature"),
+    "loex_room_target_temperature_celsius": (
+        "Room target temperature.",
+        "target_temperature",
+    ),
+    "loex_room_humidity_percent": ("Room relative humidity.", "humidity"),
+    "loex_room_valve_open": ("Room valve output, 1 when open.", "output_valve"),
+    "loex_room_mode": ("Room mode: 0 auto, 1 comfort, 2 eco, 3 off.", "room_mode"),
+}
+
+# Plant gauges: name -> (help, section, field)
+_PLANT_GAUGES = {
+    "loex_outdoor_temperature_celsius": (
+        "Outdoor temperature.",
+        "external",
+        "ext_temp",
+    ),
+    "loex_home_temperature_celsius": (
+        "Highest room temperature.",
+        "circuit",
+        "home_temperature",
+    ),
+    "loex_home_humidity_percent": (
+        "Highest room relative humidity.",
+        "circuit",
+        "home_humidity",
+    ),
+    "loex_circuit_mode": (
+        "Circuit mode: 0 off, 1 comfort, 2 eco, 3 auto.",
+        "circuit",
+        "mode",
+    ),
+    "loex_circuit_state": (
+        "Circuit state: 0 off, 1 heating or cooling, 3 idle.",
+        "circuit",
+        "state",
+    ),
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    """Return a label set."""
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+class loex_headless_plant:
+    """A polled plant and its last snapshot."""
+
+    def __init__(self, config: dict) -> None:
+        """Initialize."""
+        self.config = config
+        self.api = loex_api()
+        self.api.host = config.get("host", self.api.host)
+        self.device_id = config["deviceId"]
+        self.data: dict | None = None
+        self.up = False
+        self.polls = 0
+        self.failures = 0
+        self.duration = 0.0
+        self.last_success: float | None = None
+
+    def poll(self) -> None:
+        """Fetch and parse input.json, logging in first when needed."""
+        start = time.monotonic()
+        self.polls += 1
+
+        try:
+            if self.api.session is None and not self.api.authenticate(
+                self.config["username"],
+                self.config["password"],
+                self.device_id,
+                self.config["plant"],
+            ):
+                raise CannotConnect("Authentication failed")
+
+            self.data = self.api.get_data()
+        except Exception as exception:  # noqa: BLE001
+            self.failures += 1
+            if self.up:
+                _LOGGER.warning("Poll of %s failed: %r", self.device_id, exception)
+            else:
+                _LOGGER.debug("Poll of %s failed: %r", self.device_id, exception)
+            self.up = False
+        else:
+            self.up = True
+            self.last_success = time.time()
+        finally:
+            self.duration = time.monotonic() - start
+
+
+class loex_exporter:
+    """Poll plants concurrently and keep their metrics rendered.
+
+    Every plant is polled in its own executor thread, the phases are spread
+    over the interval. The metrics are rendered after each poll into a buffer
+    the scrapes return as is.
+    """
+
+    def __init__(self, plants: list[dict], interval: float) -> None:
+        """Initialize."""
+        self.plants = [loex_headless_plant(config) for config in plants]
+        self.interval = interval
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(self.plants), 1), thread_name_prefix="loex_xsmart"
+        )
+        # Swapped as a whole, scrapes never see a partial rendering
+        self.metrics = self.render()
+
+    async def async_poll(self, plant: loex_headless_plant) -> None:
+        """Poll a plant and render the metrics."""
+        await asyncio.get_running_loop().run_in_executor(self._executor, plant.poll)
+        self.metrics = self.render()
+
+    async def async_poll_all(self) -> None:
+        """Poll all the plants once."""
+        await asyncio.gather(*(self.async_poll(plant) for plant in self.plants))
+
+    async def _async_poll_loop(self, plant: loex_headless_plant, phase: float):
+        """Poll a plant every interval, starting after its phase."""
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(phase)
+        next_poll = loop.time()
+
+        while True:
+            await self.async_poll(plant)
+            # A slow poll delays the next one instead of queueing them
+            next_poll = max(next_poll + self.interval, loop.time())
+            await asyncio.sleep(next_poll - loop.time())
+
+    async def async_run(self) -> None:
+        """Poll the plants until cancelled."""
+        await asyncio.gather(
+            *(
+                self._async_poll_loop(plant, index * self.interval / len(self.plants))
+                for index, plant in enumerate(self.plants)
+            )
+        )
+
+    def render(self) -> bytes:
+        """Render the metrics of all the plants in the text exposition format."""
+        lines = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def sample(name: str, labels: str, value) -> None:
+            if isinstance(value, (int, float)):
+                lines.append(f"{name}{{{labels}}} {float(value)!r}")
+
+        plant_labels = {
+            plant: _labels(device=plant.device_id, plant=plant.config["plant"])
+            for plant in self.plants
+        }
+
+        family("loex_up", "gauge", "Whether the last poll of the plant succeeded.")
+        for plant in self.plants:
+            sample("loex_up", plant_labels[plant], int(plant.up))
+
+        family("loex_polls_total", "counter", "Polls of the plant.")
+        for plant in self.plants:
+            sample("loex_polls_total", plant_labels[plant], plant.polls)
+
+        family("loex_poll_failures_total", "counter", "Failed polls of the plant.")
+        for plant in self.plants:
+            sample("loex_poll_failures_total", plant_labels[plant], plant.failures)
+
+        family("loex_poll_duration_seconds", "gauge", "Duration of the last poll.")
+        for plant in self.plants:
+            sample("loex_poll_duration_seconds", plant_labels[plant], plant.duration)
+
+        family(
+            "loex_last_success_timestamp_seconds",
+            "gauge",
+            "Time of the last successful poll.",
+        )
+        for plant in self.plants:
+            sample(
+                "loex_last_success_timestamp_seconds",
+                plant_labels[plant],
+                plant.last_success,
+            )
+
+        for name, (help_text, section, field) in _PLANT_GAUGES.items():
+            family(name, "gauge", help_text)
+            for plant in self.plants:
+                if plant.data is not None:
+                    sample(name, plant_labels[plant], plant.data[section][field])
+
+        rooms = [
+            (
+                plant,
+                room_id,
+                _labels(
+                    device=plant.device_id,
+                    plant=plant.config["plant"],
+                    room_id=room_id,
+                    room=plant.data[room_id]["room_name"],
+                ),
+            )
+            for plant in self.plants
+            if plant.data is not None
+            for room_id in range(MAX_ROOMS)
+            if plant.data[room_id]["validity"] == ROOM_VALIDITY_ACTIVE
+        ]
+
+        for name, (help_text, field) in _ROOM_GAUGES.items():
+            family(name, "gauge", help_text)
+            for plant, room_id, labels in rooms:
+                sample(name, labels, plant.data[room_id][field])
+
+        return ("\n".join(lines) + "\n").encode()
+
+    def serve(self, host: str, port: int) -> ThreadingHTTPServer:
+        """Serve the metrics over HTTP in a thread."""
+        exporter = self
+
+        class handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+
+                body = exporter.metrics
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                _LOGGER.debug(format, *args)
+
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        threading.Thread(
+            target=server.serve_forever, name="loex_xsmart_metrics", daemon=True
+        ).start()
+
+        return server
+
+    def close(self) -> None:
+        """Stop the executor and close the sessions."""
+        self._executor.shutdown(wait=False)
+
+        for plant in self.plants:
+            plant.api.release()
+            plant.api.hedge.close()
+            if plant.api.session is not None:
+                plant.api.session.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Poll the plants of a configuration file and serve their metrics."""
+    parser = argparse.ArgumentParser(
+        description="Poll Loex Xsmart plants and serve Prometheus metrics."
+    )
+    parser.add_argument("config", help="JSON file listing the plants")
+    parser.add_argument(
+        "--interval", type=float, default=DEFAULT_SYNC_INTERVAL, help="seconds"
+    )
+    parser.add_argument("--bind", default="", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_EXPORTER_PORT)
+    parser.add_argument(
+        "--once", action="store_true", help="poll once and print the metrics"
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    with open(args.config, encoding="utf-8") as config:
+        exporter = loex_exporter(json.load(config), args.interval)
+
+    if args.once:
+        asyncio.run(exporter.async_poll_all())
+        exporter.close()
+        sys.stdout.write(exporter.metrics.decode())
+        return
+
+    server = exporter.serve(args.bind, args.port)
+    _LOGGER.info("Serving the metrics of %s plants", len(exporter.plants))
+
+    try:
+        asyncio.run(exporter.async_run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        exporter.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Hedged reads of the Loex Xsmart cloud."""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import threading
+import time
+
+from .const import (
+    HEDGE_MAX_RATE,
+    HEDGE_MIN_DELAY,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+)
+
+# Number of latencies and fetches remembered
+_HISTORY = 100
+
+# Threads running the primary request and the hedge of a fetch
+_WORKERS = 2
+
+
+class _attempt:
+    """A request running on the worker pool."""
+
+    def __init__(self, request: Callable, hedge) -> None:
+        """Initialize."""
+        self.request = request
+        self.hedge = hedge
+        self.response = None
+        self.exception: Exception | None = None
+        self.start: float | None = None
+        self.end: float | None = None
+        # Set when the other attempt won, the response is thrown away
+        self.abandoned = False
+        # End of the hedge that beat this primary request
+        self.beaten_at: float | None = None
+
+    def run(self) -> None:
+        """Send the request."""
+        self.start = time.monotonic()
+
+        try:
+            self.response = self.request()
+        except Exception as exception:  # noqa: BLE001
+            self.exception = exception
+
+        with self.hedge.lock:
+            self.end = time.monotonic()
+            if self.exception is None:
+                self.hedge.latencies.append(self.end - self.start)
+            if self.abandoned:
+                self.hedge.discard(self)
+
+
+class loex_hedge:
+    """Issue a second request when the first one is slower than usual.
+
+    A hedge is sent once a request exceeds the HEDGE_PERCENTILE of the recent
+    latencies, at most for HEDGE_MAX_RATE of the fetches and only if allowed by
+    the caller, e.g. the rate limiter has a token. The first response wins, the
+    other one is closed when it arrives. Meant for idempotent requests only.
+    The requests that may be hedged run on two worker threads, closed by
+    close(), the others in the calling thread.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.lock = threading.Lock()
+        self.latencies: deque[float] = deque(maxlen=_HISTORY)
+        # Whether each recent fetch was hedged
+        self._hedged: deque[bool] = deque(maxlen=_HISTORY)
+        self.fetches = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        # Time saved by the winning hedges, known once the first request ends
+        self.saved = 0.0
+        # Runs the attempts of the fetches that may be hedged, started on demand
+        self._pool: ThreadPoolExecutor | None = None
+
+    def delay(self) -> float | None:
+        """Return how long a request runs before it is hedged, None to never hedge."""
+        with self.lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+
+            ordered = sorted(self.latencies)
+
+        return max(
+            HEDGE_MIN_DELAY, ordered[int(HEDGE_PERCENTILE * (len(ordered) - 1))]
+        )
+
+    def _may_hedge(self) -> bool:
+        """Return whether the hedge rate leaves room for another hedge."""
+        return sum(self._hedged) < HEDGE_MAX_RATE * max(len(self._hedged), 1)
+
+    def fetch(self, request: Callable, allow: Callable[[], bool]):
+        """Return the response of request, hedged if it is slow.
+
+        allow is called before a hedge is sent and may veto it. Exceptions of
+        the request are raised once no attempt can succeed anymore.
+        """
+        delay = self.delay()
+
+        with self.lock:
+            hedgeable = delay is not None and self._may_hedge()
+
+        if not hedgeable:
+            # Not enough samples yet or too many hedges already, run the
+            # request in the calling thread
+            start = time.monotonic()
+            response = request()
+
+            with self.lock:
+                self.latencies.append(time.monotonic() - start)
+                self.fetches += 1
+                self._hedged.append(False)
+
+            return response
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                _WORKERS, thread_name_prefix="loex_xsmart_hedge"
+            )
+
+        # The calling thread waits, free to return whichever response wins
+        primary = _attempt(request, self)
+        attempts = [primary]
+        pending = {self._pool.submit(primary.run)}
+
+        # The hedge is only sent once the primary request is late
+        if wait(pending, delay).not_done:
+            with self.lock:
+                hedge = primary.end is None and self._may_hedge()
+
+            if hedge and allow():
+                attempts.append(_attempt(request, self))
+                pending.add(self._pool.submit(attempts[-1].run))
+
+        with self.lock:
+            self.fetches += 1
+            self._hedged.append(len(attempts) > 1)
+            self.hedges += len(attempts) > 1
+
+        while True:
+            pending = wait(pending, return_when=FIRST_COMPLETED).not_done
+
+            with self.lock:
+                finished = [attempt for attempt in attempts if attempt.end is not None]
+                winner = next(
+                    (attempt for attempt in finished if attempt.exception is None),
+                    None,
+                )
+
+                if winner is None and len(finished) < len(attempts):
+                    # Wait for the other attempt
+                    continue
+
+                if winner is not None and winner is not primary:
+                    self.hedge_wins += 1
+                    primary.beaten_at = winner.end
+
+                for attempt in attempts:
+                    if attempt is not winner:
+                        attempt.abandoned = True
+                        if attempt.end is not None:
+                            self.discard(attempt)
+
+            if winner is None:
+                raise primary.exception
+
+            return winner.response
+
+    def discard(self, attempt: _attempt) -> None:
+        """Close the response of an attempt that lost, with the lock held."""
+        if attempt.beaten_at is not None:
+            self.saved += attempt.end - attempt.beaten_at
+            attempt.beaten_at = None
+
+        if attempt.response is not None:
+            attempt.response.close()
+            attempt.response = None
+
+    def close(self) -> None:
+        """Stop the worker threads, once their requests end."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def diagnostics(self) -> dict:
+        """Return the hedging statistics."""
+        delay = self.delay()
+
+        with self.lock:
+            return {
+                "delay": None if delay is None else round(delay, 3),
+                "samples": len(self.latencies),
+                "fetches": self.fetches,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "saved_seconds": round(self.saved, 3),
+            }
@@ -0,0 +1,469 @@
+"""Append-only compressed log of the Loex Xsmart polls."""
+
+from __future__ import annotations
+
+import argparse
+from array import array
+from collections.abc import Iterator
+import csv
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import zlib
+
+from .const import HISTORY_FILE_SEGMENTS, HISTORY_SEGMENT_ROWS
+
+_LOGGER = logging.getLogger(__name__)
+
+# Channel -> (section of the snapshot, field, scale to an integer)
+_CIRCUIT_CHANNELS = {
+    "ext_temp": ("external", "ext_temp", 10),
+    "home_temperature": ("circuit", "home_temperature", 10),
+    "home_humidity": ("circuit", "home_humidity", 10),
+    "circuit_temperature": ("circuit", "temperature", 10),
+    "comfort_temperature": ("circuit", "comfort_temperature", 10),
+    "eco_temperature": ("circuit", "eco_temperature", 10),
+    "circuit_mode": ("circuit", "mode", 1),
+    "circuit_state": ("circuit", "state", 1),
+}
+_ROOM_CHANNELS = {
+    "temperature": 10,
+    "target_temperature": 10,
+    "humidity": 10,
+    "output_valve": 1,
+    "room_mode": 1,
+}
+
+# Stored for the readings the snapshot does not have
+_MISSING = -(2**63)
+
+# Index record: first and last timestamp in ms, offset, length, rows
+_INDEX = struct.Struct("<qqQII")
+
+# Length prefix of the uncompressed segment header
+_HEADER_LENGTH = struct.Struct("<I")
+
+_DATA_SUFFIX = ".seg"
+_INDEX_SUFFIX = ".idx"
+
+
+def snapshot_values(data: dict, rooms: dict[int, str]) -> dict[str, int | None]:
+    """Return the integer readings of the active rooms and the circuit."""
+    values = {}
+
+    for channel, (section, field, scale) in _CIRCUIT_CHANNELS.items():
+        values[channel] = _scaled(data[section][field], scale)
+
+    for room_id in rooms:
+        for field, scale in _ROOM_CHANNELS.items():
+            values[f"room_{room_id}_{field}"] = _scaled(data[room_id][field], scale)
+
+    return values
+
+
+def _scaled(value, scale: int) -> int | None:
+    """Return a reading as an integer, e.g. deci-degrees, None when missing."""
+    if not isinstance(value, (int, float)) or (scale == 1 and value < 0):
+        # "N/A" and the -1 of the enumerations
+        return None
+
+    return round(value * scale)
+
+
+def _channel_scale(channel: str) -> int:
+    """Return the scale of a channel."""
+    if channel in _CIRCUIT_CHANNELS:
+        return _CIRCUIT_CHANNELS[channel][2]
+
+    return _ROOM_CHANNELS[channel.split("_", 2)[2]]
+
+
+def _to_le(values: array) -> bytes:
+    """Return the little endian bytes of an array."""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+
+    return values.tobytes()
+
+
+def _from_le(typecode: str, raw: bytes) -> array:
+    """Return the array of little endian bytes."""
+    values = array(typecode)
+    values.frombytes(raw)
+
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    return values
+
+
+def encode_segment(rows: list[tuple[int, dict[str, int | None]]]) -> bytes:
+    """Encode (timestamp in ms, readings) rows as a segment.
+
+    The header lists the channels and is left uncompressed, so readers can
+    plan an export without inflating the columns. Every column, timestamps
+    first, holds the first value then the deltas to the previous row, which
+    the readings of a slow thermal system make mostly zeros.
+    """
+    channels = sorted({channel for _, values in rows for channel in values})
+    header = json.dumps(
+        {
+            "rows": len(rows),
+            "channels": channels,
+            "scales": [_channel_scale(channel) for channel in channels],
+        },
+        separators=(",", ":"),
+    ).encode()
+
+    columns = [[timestamp for timestamp, _ in rows]] + [
+        [
+            _MISSING if values.get(channel) is None else values[channel]
+            for _, values in rows
+        ]
+        for channel in channels
+    ]
+
+    body = bytearray()
+    for column in columns:
+        deltas = array("q", column)
+        for row in range(len(column) - 1, 0, -1):
+            deltas[row] = column[row] - column[row - 1]
+        body += _to_le(deltas)
+
+    return _HEADER_LENGTH.pack(len(header)) + header + zlib.compress(body, 6)
+
+
+def segment_header(segment) -> dict:
+    """Return the header of an encoded segment."""
+    (length,) = _HEADER_LENGTH.unpack_from(segment)
+    start = _HEADER_LENGTH.size
+
+    return json.loads(bytes(segment[start : start + length]))
+
+
+def decode_segment(segment) -> Iterator[tuple[int, list[int | None]]]:
+    """Iterate over the (timestamp in ms, readings in header order) rows."""
+    header = segment_header(segment)
+    rows = header["rows"]
+    start = _HEADER_LENGTH.size + _HEADER_LENGTH.unpack_from(segment)[0]
+    body = zlib.decompress(segment[start:])
+    columns = []
+
+    for index in range(len(header["channels"]) + 1):
+        column = _from_le("q", body[index * rows * 8 : (index + 1) * rows * 8])
+        for row in range(1, rows):
+            column[row] += column[row - 1]
+        columns.append(column)
+
+    for row in range(rows):
+        yield columns[0][row], [
+            None if column[row] == _MISSING else column[row] for column in columns[1:]
+        ]
+
+
+class loex_history:
+    """Append the snapshots of a plant to a bounded on-disk log.
+
+    Rows are buffered in memory and written as a segment of
+    HISTORY_SEGMENT_ROWS rows, or fewer when the log is flushed. A data file
+    holds HISTORY_FILE_SEGMENTS segments and its index file one fixed-size
+    record per segment. The oldest files are removed once the log exceeds
+    max_bytes. add is cheap and safe in the event loop, the other methods are
+    blocking and meant to run in the executor.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        """Initialize."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._rows: list[tuple[int, dict[str, int | None]]] = []
+        self._lock = threading.Lock()
+        self.segments_written = 0
+        self.files_removed = 0
+
+        os.makedirs(directory, exist_ok=True)
+        # Data file path without suffix -> size of the data and index files
+        self._files: dict[str, int] = {}
+
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(_DATA_SUFFIX):
+                base = os.path.join(directory, name[: -len(_DATA_SUFFIX)])
+                self._files[base] = self._repair(base)
+
+    @staticmethod
+    def _repair(base: str) -> int:
+        """Drop what an interrupted write left after the last indexed segment.
+
+        Returns the size of the data and index files.
+        """
+        end = 0
+
+        with open(base + _INDEX_SUFFIX, "ab+") as index:
+            records = index.seek(0, os.SEEK_END) // _INDEX.size
+            index.truncate(records * _INDEX.size)
+
+            if records:
+                index.seek((records - 1) * _INDEX.size)
+                _, _, offset, length, _ = _INDEX.unpack(index.read(_INDEX.size))
+                end = offset + length
+
+        with open(base + _DATA_SUFFIX, "ab+") as data:
+            if data.seek(0, os.SEEK_END) > end:
+                _LOGGER.debug("Truncating the interrupted segment of %s", base)
+                data.truncate(end)
+
+        return end + records * _INDEX.size
+
+    def add(self, timestamp: float, values: dict[str, int | None]) -> bool:
+        """Buffer a row, return whether a full segment is waiting for flush."""
+        with self._lock:
+            self._rows.append((round(timestamp * 1000), values))
+            return len(self._rows) >= HISTORY_SEGMENT_ROWS
+
+    def flush(self) -> None:
+        """Write the buffered rows as segments."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+
+            for start in range(0, len(rows), HISTORY_SEGMENT_ROWS):
+                self._append(rows[start : start + HISTORY_SEGMENT_ROWS])
+
+            if rows:
+                self._rotate()
+
+    def _append(self, rows: list[tuple[int, dict[str, int | None]]]) -> None:
+        """Append a segment and its index record."""
+        base = next(reversed(self._files), None)
+
+        if (
+            base is None
+            or os.path.getsize(base + _INDEX_SUFFIX)
+            >= HISTORY_FILE_SEGMENTS * _INDEX.size
+        ):
+            base = os.path.join(self.directory, f"{rows[0][0]:015d}")
+            self._files[base] = 0
+
+        segment = encode_segment(rows)
+
+        with open(base + _DATA_SUFFIX, "ab") as data:
+            offset = data.tell()
+            data.write(segment)
+            data.flush()
+            os.fsync(data.fileno())
+
+        # The index is written last, a segment without a record is dropped
+        with open(base + _INDEX_SUFFIX, "ab") as index:
+            index.write(
+                _INDEX.pack(rows[0][0], rows[-1][0], offset, len(segment), len(rows))
+            )
+
+        self._files[base] += len(segment) + _INDEX.size
+        self.segments_written += 1
+
+    def _rotate(self) -> None:
+        """Remove the oldest files while the log exceeds its size."""
+        # The file being appended to is never removed
+        for base in list(self._files)[:-1]:
+            if sum(self._files.values()) <= self.max_bytes:
+                break
+
+            os.remove(base + _INDEX_SUFFIX)
+            os.remove(base + _DATA_SUFFIX)
+            del self._files[base]
+            self.files_removed += 1
+            _LOGGER.debug("Removed %s from the poll log", base)
+
+    def close(self) -> None:
+        """Write the rows still buffered."""
+        self.flush()
+
+    def diagnostics(self) -> dict:
+        """Return the size of the log."""
+        return {
+            "files": len(self._files),
+            "bytes": sum(self._files.values()),
+            "max_bytes": self.max_bytes,
+            "buffered_rows": len(self._rows),
+            "segments_written": self.segments_written,
+            "files_removed": self.files_removed,
+        }
+
+
+def _segments(
+    directory: str, start: int | None, end: int | None
+) -> Iterator[tuple[str, int, int]]:
+    """Iterate over the (data file, offset, length) segments overlapping a range."""
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(_INDEX_SUFFIX):
+            continue
+
+        base = os.path.join(directory, name[: -len(_INDEX_SUFFIX)])
+        with open(base + _INDEX_SUFFIX, "rb") as index:
+            records = index.read()
+
+        for first, last, offset, length, _ in _INDEX.iter_unpack(
+            records[: len(records) - len(records) % _INDEX.size]
+        ):
+            if (start is None or last >= start) and (end is None or first < end):
+                yield base + _DATA_SUFFIX, offset, length
+
+
+def _read_segment(path: str, offset: int, length: int) -> bytes:
+    """Return a segment of a data file, mapping only its pages."""
+    # Only the readers map the files, the poll log itself does not need mmap
+    import mmap  # pylint: disable=import-outside-toplevel
+
+    aligned = offset - offset % mmap.ALLOCATIONGRANULARITY
+
+    with open(path, "rb") as data, mmap.mmap(
+        data.fileno(),
+        offset - aligned + length,
+        access=mmap.ACCESS_READ,
+        offset=aligned,
+    ) as mapped:
+        return mapped[offset - aligned :]
+
+
+def read_history(
+    directory: str, start: float | None = None, end: float | None = None
+) -> Iterator[tuple[float, dict[str, float]]]:
+    """Iterate over the (timestamp, readings) rows of a time range.
+
+    Only the segments overlapping [start, end) are read, one at a time.
+    Readings are scaled back to their units, missing ones are left out.
+    """
+    start_ms = None if start is None else round(start * 1000)
+    end_ms = None if end is None else round(end * 1000)
+
+    for path, offset, length in _segments(directory, start_ms, end_ms):
+        segment = _read_segment(path, offset, length)
+        header = segment_header(segment)
+
+        for timestamp, values in decode_segment(segment):
+            if (start_ms is None or timestamp >= start_ms) and (
+                end_ms is None or timestamp < end_ms
+            ):
+                yield timestamp / 1000, {
+                    channel: value / scale if scale != 1 else value
+                    for channel, scale, value in zip(
+                        header["channels"], header["scales"], values
+                    )
+                    if value is not None
+                }
+
+
+def history_channels(
+    directory: str, start: float | None = None, end: float | None = None
+) -> list[str]:
+    """Return the channels of the segments overlapping a time range."""
+    channels = set()
+
+    for path, offset, length in _segments(
+        directory,
+        None if start is None else round(start * 1000),
+        None if end is None else round(end * 1000),
+    ):
+        channels.update(segment_header(_read_segment(path, offset, length))["channels"])
+
+    return sorted(channels)
+
+
+def export_history(
+    directory: str,
+    path: str,
+    start: float | None = None,
+    end: float | None = None,
+    file_format: str = "csv",
+) -> int:
+    """Stream a time range of the log to a CSV or Parquet file, return the rows.
+
+    Parquet needs pyarrow, which is not a requirement of the integration.
+    """
+    channels = history_channels(directory, start, end)
+    rows = 0
+
+    if file_format == "parquet":
+        # pylint: disable-next=import-outside-toplevel
+        import pyarrow as pa
+        from pyarrow import parquet  # pylint: disable=import-outside-toplevel
+
+        schema = pa.schema(
+            [("timestamp", pa.timestamp("ms", tz="UTC"))]
+            + [(channel, pa.float64()) for channel in channels]
+        )
+        batch: list[tuple[float, dict[str, float]]] = []
+
+        def write_batch(writer) -> None:
+            writer.write_table(
+                pa.table(
+                    [[round(timestamp * 1000) for timestamp, _ in batch]]
+                    + [
+                        [values.get(channel) for _, values in batch]
+                        for channel in channels
+                    ],
+                    schema=schema,
+                )
+            )
+            batch.clear()
+
+        with parquet.ParquetWriter(path, schema) as writer:
+            for row in read_history(directory, start, end):
+                batch.append(row)
+                rows += 1
+                if len(batch) >= HISTORY_SEGMENT_ROWS:
+                    write_batch(writer)
+
+            if batch:
+                write_batch(writer)
+
+        return rows
+
+    with open(path, "w", encoding="utf-8", newline="") as export:
+        writer = csv.writer(export)
+        writer.writerow(["timestamp", *channels])
+
+        for timestamp, values in read_history(directory, start, end):
+            writer.writerow(
+                [
+                    datetime.fromtimestamp(timestamp, timezone.utc).isoformat(),
+                    *(values.get(channel, "") for channel in channels),
+                ]
+            )
+            rows += 1
+
+    return rows
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Export a poll log from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Export a Loex Xsmart poll log to CSV or Parquet."
+    )
+    parser.add_argument("directory", help="directory of the poll log")
+    parser.add_argument("output", help="file to write")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="ISO time")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="ISO time")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    args = parser.parse_args(argv)
+
+    try:
+        rows = export_history(
+            args.directory,
+            args.output,
+            args.start and args.start.timestamp(),
+            args.end and args.end.timestamp(),
+            args.format,
+        )
+    except ImportError:
+        parser.error("Parquet export needs the pyarrow package")
+
+    print(f"{rows} rows written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
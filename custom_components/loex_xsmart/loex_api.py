@@ -2,39 +2,110 @@
 
 from __future__ import annotations
 
+from contextvars import ContextVar
 import json
 import logging
+import threading
+import time
 import urllib.parse
 
 import requests
 
-from homeassistant.exceptions import HomeAssistantError
+try:
+    from homeassistant.exceptions import HomeAssistantError
+except ImportError:  # pragma: no cover
+
+    class HomeAssistantError(Exception):  # type: ignore[no-redef]
+        """Base error when the API is used without Home Assistant."""
+
 
 from .const import (
     MAX_ROOMS,
+    WRITE_RATE_LIMIT_WAIT,
+    WRITE_TIMEOUT,
     LoexCircuitMode,
     LoexCircuitState,
     LoexRoomMode,
     LoexSeason,
 )
+from .hedge import loex_hedge
+from .ratelimit import get_rate_limiter
+from .tracing import span
 
 _LOGGER = logging.getLogger(__name__)
 
 _ENDPOINT = "https://xsmart.loex.it"
 
+# Circuit fields only optional entities read, decoded while in decode_fields:
+# field -> (register, scale)
+OPTIONAL_CIRCUIT_FIELDS = {
+    "deumidification_active": (10107, 1),
+    "histeresys_humidity": (18082, 10),
+}
+
+# Separator of the device ids of a config entry holding several controllers
+DEVICE_ID_SEPARATOR = ","
+
+
+def parse_device_ids(text: str) -> list[str]:
+    """Return the device ids of a "A1B2, C3D4" list, in order and deduplicated."""
+    device_ids = [device_id.strip() for device_id in text.split(DEVICE_ID_SEPARATOR)]
+
+    return list(dict.fromkeys(device_id for device_id in device_ids if device_id))
+
+
+class loex_deadline:
+    """Time budget of a write, shared with the executor thread sending it."""
+
+    def __init__(self, budget: float) -> None:
+        """Initialize."""
+        self.expires = time.monotonic() + budget
+        # Set when the caller stopped waiting, the write must not be sent anymore
+        self.cancelled = threading.Event()
+        # Payload sent to the cloud, queued in the outbox when it is unreachable
+        self.payload: str | None = None
+
+    def remaining(self) -> float:
+        """Return the seconds left."""
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def check(self) -> None:
+        """Raise if the write was abandoned or ran out of time."""
+        if self.cancelled.is_set():
+            raise WriteCancelled
+        if self.remaining() <= 0:
+            raise WriteTimeout
+
+
+# Deadline of the write running in the current context, executor jobs must run
+# in a copy of the context
+write_deadline: ContextVar[loex_deadline | None] = ContextVar(
+    "loex_xsmart_write_deadline", default=None
+)
+
 
 class loex_api:
     """Loex API class."""
 
-    def __init__(self) -> None:
-        """Initialize."""
+    def __init__(self, session: requests.Session | None = None) -> None:
+        """Initialize, sharing the HTTP session of another device if given."""
         self.host = _ENDPOINT
         self.authorization = None
         self.device_id = None
         self.username = None
         self.password = None
         self.plant = None
-        self.session = None
+        # Kept across logins, so the devices of an entry share its connections
+        self.session = session
+        # Optional loex_capture recording the raw payloads
+        self.capture = None
+        # Token bucket shared with the other plants of the account
+        self.limiter = None
+        # Whether the plant is counted in the budget of the account
+        self._counted = False
+        self.hedge = loex_hedge()
+        # Optional fields to decode, replaced as a whole by the coordinator
+        self.decode_fields: frozenset[str] = frozenset()
 
     def authenticate(
         self, username: str, password: str, device_id: str, plant: str
@@ -44,7 +115,20 @@ class loex_api:
             self.host + "/jwt/?id=" + device_id + "&plant=" + urllib.parse.quote(plant)
         )
 
-        self.session = requests.Session()
+        # Only logins again are charged, so setting up many plants at once does
+        # not use up the budget of their first polls
+        relogin = self.authorization is not None
+        # Kept even if the login fails, the polls of the device log in again
+        self.username = username
+        self.password = password
+        self.device_id = device_id
+        self.plant = plant
+        self.limiter = get_rate_limiter(username, self.host)
+        if relogin and not self.limiter.acquire_write(WRITE_RATE_LIMIT_WAIT):
+            raise RateLimited
+
+        if self.session is None:
+            self.session = requests.Session()
         response = self.session.get(
             url,
             auth=(username, password),
@@ -52,54 +136,108 @@ class loex_api:
         )
 
         if response.status_code == 200:
-            self.username = username
-            self.password = password
-            self.device_id = device_id
-            self.plant = plant
             self.authorization = response.text
+            if not self._counted:
+                self.limiter.add_plant()
+                self._counted = True
             return True
 
         self.session = None
 
         return False
 
+    def release(self) -> None:
+        """Stop counting the plant in the budget of its account."""
+        if self._counted:
+            self.limiter.remove_plant()
+            self._counted = False
+
     def get_data(self) -> dict:
         """Get data."""
         url = self.host + "/" + self.device_id + "/input.json"
 
-        try:
-            data = self.session.get(
-                url,
-                headers={"Authorization": self.authorization},
-                timeout=10,
-            )
+        # The device did not answer its first login
+        if self.authorization is None and not self.authenticate(
+            self.username, self.password, self.device_id, self.plant
+        ):
+            raise CannotConnect
+
+        if not self.limiter.acquire_poll():
+            raise RateLimited
 
-            return self.extract_from_api_data(data.json())
+        try:
+            with span("http", method="GET"):
+                # Reads are idempotent, a slow one is hedged with a second request
+                data = self.hedge.fetch(
+                    lambda: self.session.get(
+                        url,
+                        headers={"Authorization": self.authorization},
+                        timeout=10,
+                    ),
+                    self.limiter.acquire_poll,
+                )
+
+                body = data.json()
+
+            if self.capture is not None:
+                self.capture.record_input(body)
+
+            with span("parse"):
+                return self.extract_from_api_data(body)
         except requests.exceptions.RequestException as excep:
             self.session.close()
             self.authenticate(self.username, self.password, self.device_id, self.plant)
             raise CannotConnect from excep
 
     def save_data(self, payload):
-        """Save data."""
+        """Save data, within the deadline of the current write if any."""
         url = self.host + "/" + self.device_id + "/output.json"
+        deadline = write_deadline.get()
+        wait = WRITE_RATE_LIMIT_WAIT
+        timeout = WRITE_TIMEOUT
 
-        try:
-            response = self.session.post(
-                url,
-                data=payload,
-                headers={"Content-Type": "text/plain"},
-                auth=(self.username, self.password),
-            )
+        if deadline is not None:
+            deadline.check()
+            wait = min(wait, deadline.remaining())
 
+        if not self.limiter.acquire_write(wait):
+            if deadline is not None:
+                deadline.check()
+            raise RateLimited
+
+        if deadline is not None:
+            # The caller may have given up while the write waited for a token
+            deadline.check()
+            timeout = min(timeout, deadline.remaining())
+            deadline.payload = payload
+
+        try:
+            with span("http", method="POST", payload=payload):
+                response = self.session.post(
+                    url,
+                    data=payload,
+                    headers={"Content-Type": "text/plain"},
+                    auth=(self.username, self.password),
+                    timeout=timeout,
+                )
+
+        except requests.exceptions.Timeout as excep:
+            # A new login would hold the thread even longer
+            raise WriteTimeout from excep
         except requests.exceptions.RequestException as excep:
             self.session.close()
             self.authenticate(self.username, self.password, self.device_id, self.plant)
             raise CannotConnect from excep
 
+        if response.status_code in (401, 403):
+            raise WriteUnauthorized
         if response.status_code != 200:
             raise WriteToRemoteDeviceError
 
+        # Only the writes the plant took
+        if self.capture is not None:
+            self.capture.record_output(payload)
+
     def parse_external_data(self, data: json) -> dict:
         """Parse external data."""
         external_data = {}
@@ -168,20 +306,21 @@ class loex_api:
         except KeyError:
             circuit_data["state"] = LoexCircuitState.LOEX_STATE_NA
 
-        try:
-            circuit_data["deumidification_active"] = data["t" + str(10107)]
-        except KeyError:
-            circuit_data["deumidification_active"] = "N/A"
-
         try:
             circuit_data["target_humidity"] = data["t" + str(18081)] / 10
         except KeyError:
             circuit_data["target_humidity"] = "N/A"
 
-        try:
-            circuit_data["histeresys_humidity"] = data["t" + str(18082)] / 10
-        except KeyError:
-            circuit_data["histeresys_humidity"] = "N/A"
+        for field, (register, scale) in OPTIONAL_CIRCUIT_FIELDS.items():
+            if field not in self.decode_fields:
+                continue
+
+            try:
+                value = data["t" + str(register)]
+            except KeyError:
+                circuit_data[field] = "N/A"
+            else:
+                circuit_data[field] = value if scale == 1 else value / scale
 
         try:
             if data["t" + str(10042)] == 1 and data["t" + str(10043)] == 0:
@@ -306,3 +445,19 @@ class CannotConnect(HomeAssistantError):
 
 class WriteToRemoteDeviceError(HomeAssistantError):
     """Error to indicate we cannot connect."""
+
+
+class WriteUnauthorized(WriteToRemoteDeviceError):
+    """Error to indicate the cloud rejected the credentials of a write."""
+
+
+class WriteTimeout(HomeAssistantError):
+    """Error to indicate a write did not complete within its deadline."""
+
+
+class WriteCancelled(HomeAssistantError):
+    """Error to indicate a write was abandoned before it was sent."""
+
+
+class RateLimited(HomeAssistantError):
+    """Error to indicate the account request budget is exhausted."""
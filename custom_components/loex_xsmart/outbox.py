@@ -0,0 +1,162 @@
+"""Durable outbox of the Loex Xsmart writes the cloud could not take."""
+
+from __future__ import annotations
+
+import logging
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+
+from .const import DEFAULT_OUTBOX_TTL, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Delay before the outbox is written to storage
+_SAVE_DELAY = 1  # seconds
+
+
+def payload_register(payload: str) -> str:
+    """Return the register a "register=value" payload writes."""
+    return payload.partition("=")[0]
+
+
+class loex_outbox:
+    """Writes queued during a cloud outage, replayed once it is over.
+
+    A register keeps only its last value, so a replay sends every register
+    once with the value last asked for. Writes older than the time to live
+    are dropped instead of replayed. The queue survives restarts.
+    """
+
+    def __init__(self, hass: HomeAssistant, device_id: str) -> None:
+        """Initialize."""
+        self.hass = hass
+        self._store = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.outbox.{slugify(device_id)}"
+        )
+        self.ttl = DEFAULT_OUTBOX_TTL * 60
+        # register -> {"payload", "operation", "queued"}, oldest write first
+        self._pending: dict[str, dict] = {}
+        self.queued = 0
+        self.collapsed = 0
+        self.expired = 0
+        self.replayed = 0
+
+    async def async_load(self) -> None:
+        """Restore the writes queued before a restart."""
+        stored = await self._store.async_load()
+
+        if stored:
+            self._pending = {
+                payload_register(write["payload"]): write for write in stored["pending"]
+            }
+            self.async_expire()
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Return the state to save."""
+        return {"pending": list(self._pending.values())}
+
+    @callback
+    def _async_changed(self) -> None:
+        """Save the queue soon."""
+        self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+
+    def __len__(self) -> int:
+        """Return the number of queued writes."""
+        return len(self._pending)
+
+    @callback
+    def async_queue(
+        self, payload: str, operation: str, queued: float | None = None
+    ) -> None:
+        """Queue a write, replacing the one queued for the same register.
+
+        A write queued again after a failed replay keeps its original time, and
+        is dropped when a newer write was queued for the register since.
+        """
+        register = payload_register(payload)
+        current = self._pending.get(register)
+
+        if queued is None:
+            queued = time.time()
+            self.queued += 1
+            self.collapsed += current is not None
+        elif current is not None:
+            # Older than the write queued since
+            return
+
+        if current is not None:
+            # Replayed in the order of the last writes
+            del self._pending[register]
+
+        self._pending[register] = {
+            "payload": payload,
+            "operation": operation,
+            "queued": queued,
+        }
+        _LOGGER.debug("Queued %s (%s) until the cloud is reachable", payload, operation)
+        self._async_changed()
+
+    @callback
+    def async_discard(self, payload: str) -> None:
+        """Drop the write queued for a register written since."""
+        if self._pending.pop(payload_register(payload), None) is not None:
+            self._async_changed()
+
+    @callback
+    def async_expire(self) -> None:
+        """Drop the writes older than the time to live."""
+        now = time.time()
+
+        for register, write in list(self._pending.items()):
+            if now - write["queued"] > self.ttl:
+                _LOGGER.warning(
+                    "Dropped %s (%s), the cloud was unreachable for %.0f minutes",
+                    write["payload"],
+                    write["operation"],
+                    (now - write["queued"]) / 60,
+                )
+                del self._pending[register]
+                self.expired += 1
+                self._async_changed()
+
+    @callback
+    def async_take(self) -> list[dict]:
+        """Return the writes to replay and empty the queue."""
+        self.async_expire()
+        writes = list(self._pending.values())
+
+        if writes:
+            self._pending.clear()
+            self._async_changed()
+
+        return writes
+
+    async def async_save(self) -> None:
+        """Save the queue now."""
+        await self._store.async_save(self._data_to_save())
+
+    def diagnostics(self) -> dict:
+        """Return the pending writes and the outbox statistics."""
+        now = time.time()
+
+        return {
+            "ttl": self.ttl,
+            "pending": [
+                {
+                    "payload": write["payload"],
+                    "operation": write["operation"],
+                    "age": round(now - write["queued"]),
+                }
+                for write in self._pending.values()
+            ],
+            "queued": self.queued,
+            "collapsed": self.collapsed,
+            "expired": self.expired,
+            "replayed": self.replayed,
+        }
@@ -0,0 +1,145 @@
+"""On-demand profiler for the Loex Xsmart Integration code paths."""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+_LOGGER = logging.getLogger(__name__)
+
+# Only frames from files in this directory are accounted, except the profiler
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROFILER_FILE = os.path.abspath(__file__)
+
+# Frames kept by tracemalloc for every allocation
+_TRACEMALLOC_FRAMES = 10
+
+# Rows shown in every table of the report
+_TOP = 25
+
+
+class loex_profiler:
+    """Sampling CPU profiler and allocation tracker limited to this integration.
+
+    Nothing is hooked into the interpreter until start() is called, so the
+    profiler has no cost while it is not running. All methods are blocking.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        """Initialize."""
+        self.interval = interval
+        self.samples = 0
+        self.hits = 0
+        self.self_counts: Counter = Counter()
+        self.total_counts: Counter = Counter()
+        self._started_tracemalloc = False
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_time = None
+
+    def start(self) -> None:
+        """Start sampling and allocation tracking."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(_TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+
+        self._start_time = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name="loex_xsmart_profiler", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Sample the stack of every thread until stopped."""
+        own_id = threading.get_ident()
+
+        while not self._stop_event.wait(self.interval):
+            self.samples += 1
+
+            for thread_id, frame in sys._current_frames().items():  # pylint: disable=protected-access
+                if thread_id == own_id:
+                    continue
+
+                self._sample(frame)
+
+    def _sample(self, frame) -> None:
+        """Account one stack sample."""
+        seen = set()
+        innermost = None
+
+        while frame is not None:
+            code = frame.f_code
+
+            if (
+                code.co_filename.startswith(PACKAGE_DIR)
+                and code.co_filename != _PROFILER_FILE
+            ):
+                key = (
+                    os.path.basename(code.co_filename),
+                    code.co_firstlineno,
+                    code.co_name,
+                )
+                if innermost is None:
+                    innermost = key
+                seen.add(key)
+
+            frame = frame.f_back
+
+        if innermost is None:
+            return
+
+        self.hits += 1
+        self.self_counts[innermost] += 1
+        self.total_counts.update(seen)
+
+    def stop(self) -> str:
+        """Stop profiling and return the text report."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        duration = time.monotonic() - self._start_time
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(True, os.path.join(PACKAGE_DIR, "*")),
+                tracemalloc.Filter(False, _PROFILER_FILE),
+            ]
+        )
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        return self._report(duration, snapshot)
+
+    def _report(self, duration: float, snapshot) -> str:
+        """Format the report."""
+        lines = [
+            f"Loex Xsmart profile - {datetime.now().isoformat(timespec='seconds')}",
+            f"Duration: {duration:.1f} s, sampling interval: {self.interval * 1000:.1f} ms",
+            f"Samples: {self.samples}, samples in integration code: {self.hits}",
+            "",
+            "CPU samples by function (self / total):",
+        ]
+
+        for key, total in self.total_counts.most_common(_TOP):
+            filename, line, name = key
+            lines.append(
+                f"{self.self_counts[key]:8d} {total:8d}  {name} ({filename}:{line})"
+            )
+
+        lines.extend(["", "Allocations by line (size / count):"])
+
+        for stat in snapshot.statistics("lineno")[:_TOP]:
+            frame = stat.traceback[0]
+            lines.append(
+                f"{stat.size / 1024:8.1f} KiB {stat.count:8d}  "
+                f"{os.path.basename(frame.filename)}:{frame.lineno}"
+            )
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,170 @@
+"""Account-wide rate limiting of the requests sent to the Loex cloud."""
+
+from __future__ import annotations
+
+from collections import deque
+import threading
+import time
+
+from .const import (
+    RATE_LIMIT_CAPACITY,
+    RATE_LIMIT_RATE,
+    RATE_LIMIT_WRITE_RESERVE,
+)
+
+# Window used to report the recent request rate
+_USAGE_WINDOW = 60  # seconds
+
+_LIMITERS: dict[tuple[str, str], loex_rate_limiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+class loex_rate_limiter:
+    """Token bucket shared by all the loex_api instances of an account.
+
+    Writes and logins have priority over polls: they may use the whole bucket
+    and wait for a token, while polls are shed as soon as the bucket falls to
+    the write reserve or a write is waiting. The rate and the capacity are those
+    of one plant, multiplied by the number of plants using the account. Methods
+    are blocking and thread safe.
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_RATE,
+        capacity: int = RATE_LIMIT_CAPACITY,
+        write_reserve: int = RATE_LIMIT_WRITE_RESERVE,
+        clock=time.monotonic,
+    ) -> None:
+        """Initialize."""
+        # Budget of a single plant
+        self.plant_rate = rate
+        self.plant_capacity = capacity
+        self.plants = 0
+        self.rate = rate
+        self.capacity = capacity
+        self.write_reserve = write_reserve
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._condition = threading.Condition()
+        self._writers_waiting = 0
+        self._recent: deque[float] = deque()
+        self.stats = {
+            "polls": 0,
+            "polls_shed": 0,
+            "writes": 0,
+            "writes_delayed": 0,
+            "writes_rejected": 0,
+        }
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens earned since the last update."""
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def _take(self, now: float) -> None:
+        """Consume a token."""
+        self._tokens -= 1
+        self._recent.append(now)
+        self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        """Forget the requests older than the usage window."""
+        while self._recent and self._recent[0] < now - _USAGE_WINDOW:
+            self._recent.popleft()
+
+    def _resize(self, plants: int) -> None:
+        """Scale the bucket to a number of plants, a new plant's share is full."""
+        now = self._clock()
+        self._refill(now)
+        capacity = self.plant_capacity * max(plants, 1)
+
+        self._tokens = min(capacity, self._tokens + max(capacity - self.capacity, 0))
+        self.plants = plants
+        self.rate = self.plant_rate * max(plants, 1)
+        self.capacity = capacity
+        self._condition.notify_all()
+
+    def add_plant(self) -> None:
+        """Count a plant using the account in the budget."""
+        with self._condition:
+            self._resize(self.plants + 1)
+
+    def remove_plant(self) -> None:
+        """Stop counting a plant no longer using the account."""
+        with self._condition:
+            self._resize(max(self.plants - 1, 0))
+
+    def acquire_poll(self) -> bool:
+        """Take a token for a poll, return False if the poll must be shed."""
+        with self._condition:
+            now = self._clock()
+            self._refill(now)
+
+            if self._writers_waiting or self._tokens < self.write_reserve + 1:
+                self.stats["polls_shed"] += 1
+                return False
+
+            self._take(now)
+            self.stats["polls"] += 1
+            return True
+
+    def acquire_write(self, timeout: float) -> bool:
+        """Take a token for a write or a login, waiting up to timeout seconds."""
+        with self._condition:
+            now = self._clock()
+            self._refill(now)
+            deadline = now + timeout
+
+            if self._tokens < 1:
+                self.stats["writes_delayed"] += 1
+                self._writers_waiting += 1
+                try:
+                    while self._tokens < 1:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self.stats["writes_rejected"] += 1
+                            return False
+
+                        self._condition.wait(
+                            min(remaining, (1 - self._tokens) / self.rate)
+                        )
+                        now = self._clock()
+                        self._refill(now)
+                finally:
+                    self._writers_waiting -= 1
+
+            self._take(now)
+            self.stats["writes"] += 1
+            return True
+
+    def diagnostics(self) -> dict:
+        """Return the current budget usage."""
+        with self._condition:
+            now = self._clock()
+            self._refill(now)
+            self._trim(now)
+
+            return {
+                "plants": self.plants,
+                "rate_per_second": self.rate,
+                "capacity": self.capacity,
+                "write_reserve": self.write_reserve,
+                "tokens": round(self._tokens, 2),
+                "requests_last_minute": len(self._recent),
+                **self.stats,
+            }
+
+
+def get_rate_limiter(username: str, host: str) -> loex_rate_limiter:
+    """Return the rate limiter shared by an account on a host."""
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get((username, host))
+
+        if limiter is None:
+            limiter = _LIMITERS[(username, host)] = loex_rate_limiter()
+
+        return limiter
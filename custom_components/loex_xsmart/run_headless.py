@@ -0,0 +1,24 @@
+"""Run the headless poller of headless.py without Home Assistant.
+
+    python custom_components/loex_xsmart/run_headless.py plants.json --port 9651
+
+The sibling modules are imported as a package, without the Home Assistant
+setup of __init__.py. Importing this module does nothing.
+"""
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import types
+
+    _DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+    # statistics.py and the like would shadow the standard library
+    sys.path = [path for path in sys.path if os.path.abspath(path) != _DIRECTORY]
+
+    sys.modules["loex_xsmart"] = types.ModuleType("loex_xsmart")
+    sys.modules["loex_xsmart"].__path__ = [_DIRECTORY]
+
+    # pylint: disable-next=import-error
+    from loex_xsmart.headless import main
+
+    main()
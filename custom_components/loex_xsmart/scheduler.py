@@ -0,0 +1,165 @@
+"""Staggered polling of the Loex Xsmart plants."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import logging
+import math
+import random
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, POLL_PHASE_JITTER
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_SCHEDULER = f"{DOMAIN}_scheduler"
+
+
+class loex_scheduler:
+    """Spread the polls of the coordinators sharing a host.
+
+    The plants of all the accounts of a host load it together, they form one
+    group. The coordinators of a group get evenly spaced phases within their
+    poll interval, with a little jitter, and the phases are rebalanced whenever
+    a coordinator joins or leaves the group. A coordinator that knows the
+    refresh cadence of its cloud data is polled just after each refresh.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self.hass = hass
+        self._groups: dict[str, list] = {}
+        # coordinator -> phase, as a fraction of its poll interval
+        self._phases: dict = {}
+        self._next: dict = {}
+        self._unsubs: dict = {}
+        self._tasks: dict = {}
+
+    @staticmethod
+    def _group_key(coordinator) -> str:
+        """Return the group of a coordinator."""
+        return coordinator.api.host
+
+    @callback
+    def async_add(self, coordinator) -> CALLBACK_TYPE:
+        """Start polling a coordinator, return a callback to stop it."""
+        group = self._groups.setdefault(self._group_key(coordinator), [])
+        group.append(coordinator)
+        coordinator.scheduler = self
+        self._async_rebalance(group)
+
+        @callback
+        def remove() -> None:
+            self._async_remove(coordinator)
+
+        return remove
+
+    @callback
+    def _async_remove(self, coordinator) -> None:
+        """Stop polling a coordinator."""
+        key = self._group_key(coordinator)
+        group = self._groups[key]
+        group.remove(coordinator)
+        coordinator.scheduler = None
+
+        self._async_cancel(coordinator)
+        self._phases.pop(coordinator, None)
+        self._next.pop(coordinator, None)
+        self._tasks.pop(coordinator, None)
+
+        if group:
+            self._async_rebalance(group)
+        else:
+            del self._groups[key]
+
+    @callback
+    def _async_rebalance(self, group: list) -> None:
+        """Assign evenly spaced phases to the coordinators of a group."""
+        slot = 1 / len(group)
+
+        for position, coordinator in enumerate(group):
+            jitter = random.uniform(-POLL_PHASE_JITTER, POLL_PHASE_JITTER) * slot
+            self._phases[coordinator] = (position * slot + jitter) % 1
+            self.async_reschedule(coordinator)
+
+    @callback
+    def _async_cancel(self, coordinator) -> None:
+        """Cancel the next poll of a coordinator."""
+        unsub = self._unsubs.pop(coordinator, None)
+        if unsub is not None:
+            unsub()
+
+    def _next_poll(self, coordinator, now: datetime) -> datetime:
+        """Return the next poll time, aligned on the cloud data refresh if known.
+
+        Otherwise the poll matches the coordinator phase.
+        """
+        interval = coordinator.poll_interval.total_seconds()
+        aligned = coordinator.cadence.next_poll(now.timestamp(), interval)
+
+        if aligned is not None:
+            return dt_util.utc_from_timestamp(aligned)
+
+        offset = self._phases[coordinator] * interval
+        now_ts = now.timestamp()
+
+        cycles = math.floor((now_ts - offset) / interval) + 1
+
+        return dt_util.utc_from_timestamp(offset + cycles * interval)
+
+    @callback
+    def async_reschedule(self, coordinator, after: datetime | None = None) -> None:
+        """Schedule the next poll of a coordinator, after now or a given time."""
+        self._async_cancel(coordinator)
+
+        when = self._next_poll(coordinator, after or dt_util.utcnow())
+        self._next[coordinator] = when
+        self._unsubs[coordinator] = async_track_point_in_utc_time(
+            self.hass, self._async_poll_callback(coordinator), when
+        )
+
+    def _async_poll_callback(self, coordinator):
+        """Return the time callback polling a coordinator."""
+
+        @callback
+        def async_poll(now: datetime) -> None:
+            """Poll the coordinator and schedule the next poll."""
+            self._unsubs.pop(coordinator, None)
+
+            task = self._tasks.get(coordinator)
+            if task is not None and not task.done():
+                # The previous poll is still running, skip this cycle
+                _LOGGER.debug("Poll of %s skipped, still running", coordinator.name)
+            else:
+                self._tasks[coordinator] = self.hass.async_create_background_task(
+                    coordinator.async_refresh(), f"{DOMAIN} poll"
+                )
+
+            # Skip past the current slot, time callbacks may fire slightly early
+            self.async_reschedule(coordinator, now + timedelta(seconds=1))
+
+        return async_poll
+
+    def diagnostics(self, coordinator) -> dict:
+        """Return the schedule of a coordinator."""
+        return {
+            "group_size": len(self._groups.get(self._group_key(coordinator), [])),
+            "poll_interval": coordinator.poll_interval.total_seconds(),
+            "phase": round(self._phases.get(coordinator, 0), 3),
+            "next_poll": self._next.get(coordinator),
+            "cadence": coordinator.cadence.diagnostics(),
+        }
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant) -> loex_scheduler:
+    """Return the scheduler shared by all the config entries."""
+    scheduler = hass.data.get(DATA_SCHEDULER)
+
+    if scheduler is None:
+        scheduler = hass.data[DATA_SCHEDULER] = loex_scheduler(hass)
+
+    return scheduler
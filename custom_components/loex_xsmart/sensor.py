@@ -1,25 +1,121 @@
 """Sensor Platform for Loex Xsmart Integration."""
 
+from dataclasses import dataclass
 import logging
 
-from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import PERCENTAGE, UnitOfTemperature
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util, slugify
 
-from .const import CONTROL_VALUE, DOMAIN
+from .aggregate import AGGREGATES, PLANT_GROUP
+from .const import CONTROL_VALUE, DOMAIN, DUTY_CYCLE_WINDOWS, LoexCircuitState
 from .coordinator import loex_coordinator
-from .entity import loex_entity
+from .duty_cycle import PLANT
+from .entity import (
+    async_remove_entity,
+    async_setup_devices,
+    loex_described_entity,
+    loex_entity,
+    loex_entity_description,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# States of the circuit state sensor
+_CIRCUIT_STATES = {
+    LoexCircuitState.LOEX_STATE_OFF: "off",
+    LoexCircuitState.LOEX_STATE_HEAT_COOL: "active",
+    LoexCircuitState.LOEX_MODE_UNK: "unknown",
+    LoexCircuitState.LOEX_MODE_IDLE: "idle",
+}
+
+
+@dataclass(frozen=True, kw_only=True)
+class loex_sensor_entity_description(
+    loex_entity_description, SensorEntityDescription
+):
+    """Description of a Loex sensor."""
+
+    state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
+    # Extras, enabled from the entity settings
+    entity_registry_enabled_default: bool = False
+
+
+CIRCUIT_SENSORS = (
+    loex_sensor_entity_description(
+        key="comfort_temperature",
+        name="Comfort Setpoint",
+        section="circuit",
+        field="comfort_temperature",
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+    ),
+    loex_sensor_entity_description(
+        key="eco_temperature",
+        name="Eco Setpoint",
+        section="circuit",
+        field="eco_temperature",
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+    ),
+    loex_sensor_entity_description(
+        key="target_humidity",
+        name="Dehumidification Setpoint",
+        section="circuit",
+        field="target_humidity",
+        device_class=SensorDeviceClass.HUMIDITY,
+        native_unit_of_measurement=PERCENTAGE,
+    ),
+    loex_sensor_entity_description(
+        key="histeresys_humidity",
+        name="Dehumidification Hysteresis",
+        section="circuit",
+        field="histeresys_humidity",
+        native_unit_of_measurement=PERCENTAGE,
+        icon="mdi:water-percent",
+    ),
+    loex_sensor_entity_description(
+        key="circuit_state",
+        name="Circuit State",
+        section="circuit",
+        field="state",
+        device_class=SensorDeviceClass.ENUM,
+        state_class=None,
+        options=list(_CIRCUIT_STATES.values()),
+        value_fn=_CIRCUIT_STATES.get,
+        icon="mdi:heating-coil",
+    ),
+)
+
+ROOM_SENSORS = (
+    loex_sensor_entity_description(
+        key="target_temperature",
+        name="Target Temperature",
+        section="room",
+        field="target_temperature",
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+    ),
+)
+
 
 async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities) -> None:
     """Create setup entry."""
-    coordinator: loex_coordinator
+    async_setup_devices(hass, entry, async_add_entities, async_setup_device)
 
-    coordinator = hass.data[DOMAIN][entry.entry_id]
 
+@callback
+def async_setup_device(
+    hass: HomeAssistant, entry, coordinator: loex_coordinator, async_add_entities
+) -> None:
+    """Create the sensors of a device of the entry."""
     entities = []
 
     external_temp = loex_temperature_sensor(
@@ -34,27 +130,77 @@ async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities) -> N
 
     entities.extend([external_temp])
 
-    for room_id in coordinator.data:
-        if room_id == "external":
-            continue
+    entities.extend(
+        loex_duty_cycle_sensor(coordinator, entry, PLANT, "Plant", window)
+        for window in DUTY_CYCLE_WINDOWS
+    )
 
-        if room_id == "circuit":
-            continue
+    entities.extend(
+        loex_aggregate_sensor(coordinator, entry, group, aggregate)
+        for group in [PLANT_GROUP, *coordinator.room_groups]
+        for aggregate in AGGREGATES
+    )
 
-        if (coordinator.data[room_id]["validity"]) == 6:
-            humidity_sensor = loex_humidity_sensor(
-                coordinator,
-                entry,
-                str(room_id) + "_humidity",
-                room_id,
-                coordinator.data[room_id]["room_name"],
-                PERCENTAGE,
-                "mdi:water-percent",
-                SensorDeviceClass.HUMIDITY,
-            )
-            entities.extend([humidity_sensor])
+    entities.extend(
+        loex_description_sensor(coordinator, entry, description)
+        for description in CIRCUIT_SENSORS
+    )
 
-    async_add_entities(entities, True)
+    room_sensors: dict[int, list[SensorEntity]] = {}
+
+    def create_room_sensors(rooms: dict[int, str]) -> list[SensorEntity]:
+        """Create the sensors of the given rooms."""
+        new_entities = []
+
+        for room_id, room_name in rooms.items():
+            room_sensors[room_id] = [
+                loex_humidity_sensor(
+                    coordinator,
+                    entry,
+                    str(room_id) + "_humidity",
+                    room_id,
+                    room_name,
+                    PERCENTAGE,
+                    "mdi:water-percent",
+                    SensorDeviceClass.HUMIDITY,
+                ),
+                *(
+                    loex_duty_cycle_sensor(
+                        coordinator, entry, room_id, room_name, window
+                    )
+                    for window in DUTY_CYCLE_WINDOWS
+                ),
+                *(
+                    loex_description_sensor(
+                        coordinator, entry, description, room_id, room_name
+                    )
+                    for description in ROOM_SENSORS
+                ),
+            ]
+            new_entities.extend(room_sensors[room_id])
+
+        return new_entities
+
+    @callback
+    def async_update_rooms(added, removed, renamed) -> None:
+        """Add, remove or rename the sensors of the changed rooms."""
+        for room_id in removed:
+            for sensor in room_sensors.pop(room_id):
+                async_remove_entity(hass, sensor)
+
+        for room_id, room_name in renamed.items():
+            for sensor in room_sensors[room_id]:
+                sensor.description = room_name
+
+        if added:
+            async_add_entities(create_room_sensors(added))
+
+    entities.extend(create_room_sensors(coordinator.rooms))
+
+    # The coordinator holds the first snapshot, updating first would poll again
+    async_add_entities(entities)
+
+    entry.async_on_unload(coordinator.async_add_topology_listener(async_update_rooms))
 
 
 class loex_temperature_sensor(loex_entity, SensorEntity):
@@ -79,6 +225,14 @@ class loex_temperature_sensor(loex_entity, SensorEntity):
         self._device_class = device_class
         self.external_temp = None
 
+    def publish_channels(self) -> dict:
+        """Return the noisy values throttled by the publish filter."""
+        return {"temperature": self.state}
+
+    def publish_fingerprint(self):
+        """Return the state, other than the channels, that is always published."""
+        return self.name
+
     @property
     def state(self):
         """Return External temperature."""
@@ -119,7 +273,7 @@ class loex_temperature_sensor(loex_entity, SensorEntity):
     @property
     def unique_id(self):
         """Get unique id."""
-        return f"{DOMAIN}-{self._id}-{self.coordinator.api.host}"
+        return f"{DOMAIN}-{self._id}-{self.coordinator.device_key}"
 
 
 class loex_humidity_sensor(loex_entity, SensorEntity):
@@ -140,12 +294,21 @@ class loex_humidity_sensor(loex_entity, SensorEntity):
         super().__init__(coordinator, entry)
         self._id = idx
         self._room_id = room_id
+        self.room_id = room_id
         self.description = description
         self.unit = unit
         self._icon = icon
         self._device_class = device_class
         self.room_humidity = None
 
+    def publish_channels(self) -> dict:
+        """Return the noisy values throttled by the publish filter."""
+        return {"humidity": self.state}
+
+    def publish_fingerprint(self):
+        """Return the state, other than the channels, that is always published."""
+        return self.name
+
     @property
     def state(self):
         """Return humidity value."""
@@ -186,4 +349,164 @@ class loex_humidity_sensor(loex_entity, SensorEntity):
     @property
     def unique_id(self):
         """Get unique id."""
-        return f"{DOMAIN}-{self._id}-{self.coordinator.api.host}"
+        return f"{DOMAIN}-{self._id}-{self.coordinator.device_key}"
+
+
+class loex_duty_cycle_sensor(loex_entity, SensorEntity):
+    """Loex valve duty cycle sensor class."""
+
+    def __init__(
+        self,
+        coordinator: loex_coordinator,
+        entry: ConfigEntry,
+        key,
+        description: str,
+        window: str,
+    ) -> None:
+        """Initialize."""
+        super().__init__(coordinator, entry)
+        self._id = f"{key}_duty_cycle_{window}"
+        self._key = key
+        self.room_id = None if key == PLANT else key
+        self.description = description
+        self._window = window
+
+    @property
+    def state(self):
+        """Return the share of the window the valve was open."""
+        return self.coordinator.duty_cycle.duty_cycle(
+            self._key, self._window, dt_util.utcnow()
+        )
+
+    @property
+    def unit_of_measurement(self):
+        """Get unit."""
+        return PERCENTAGE
+
+    @property
+    def state_class(self) -> SensorStateClass:
+        """Get state class."""
+        return SensorStateClass.MEASUREMENT
+
+    @property
+    def icon(self) -> str:
+        """Get icon."""
+        return "mdi:valve"
+
+    @property
+    def name(self) -> str:
+        """Get name."""
+        return f"{self.description} Duty Cycle ({self._window})"
+
+    @property
+    def id(self):
+        """Get id."""
+        return f"{DOMAIN}_{self._id}"
+
+    @property
+    def unique_id(self):
+        """Get unique id."""
+        return f"{DOMAIN}-{self._id}-{self.coordinator.device_key}"
+
+
+class loex_aggregate_sensor(loex_entity, SensorEntity):
+    """Loex aggregate of the plant or a room group sensor class."""
+
+    def __init__(
+        self,
+        coordinator: loex_coordinator,
+        entry: ConfigEntry,
+        group: str,
+        aggregate: str,
+    ) -> None:
+        """Initialize."""
+        super().__init__(coordinator, entry)
+        self._id = f"aggregate_{slugify(group)}_{aggregate}"
+        self._group = group
+        self._aggregate = aggregate
+        self.description, self._field = AGGREGATES[aggregate]
+
+    def publish_channels(self) -> dict:
+        """Return the noisy values throttled by the publish filter."""
+        if self._field in ("temperature", "humidity"):
+            return {self._field: self.state}
+
+        return {}
+
+    def publish_fingerprint(self):
+        """Return the state, other than the channels, that is always published."""
+        return self.name
+
+    @property
+    def available(self) -> bool:
+        """Return whether the group has active rooms."""
+        return (
+            super().available
+            and self.coordinator.aggregates.get(self._group, {}).get("rooms", 0) > 0
+        )
+
+    @property
+    def state(self):
+        """Return the aggregate of the last snapshot."""
+        return self.coordinator.aggregates.get(self._group, {}).get(self._aggregate)
+
+    @property
+    def unit_of_measurement(self):
+        """Get unit."""
+        if self._field == "temperature":
+            return UnitOfTemperature.CELSIUS
+        if self._field == "humidity":
+            return PERCENTAGE
+
+        return None
+
+    @property
+    def state_class(self) -> SensorStateClass:
+        """Get state class."""
+        return SensorStateClass.MEASUREMENT
+
+    @property
+    def device_class(self) -> SensorDeviceClass | None:
+        """Get device class."""
+        if self._field == "temperature":
+            return SensorDeviceClass.TEMPERATURE
+        if self._field == "humidity":
+            return SensorDeviceClass.HUMIDITY
+
+        return None
+
+    @property
+    def icon(self) -> str:
+        """Get icon."""
+        if self._field == "output_valve":
+            return "mdi:radiator"
+        if self._field == "humidity":
+            return "mdi:water-percent"
+
+        return "mdi:home-thermometer"
+
+    @property
+    def name(self) -> str:
+        """Get name."""
+        return f"{self._group} {self.description}"
+
+    @property
+    def id(self):
+        """Get id."""
+        return f"{DOMAIN}_{self._id}"
+
+    @property
+    def unique_id(self):
+        """Get unique id."""
+        return f"{DOMAIN}-{self._id}-{self.coordinator.device_key}"
+
+
+class loex_description_sensor(loex_described_entity, SensorEntity):
+    """Loex sensor of a snapshot field, as its description says."""
+
+    entity_description: loex_sensor_entity_description
+
+    @property
+    def native_value(self):
+        """Return the field of the last snapshot."""
+        return self.value
@@ -0,0 +1,183 @@
+"""Services for the Loex Xsmart Integration."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+import logging
+import os
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+
+from .capture import async_replay
+from .const import (
+    DEFAULT_SYNC_INTERVAL,
+    DOMAIN,
+    HISTORY_EXPORT_FILENAME,
+    PROFILE_FILENAME,
+    SERVICE_EXPORT_HISTORY,
+    SERVICE_PROFILE,
+    SERVICE_REPLAY_CAPTURE,
+)
+from .coordinator import loex_coordinator
+from .history import export_history
+from .loex_api import loex_api
+
+_LOGGER = logging.getLogger(__name__)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("duration", default=60): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=3600)
+        ),
+    }
+)
+
+EXPORT_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional("start"): cv.datetime,
+        vol.Optional("end"): cv.datetime,
+        vol.Optional("format", default="csv"): vol.In(["csv", "parquet"]),
+    }
+)
+
+REPLAY_CAPTURE_SCHEMA = vol.Schema(
+    {
+        # A file of the configuration directory
+        vol.Required("file"): vol.All(cv.string, vol.Match(r"^[\w.-]+$")),
+        vol.Optional("realtime", default=False): cv.boolean,
+    }
+)
+
+DATA_PROFILING = f"{DOMAIN}_profiling"
+
+
+def _write_report(path: str, report: str) -> None:
+    """Write a report to disk."""
+    with open(path, "w", encoding="utf-8") as report_file:
+        report_file.write(report)
+
+
+async def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+
+    if hass.services.has_service(DOMAIN, SERVICE_PROFILE):
+        return
+
+    async def async_profile(call: ServiceCall) -> None:
+        """Profile the integration for the requested duration."""
+        if hass.data.get(DATA_PROFILING):
+            raise HomeAssistantError("A profile is already running")
+
+        # Imported on first use, tracemalloc is not needed at startup
+        from .profiler import (  # pylint: disable=import-outside-toplevel
+            loex_profiler,
+        )
+
+        hass.data[DATA_PROFILING] = True
+        profiler = loex_profiler()
+
+        try:
+            await hass.async_add_executor_job(profiler.start)
+            try:
+                await asyncio.sleep(call.data["duration"])
+            finally:
+                report = await hass.async_add_executor_job(profiler.stop)
+        finally:
+            hass.data[DATA_PROFILING] = False
+
+        path = hass.config.path(
+            PROFILE_FILENAME.format(datetime.now().strftime("%Y%m%d_%H%M%S"))
+        )
+        await hass.async_add_executor_job(_write_report, path, report)
+
+        _LOGGER.info("Profile written to %s", path)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, async_profile, schema=PROFILE_SCHEMA
+    )
+
+    async def async_export_history(call: ServiceCall) -> None:
+        """Export a time range of the poll logs to the configuration directory."""
+        coordinators = [
+            device
+            for coordinator in hass.data[DOMAIN].values()
+            for device in coordinator.entry_devices
+            if device.history is not None
+        ]
+        if not coordinators:
+            raise HomeAssistantError("The poll log is not enabled on any plant")
+
+        start = call.data.get("start")
+        end = call.data.get("end")
+        file_format = call.data["format"]
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        for coordinator in coordinators:
+            # Include the rows still buffered in memory
+            await hass.async_add_executor_job(coordinator.history.flush)
+
+            path = hass.config.path(
+                HISTORY_EXPORT_FILENAME.format(
+                    coordinator.api.device_id, stamp, file_format
+                )
+            )
+
+            try:
+                rows = await hass.async_add_executor_job(
+                    export_history,
+                    coordinator.history.directory,
+                    path,
+                    start and start.timestamp(),
+                    end and end.timestamp(),
+                    file_format,
+                )
+            except ImportError as exception:
+                raise HomeAssistantError(
+                    "Parquet export needs the pyarrow package"
+                ) from exception
+
+            _LOGGER.info("%s poll log rows exported to %s", rows, path)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_HISTORY,
+        async_export_history,
+        schema=EXPORT_HISTORY_SCHEMA,
+    )
+
+    async def async_replay_capture(call: ServiceCall) -> None:
+        """Replay a capture file and log the parse and fan-out timings.
+
+        The snapshots go through a coordinator of their own, the entities and
+        the records of the plants are left alone.
+        """
+        path = hass.config.path(call.data["file"])
+        if not await hass.async_add_executor_job(os.path.isfile, path):
+            raise HomeAssistantError(f"No capture file {call.data['file']}")
+
+        coordinator = loex_coordinator(
+            hass, api=loex_api(), update_interval=DEFAULT_SYNC_INTERVAL
+        )
+        stats = await async_replay(coordinator, path, call.data["realtime"])
+
+        _LOGGER.info("Capture %s replayed: %s", path, stats)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REPLAY_CAPTURE,
+        async_replay_capture,
+        schema=REPLAY_CAPTURE_SCHEMA,
+    )
+
+
+async def async_unload_services(hass: HomeAssistant) -> None:
+    """Remove the integration services."""
+
+    hass.services.async_remove(DOMAIN, SERVICE_PROFILE)
+    hass.services.async_remove(DOMAIN, SERVICE_EXPORT_HISTORY)
+    hass.services.async_remove(DOMAIN, SERVICE_REPLAY_CAPTURE)
@@ -0,0 +1,185 @@
+"""Hourly long-term statistics of the Loex Xsmart rooms."""
+
+from __future__ import annotations
+
+from datetime import datetime
+import logging
+
+from homeassistant.const import PERCENTAGE, UnitOfTemperature
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Delay before the open buckets are written to storage
+_SAVE_DELAY = 300  # seconds
+
+# Room channel -> (unit, name suffix)
+STATISTICS_CHANNELS = {
+    "temperature": (UnitOfTemperature.CELSIUS, "Temperature"),
+    "humidity": (PERCENTAGE, "Humidity"),
+    "target_temperature": (UnitOfTemperature.CELSIUS, "Setpoint"),
+    "output_valve": (None, "Valve output"),
+}
+
+
+class loex_statistics:
+    """Aggregate the room channels in hourly buckets and import them.
+
+    Every snapshot is folded into in-memory mean/min/max buckets. When the hour
+    changes, the completed buckets are imported as external statistics, so the
+    per-poll room states do not need to be recorded to keep their history.
+    Only completed hours are imported, the buckets of the current hour are
+    saved to storage across restarts and reloads.
+    """
+
+    def __init__(self, hass: HomeAssistant, device_id: str) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.prefix = f"{DOMAIN}:{slugify(device_id)}"
+        self._store = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.statistics.{slugify(device_id)}"
+        )
+        self._loaded = False
+        self._hour: datetime | None = None
+        # (room id, channel) -> [count, sum, min, max]
+        self._buckets: dict[tuple[int, str], list[float]] = {}
+        self._names: dict[int, str] = {}
+
+    async def async_load(self) -> None:
+        """Restore the buckets saved before a restart, once."""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        stored = await self._store.async_load()
+
+        if not stored:
+            return
+
+        hour = dt_util.parse_datetime(stored["hour"])
+        buckets = {
+            (room_id, channel): bucket
+            for room_id, channel, *bucket in stored["buckets"]
+            if channel in STATISTICS_CHANNELS
+        }
+        names = {int(room_id): name for room_id, name in stored["names"].items()}
+
+        if self._hour is not None and hour != self._hour:
+            # Snapshots of a later hour came in meanwhile, the stored one is done
+            self._async_import(hour, buckets, names)
+            return
+
+        self._hour = hour
+        self._names = {**names, **self._names}
+        for key, bucket in buckets.items():
+            self._fold(key, *bucket)
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Return the open buckets to save."""
+        return {
+            "hour": self._hour and self._hour.isoformat(),
+            "names": {str(room_id): name for room_id, name in self._names.items()},
+            "buckets": [
+                [room_id, channel, *bucket]
+                for (room_id, channel), bucket in self._buckets.items()
+            ],
+        }
+
+    async def async_save(self) -> None:
+        """Save the open buckets now, once the stored ones are restored."""
+        if self._loaded and self._hour is not None:
+            await self._store.async_save(self._data_to_save())
+
+    def _fold(
+        self,
+        key: tuple[int, str],
+        count: float,
+        total: float,
+        minimum: float,
+        maximum: float,
+    ) -> None:
+        """Fold values into the bucket of a room channel."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [count, total, minimum, maximum]
+        else:
+            bucket[0] += count
+            bucket[1] += total
+            bucket[2] = min(bucket[2], minimum)
+            bucket[3] = max(bucket[3], maximum)
+
+    @callback
+    def async_add_snapshot(self, data: dict, rooms: dict[int, str], now: datetime):
+        """Fold a snapshot of the active rooms in the current hour buckets."""
+        hour = now.replace(minute=0, second=0, microsecond=0)
+
+        if self._hour is not None and hour != self._hour:
+            self.async_import()
+        self._hour = hour
+
+        for room_id, room_name in rooms.items():
+            self._names[room_id] = room_name
+            room = data[room_id]
+
+            for channel in STATISTICS_CHANNELS:
+                value = room[channel]
+                if not isinstance(value, (int, float)):
+                    continue
+
+                self._fold((room_id, channel), 1, value, value, value)
+
+        if self._loaded:
+            # Not before, the store would load these buckets back
+            self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+
+    @callback
+    def async_import(self) -> None:
+        """Import the buckets of the completed hour and start new ones."""
+        buckets, self._buckets = self._buckets, {}
+        self._async_import(self._hour, buckets, self._names)
+
+    @callback
+    def _async_import(
+        self,
+        hour: datetime,
+        buckets: dict[tuple[int, str], list[float]],
+        names: dict[int, str],
+    ) -> None:
+        """Import the buckets of an hour as external statistics."""
+        if not buckets or "recorder" not in self.hass.config.components:
+            return
+
+        # pylint: disable-next=import-outside-toplevel
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+        )
+
+        for (room_id, channel), (count, total, minimum, maximum) in buckets.items():
+            unit, suffix = STATISTICS_CHANNELS[channel]
+            metadata = {
+                "has_mean": True,
+                "has_sum": False,
+                "name": f"{names[room_id]} {suffix}",
+                "source": DOMAIN,
+                "statistic_id": f"{self.prefix}_room_{room_id}_{channel}",
+                "unit_of_measurement": unit,
+            }
+            statistics = [
+                {
+                    "start": hour,
+                    "mean": total / count,
+                    "min": minimum,
+                    "max": maximum,
+                }
+            ]
+
+            async_add_external_statistics(self.hass, metadata, statistics)
+
+        _LOGGER.debug("Imported %s hourly statistics for %s", len(buckets), hour)
@@ -0,0 +1,101 @@
+"""Deadband and minimum-interval throttling of the entity state writes."""
+
+from __future__ import annotations
+
+from collections.abc import Hashable
+import time
+
+
+class loex_publisher:
+    """Listener of a coordinator whose updates go through its publish filter.
+
+    The coordinator asks the publisher for its channels and fingerprint before
+    every update, and only notifies it when the publish filter lets them pass.
+    """
+
+    @property
+    def available(self) -> bool:
+        """Return whether the publisher has a state, unavailable ones pass."""
+        return True
+
+    @property
+    def publish_key(self) -> Hashable:
+        """Return the key of the publisher in the publish filter."""
+        return id(self)
+
+    def publish_channels(self) -> dict:
+        """Return the noisy values throttled by the publish filter."""
+        return {}
+
+    def publish_fingerprint(self):
+        """Return the state, other than the channels, that is always published."""
+        return None
+
+
+class loex_publish_filter:
+    """Decide, for all the entities of a coordinator, when a state is published.
+
+    Every entity reports its noisy channels (temperature, humidity) and a
+    fingerprint of the rest of its state. A channel is named after its kind, or
+    by a tuple ending with it when a publisher has several of a kind. A change
+    of the fingerprint is always published. Channel changes are published once
+    they exceed the channel deadband, but not more often than min_interval, and
+    a state is always published after max_interval.
+    """
+
+    def __init__(
+        self,
+        deadbands: dict[str, float],
+        min_interval: float,
+        max_interval: float,
+        clock=None,
+    ) -> None:
+        """Initialize."""
+        self.deadbands = deadbands
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._clock = clock or time.monotonic
+        # key -> (publish time, channel values, fingerprint)
+        self._published: dict[Hashable, tuple[float, dict, object]] = {}
+        self.published = 0
+        self.suppressed = 0
+
+    def _changed(self, channels: dict, previous: dict) -> bool:
+        """Return whether a channel moved beyond its deadband."""
+        for channel, value in channels.items():
+            last = previous.get(channel)
+
+            if not isinstance(value, (int, float)) or not isinstance(
+                last, (int, float)
+            ):
+                if value != last:
+                    return True
+            # Rounded, 20.2 - 20.0 is a little under a 0.2 deadband
+            elif round(abs(value - last), 6) >= self.deadbands.get(
+                channel[-1] if isinstance(channel, tuple) else channel, 0
+            ):
+                return True
+
+        return False
+
+    def should_publish(self, key: Hashable, channels: dict, fingerprint) -> bool:
+        """Return whether the entity identified by key must write its state."""
+        now = self._clock()
+        previous = self._published.get(key)
+
+        if previous is not None and previous[2] == fingerprint:
+            elapsed = now - previous[0]
+
+            if elapsed < self.max_interval and (
+                elapsed < self.min_interval or not self._changed(channels, previous[1])
+            ):
+                self.suppressed += 1
+                return False
+
+        self._published[key] = (now, channels, fingerprint)
+        self.published += 1
+        return True
+
+    def forget(self, key: Hashable) -> None:
+        """Forget an entity, its next state is published unconditionally."""
+        self._published.pop(key, None)
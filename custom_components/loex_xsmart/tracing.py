@@ -0,0 +1,190 @@
+"""Span tracing of the Loex Xsmart polls and commands."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import secrets
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from .const import DEFAULT_TRACE_SLOW_THRESHOLD
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+# Span of the running operation, executor jobs must run in a copy of the context
+_CURRENT: ContextVar[loex_span | None] = ContextVar("loex_xsmart_span", default=None)
+
+
+class loex_span:
+    """A timed operation of a trace."""
+
+    def __init__(
+        self,
+        tracer,
+        name: str,
+        parent: loex_span | None,
+        attributes: dict,
+        slow_threshold: float | None = None,
+    ) -> None:
+        """Initialize."""
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(8)
+        self.span_id = secrets.token_hex(4)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.start = time.time()
+        self._start = time.perf_counter()
+        self.duration: float | None = None
+        self.error: str | None = None
+        # Overrides the threshold of the tracer for a root span
+        self.slow_threshold = slow_threshold
+
+    def as_dict(self) -> dict:
+        """Return a serializable span."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration": None if self.duration is None else round(self.duration, 6),
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class loex_tracer:
+    """Collect the spans of the traces of a coordinator.
+
+    A trace is complete when its root span ends. It is logged when it took
+    longer than slow_threshold seconds, and appended to the export file as a
+    JSON line when export_path is set.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.slow_threshold = DEFAULT_TRACE_SLOW_THRESHOLD
+        self.export_path: str | None = None
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._traces: dict[str, list[loex_span]] = {}
+        self.traces = 0
+        self.slow_traces = 0
+
+    def start_span(
+        self,
+        name: str,
+        root: bool = False,
+        slow_threshold: float | None = None,
+        **attributes,
+    ) -> loex_span:
+        """Start a span, child of the current one unless root is set."""
+        parent = None if root else _CURRENT.get()
+        span = loex_span(self, name, parent, attributes, slow_threshold)
+
+        with self._lock:
+            self._traces.setdefault(span.trace_id, []).append(span)
+
+        return span
+
+    def end_span(self, span: loex_span, error: str | None = None) -> None:
+        """End a span, and its trace if it is the root span."""
+        span.duration = time.perf_counter() - span._start
+        span.error = span.error or error
+
+        if span.parent_id is not None:
+            return
+
+        with self._lock:
+            spans = self._traces.pop(span.trace_id, [])
+            self.traces += 1
+
+        threshold = span.slow_threshold
+        if threshold is None:
+            threshold = self.slow_threshold
+
+        if span.duration >= threshold:
+            self.slow_traces += 1
+            _LOGGER.warning(
+                "Slow %s of %s took %.2f s: %s",
+                span.name,
+                span.attributes.get("device"),
+                span.duration,
+                ", ".join(
+                    f"{child.name}={child.duration or 0:.3f}s"
+                    + (f" ({child.error})" if child.error else "")
+                    for child in spans
+                ),
+            )
+
+        if self.export_path is not None:
+            line = json.dumps([child.as_dict() for child in spans], default=str)
+            self.hass.async_add_executor_job(self._write, self.export_path, line)
+
+    @contextmanager
+    def span(self, name: str, root: bool = False, **attributes) -> Iterator[loex_span]:
+        """Run the enclosed block as the current span."""
+        span = self.start_span(name, root, **attributes)
+        token = _CURRENT.set(span)
+
+        try:
+            yield span
+        except BaseException as exception:
+            span.error = repr(exception)
+            raise
+        finally:
+            _CURRENT.reset(token)
+            self.end_span(span)
+
+    @contextmanager
+    def use(self, span: loex_span) -> Iterator[loex_span]:
+        """Run the enclosed block under a span, without ending it."""
+        token = _CURRENT.set(span)
+
+        try:
+            yield span
+        finally:
+            _CURRENT.reset(token)
+
+    def _write(self, path: str, line: str) -> None:
+        """Append an exported trace."""
+        with self._export_lock, open(path, "a", encoding="utf-8") as export:
+            export.write(line + "\n")
+
+    def diagnostics(self) -> dict:
+        """Return the tracing statistics."""
+        return {
+            "slow_threshold": self.slow_threshold,
+            "export": self.export_path is not None,
+            "traces": self.traces,
+            "slow_traces": self.slow_traces,
+            "open_traces": len(self._traces),
+        }
+
+
+def current_span() -> loex_span | None:
+    """Return the current span."""
+    return _CURRENT.get()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[loex_span | None]:
+    """Run the enclosed block as a child of the current span, if any."""
+    parent = _CURRENT.get()
+
+    if parent is None:
+        yield None
+        return
+
+    with parent.tracer.span(name, **attributes) as child:
+        yield child
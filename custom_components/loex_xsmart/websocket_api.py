@@ -0,0 +1,278 @@
+"""Websocket delta feed of the Loex Xsmart plants, for whole-plant dashboards."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, SUBSCRIBE_MIN_INTERVAL
+from .coordinator import loex_coordinator
+from .throttle import loex_publisher
+
+DATA_WEBSOCKET = f"{DOMAIN}_websocket"
+
+# Sections of the snapshot shared by the whole plant
+_PLANT_SECTIONS = ("circuit", "external")
+
+# Noisy fields, throttled by the publish filter: field -> deadband
+_PLANT_CHANNELS = {
+    "circuit": {"home_temperature": "temperature", "home_humidity": "humidity"},
+    "external": {"ext_temp": "temperature"},
+}
+_ROOM_CHANNELS = {"temperature": "temperature", "humidity": "humidity"}
+
+
+def compact_snapshot(coordinator: loex_coordinator) -> dict:
+    """Return the fields of the last snapshot of a device, rooms keyed by id."""
+    data = coordinator.data or {}
+
+    return {
+        "available": coordinator.last_update_success,
+        **{section: dict(data.get(section, {})) for section in _PLANT_SECTIONS},
+        "rooms": {
+            str(room_id): {**data[room_id], "room_name": room_name}
+            for room_id, room_name in coordinator.rooms.items()
+            if room_id in data
+        },
+    }
+
+
+def snapshot_delta(old: dict, new: dict) -> dict:
+    """Return the fields of a compact snapshot that changed, per room."""
+    delta = {}
+
+    if new["available"] != old["available"]:
+        delta["available"] = new["available"]
+
+    for section in _PLANT_SECTIONS:
+        changed = {
+            field: value
+            for field, value in new[section].items()
+            if field not in old[section] or old[section][field] != value
+        }
+        if changed:
+            delta[section] = changed
+
+    rooms = {}
+    for room_id, fields in new["rooms"].items():
+        previous = old["rooms"].get(room_id)
+
+        if previous is None:
+            rooms[room_id] = fields
+            continue
+
+        changed = {
+            field: value
+            for field, value in fields.items()
+            if field not in previous or previous[field] != value
+        }
+        if changed:
+            rooms[room_id] = changed
+
+    if rooms:
+        delta["rooms"] = rooms
+
+    removed = [room_id for room_id in old["rooms"] if room_id not in new["rooms"]]
+    if removed:
+        delta["removed_rooms"] = removed
+
+    return delta
+
+
+class loex_delta_subscription(loex_publisher):
+    """Feed of the snapshots of a device to one websocket client.
+
+    The client gets the compact snapshot once, then only the fields that
+    changed, at most once every min_interval seconds. Changes made in between
+    are merged into the next message. Like the entity states, the updates go
+    through the publish filter of the coordinator.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: loex_coordinator,
+        send: Callable[[dict], None],
+        min_interval: float,
+    ) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self._send = send
+        self.min_interval = min_interval
+        # The snapshot as the client knows it
+        self._known: dict = {}
+        self._last_sent = 0.0
+        self._unsub_timer: CALLBACK_TYPE | None = None
+        self._unsub_listener: CALLBACK_TYPE | None = None
+        self.sent = 0
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Send the snapshot and follow the updates, return the unsubscribe."""
+        self._known = compact_snapshot(self.coordinator)
+        self._last_sent = self.hass.loop.time()
+        self._send({"snapshot": self._known})
+        # The snapshot sent is the reference of the publish filter
+        self.coordinator.async_publishes(self)
+        self._unsub_listener = self.coordinator.async_add_listener(
+            self._async_updated, self
+        )
+
+        return self._async_stop
+
+    def publish_channels(self) -> dict:
+        """Return the temperatures and humidities of the plant and of its rooms."""
+        data = self.coordinator.data or {}
+        channels = {}
+
+        for section, fields in _PLANT_CHANNELS.items():
+            for field, deadband in fields.items():
+                channels[(section, field, deadband)] = data.get(section, {}).get(field)
+
+        for room_id in self.coordinator.rooms:
+            for field, deadband in _ROOM_CHANNELS.items():
+                channels[(room_id, field, deadband)] = data.get(room_id, {}).get(field)
+
+        return channels
+
+    def publish_fingerprint(self):
+        """Return the compact snapshot, without the channels."""
+        snapshot = compact_snapshot(self.coordinator)
+
+        for section, fields in _PLANT_CHANNELS.items():
+            for field in fields:
+                snapshot[section].pop(field, None)
+
+        for fields in snapshot["rooms"].values():
+            for field in _ROOM_CHANNELS:
+                fields.pop(field, None)
+
+        return snapshot
+
+    @callback
+    def _async_stop(self) -> None:
+        """Stop following the updates."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        if self._unsub_listener is not None:
+            self._unsub_listener()
+            self._unsub_listener = None
+        self.coordinator.publish_filter.forget(self.publish_key)
+
+    @callback
+    def _async_updated(self) -> None:
+        """Send the changes now, or once the rate cap allows."""
+        if self._unsub_timer is not None:
+            # Merged into the message already scheduled
+            return
+
+        wait = self._last_sent + self.min_interval - self.hass.loop.time()
+        if wait > 0:
+            self._unsub_timer = async_call_later(self.hass, wait, self._async_timer)
+        else:
+            self._async_send_delta()
+
+    @callback
+    def _async_timer(self, _now) -> None:
+        """Send the changes held back by the rate cap."""
+        self._unsub_timer = None
+        self._async_send_delta()
+
+    @callback
+    def _async_send_delta(self) -> None:
+        """Send the fields changed since the last message, if any."""
+        snapshot = compact_snapshot(self.coordinator)
+        delta = snapshot_delta(self._known, snapshot)
+
+        if delta:
+            self._known = snapshot
+            self._last_sent = self.hass.loop.time()
+            self.sent += 1
+            self._send({"delta": delta})
+
+
+@callback
+def async_setup_websocket(hass: HomeAssistant) -> None:
+    """Register the websocket commands of the integration."""
+    if DATA_WEBSOCKET in hass.data:
+        return
+
+    # Closers of the subscriptions, per config entry
+    hass.data[DATA_WEBSOCKET] = {}
+    websocket_api.async_register_command(hass, websocket_subscribe)
+
+
+@callback
+def async_close_subscriptions(hass: HomeAssistant, entry_id: str) -> None:
+    """End the subscriptions to the devices of an entry, as it unloads."""
+    for close in hass.data.get(DATA_WEBSOCKET, {}).pop(entry_id, set()):
+        close()
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/subscribe",
+        vol.Required("entry_id"): str,
+        vol.Optional("device_id"): str,
+        vol.Optional("min_interval", default=SUBSCRIBE_MIN_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=SUBSCRIBE_MIN_INTERVAL)
+        ),
+    }
+)
+@callback
+def websocket_subscribe(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict
+) -> None:
+    """Subscribe to the snapshot, then the deltas, of a device of an entry."""
+    coordinator: loex_coordinator | None = hass.data.get(DOMAIN, {}).get(
+        msg["entry_id"]
+    )
+
+    if coordinator is not None and "device_id" in msg:
+        coordinator = next(
+            (
+                device
+                for device in coordinator.entry_devices
+                if device.api.device_id == msg["device_id"]
+            ),
+            None,
+        )
+
+    if coordinator is None:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "Plant not found")
+        return
+
+    @callback
+    def send(event: dict) -> None:
+        """Send an event of the subscription."""
+        connection.send_message(websocket_api.event_message(msg["id"], event))
+
+    subscription = loex_delta_subscription(hass, coordinator, send, msg["min_interval"])
+    closers: set[Callable[[], None]] = hass.data[DATA_WEBSOCKET].setdefault(
+        msg["entry_id"], set()
+    )
+
+    @callback
+    def async_unsubscribe() -> None:
+        """Stop the subscription, as the client leaves."""
+        closers.discard(async_close)
+        stop()
+
+    @callback
+    def async_close() -> None:
+        """Stop the subscription, as the entry unloads, and tell the client."""
+        if connection.subscriptions.pop(msg["id"], None) is not None:
+            stop()
+            send({"closed": True})
+
+    connection.send_result(msg["id"])
+    stop = subscription.async_start()
+    closers.add(async_close)
+    connection.subscriptions[msg["id"]] = async_unsubscribe
@@ -0,0 +1,341 @@
+"""Local stand-in for the Loex Xsmart cloud."""
+from __future__ import annotations
+
+import base64
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+import threading
+import time
+import urllib.parse
+
+import requests
+
+from custom_components.loex_xsmart.const import MAX_ROOMS
+
+# Thermal model: heat loss rate towards the outdoor temperature, per second,
+# and heating rate of an open valve, in °C per second
+HEAT_LOSS = 1 / (10 * 3600)
+HEAT_GAIN = 2 / 3600
+
+# Valve hysteresis around the room target temperature
+HYSTERESIS = 0.2  # °C
+
+# Step of the thermal model, also the refresh period of the cloud copy
+MODEL_STEP = 60  # seconds
+
+
+def room_index(room_id: int) -> int:
+    """Return the register index of a room."""
+    return room_id + 2 * (room_id >= 8) + 2 * (room_id >= 16) + 2 * (room_id >= 24)
+
+
+class fake_plant:
+    """Register map of a simulated Xsmart plant."""
+
+    def __init__(self, device_id: str, rooms: int = 8, name: str = "Home") -> None:
+        """Initialize."""
+        self.device_id = device_id
+        self.lock = threading.Lock()
+        self.registers: dict[int, int | str] = {
+            10011: 85,
+            20001: name,
+            10003: 205,
+            10004: 500,
+            10101: 200,
+            18011: 200,
+            18012: 180,
+            10103: 1,
+            10105: 1,
+            10107: 0,
+            18081: 600,
+            18082: 50,
+            10042: 0,
+            10043: 1,
+        }
+        self.inputs = 0
+        self.outputs = 0
+        self.rooms = rooms
+        # Room temperatures of the thermal model
+        self.temperatures = {room_id: 20.0 + room_id % 5 / 10 for room_id in range(rooms)}
+        self._time: float | None = None
+
+        for room_id in range(MAX_ROOMS):
+            idx = room_index(room_id)
+            active = room_id < rooms
+            self.registers[20201 + 7 * room_id] = f"Room {room_id}"
+            self.registers[11021 + 10 * idx] = 6 if active else 0
+            self.registers[11022 + 10 * idx] = 200 + room_id % 5
+            self.registers[11023 + 10 * idx] = 200
+            self.registers[11025 + 10 * idx] = 0
+            self.registers[11026 + 10 * idx] = 0
+            self.registers[11027 + 10 * idx] = 500
+
+    @staticmethod
+    def outdoor_temperature(now: float) -> float:
+        """Return the outdoor temperature, coldest before dawn."""
+        return 5 + 5 * math.sin(2 * math.pi * (now / 86400 - 0.375))
+
+    def advance(self, now: float) -> None:
+        """Run the thermal model until now, in seconds since the epoch."""
+        now -= now % MODEL_STEP
+
+        with self.lock:
+            if self._time is None:
+                self._time = now
+
+            while self._time < now:
+                step = min(MODEL_STEP - self._time % MODEL_STEP, now - self._time)
+                self._step(step)
+                self._time += step
+
+    def _step(self, step: float) -> None:
+        """Advance the thermal model by a step."""
+        outdoor = self.outdoor_temperature(self._time)
+        self.registers[10011] = round(outdoor * 10)
+
+        for room_id, temperature in self.temperatures.items():
+            idx = room_index(room_id)
+            target = self.registers[11023 + 10 * idx] / 10
+            valve = self.registers[11025 + 10 * idx]
+
+            if self.registers[11026 + 10 * idx] == 3:
+                valve = 0
+            elif temperature < target - HYSTERESIS:
+                valve = 1
+            elif temperature > target + HYSTERESIS:
+                valve = 0
+
+            temperature += step * (
+                HEAT_LOSS * (outdoor - temperature) + HEAT_GAIN * valve
+            )
+            self.temperatures[room_id] = temperature
+            self.registers[11022 + 10 * idx] = round(temperature * 10)
+            self.registers[11025 + 10 * idx] = valve
+
+        if self.temperatures:
+            self.registers[10003] = round(max(self.temperatures.values()) * 10)
+
+    def input_json(self) -> dict:
+        """Return the input.json body."""
+        with self.lock:
+            self.inputs += 1
+            return {"t" + str(register): value for register, value in self.registers.items()}
+
+    def write(self, payload: str) -> None:
+        """Apply an output.json payload."""
+        with self.lock:
+            self.outputs += 1
+
+            for assignment in payload.split("&"):
+                register, value = (int(part) for part in assignment.split("="))
+                self._write_register(register, value)
+
+    def _write_register(self, register: int, value: int) -> None:
+        """Apply a register write the way the controller does."""
+        if register in (18011, 18012):
+            self.registers[register] = value
+            if self.registers[10103] == register - 18010:
+                self.registers[10101] = value
+        elif register == 18001:
+            self.registers[10103] = value
+            if value in (1, 2):
+                self.registers[10101] = self.registers[18010 + value]
+        elif 17621 <= register < 17621 + 10 * room_index(MAX_ROOMS):
+            offset = register - 17621
+            if offset % 10 == 0:
+                # Room correction relative to the circuit setpoint
+                self.registers[11023 + offset] = self.registers[10101] + value
+            elif offset % 10 == 1:
+                self.registers[11026 + offset - 1] = value
+
+
+class fake_xsmart_server:
+    """Threaded HTTP server serving fake plants like xsmart.loex.it.
+
+    latency may be a number of seconds or a callable returning one, it is
+    applied to every input.json request.
+    """
+
+    def __init__(self, plants: list[fake_plant], latency=0) -> None:
+        """Initialize."""
+        self.plants = {plant.device_id: plant for plant in plants}
+        self.latency = latency
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Return the server URL."""
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def plant_url(self, device_id: str) -> str:
+        """Return a URL reserved to a plant.
+
+        Unique ids embed the API host, a distinct prefix per plant keeps the
+        entities of the plants apart. Requests ignore the prefix.
+        """
+        return f"{self.url}/{device_id}"
+
+    def start(self) -> None:
+        """Start serving in a thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def _handler(self):
+        """Return the request handler class."""
+        server = self
+
+        class handler(BaseHTTPRequestHandler):
+            """Fake Xsmart request handler."""
+
+            def log_message(self, *args):
+                """Keep the test output quiet."""
+
+            def _reply(self, status: int, body: bytes = b"") -> None:
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _basic_auth(self) -> bool:
+                header = self.headers.get("Authorization", "")
+                if not header.startswith("Basic "):
+                    return False
+                return b":" in base64.b64decode(header[6:])
+
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+
+                segments = url.path.strip("/").split("/")
+
+                if segments[-1] == "jwt":
+                    device_id = urllib.parse.parse_qs(url.query).get("id", [""])[0]
+                    if device_id not in server.plants or not self._basic_auth():
+                        self._reply(401)
+                        return
+                    self._reply(200, f"token-{device_id}".encode())
+                    return
+
+                device_id, name = segments[-2:] if len(segments) > 1 else ("", "")
+                plant = server.plants.get(device_id)
+                if plant is None or name != "input.json":
+                    self._reply(404)
+                    return
+                if self.headers.get("Authorization") != f"token-{device_id}":
+                    self._reply(401)
+                    return
+
+                latency = server.latency() if callable(server.latency) else server.latency
+                if latency:
+                    time.sleep(latency)
+
+                self._reply(200, json.dumps(plant.input_json()).encode())
+
+            def do_POST(self):
+                segments = self.path.strip("/").split("/")
+                device_id, name = segments[-2:] if len(segments) > 1 else ("", "")
+                plant = server.plants.get(device_id)
+                if plant is None or name != "output.json":
+                    self._reply(404)
+                    return
+                if not self._basic_auth():
+                    self._reply(401)
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    plant.write(self.rfile.read(length).decode())
+                except ValueError:
+                    self._reply(400)
+                    return
+
+                self._reply(200)
+
+        return handler
+
+
+def _response(status: int, body: bytes = b"") -> requests.Response:
+    """Return a requests response."""
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.encoding = "utf-8"
+    return response
+
+
+class fake_session:
+    """In-process stand-in for the requests session of loex_api.
+
+    Requests are served by the plants without any socket. The thermal model
+    runs up to clock() before every request and tokens expire after
+    token_lifetime seconds of the clock.
+    """
+
+    def __init__(self, plants: dict[str, fake_plant], clock, token_lifetime=None):
+        """Initialize."""
+        self.plants = plants
+        self.clock = clock
+        self.token_lifetime = token_lifetime
+        # token -> expiry
+        self.tokens: dict[str, float] = {}
+        self.requests = 0
+
+    def _plant(self, url: str):
+        """Return the plant and the resource of an URL."""
+        segments = urllib.parse.urlparse(url).path.strip("/").split("/")
+        if segments[-1] == "jwt":
+            device_id = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)["id"][0]
+            return self.plants.get(device_id), "jwt"
+        return self.plants.get(segments[-2]), segments[-1]
+
+    def get(self, url, headers=None, auth=None, timeout=None):
+        """Serve a GET request."""
+        self.requests += 1
+        now = self.clock()
+        plant, resource = self._plant(url)
+
+        if plant is None:
+            return _response(404)
+
+        plant.advance(now)
+
+        if resource == "jwt":
+            if auth is None:
+                return _response(401)
+            token = f"token-{plant.device_id}-{now}"
+            self.tokens[token] = (
+                math.inf if self.token_lifetime is None else now + self.token_lifetime
+            )
+            return _response(200, token.encode())
+
+        token = (headers or {}).get("Authorization")
+        if self.tokens.get(token, 0) < now:
+            return _response(401)
+
+        return _response(200, json.dumps(plant.input_json()).encode())
+
+    def post(self, url, data=None, headers=None, auth=None, timeout=None):
+        """Serve a POST request."""
+        self.requests += 1
+        plant, resource = self._plant(url)
+
+        if plant is None or resource != "output.json":
+            return _response(404)
+        if auth is None:
+            return _response(401)
+
+        plant.advance(self.clock())
+        plant.write(data)
+
+        return _response(200)
+
+    def close(self):
+        """Close the session."""
@@ -0,0 +1,58 @@
+"""Test the plant-wide and room group aggregates."""
+import pytest
+
+from custom_components.loex_xsmart.aggregate import (
+    PLANT_GROUP,
+    compute_aggregates,
+    parse_room_groups,
+)
+
+
+def room(temperature, humidity, valve) -> dict:
+    """Return the parsed data of a room."""
+    return {"temperature": temperature, "humidity": humidity, "output_valve": valve}
+
+
+def test_parse_room_groups():
+    """Test room groups are parsed, and invalid ones rejected."""
+    assert parse_room_groups("") == {}
+    assert parse_room_groups("Ground floor: Kitchen, Living;\nAttic: Study") == {
+        "Ground floor": ["Kitchen", "Living"],
+        "Attic": ["Study"],
+    }
+
+    for text in ("Kitchen, Living", "Attic:", ": Study", "A: B; a: C", "plant: B"):
+        with pytest.raises(ValueError):
+            parse_room_groups(text)
+
+
+def test_compute_aggregates():
+    """Test the aggregates of the plant and the groups."""
+    data = {
+        0: room(20.5, 45.0, 1),
+        1: room(18.0, 60.0, 0),
+        2: room("N/A", 50.0, "N/A"),
+        3: room(30.0, 90.0, 1),
+    }
+    # Room 3 is not active
+    rooms = {0: "Kitchen", 1: "Living", 2: "Study"}
+    groups = {"Ground floor": ["kitchen", "Living", "Kitchen"], "Cellar": ["Wine"]}
+
+    aggregates = compute_aggregates(data, rooms, groups)
+
+    assert aggregates[PLANT_GROUP] == {
+        "rooms": 3,
+        "average_temperature": 19.25,
+        "min_temperature": 18.0,
+        "heating_rooms": 1,
+        "max_humidity": 60.0,
+    }
+    assert aggregates["Ground floor"]["rooms"] == 2
+    assert aggregates["Ground floor"]["heating_rooms"] == 1
+    assert aggregates["Cellar"] == {
+        "rooms": 0,
+        "average_temperature": None,
+        "min_temperature": None,
+        "heating_rooms": None,
+        "max_humidity": None,
+    }
@@ -0,0 +1,70 @@
+"""Test the refresh cadence estimation."""
+from custom_components.loex_xsmart.cadence import loex_cadence
+
+PERIOD = 30
+PHASE = 7
+
+
+def refreshes(since: float, until: float, period: float = PERIOD) -> int:
+    """Return the number of device refreshes in (since, until]."""
+    return (until - PHASE) // period - (since - PHASE) // period
+
+
+def align(cadence: loex_cadence, now: float, period: float = PERIOD) -> float:
+    """Poll every 10 seconds until the polls get aligned, return the last poll."""
+    last = None
+
+    while cadence.next_poll(now, 10) is None:
+        changed = last is None or refreshes(last, now, period) > 0
+        cadence.add_poll(now, changed, 10)
+        last = now
+        now += 10
+        assert now < 1000 + 20 * period
+
+    return last
+
+
+def test_cadence_alignment():
+    """Test polls get aligned on a regular refresh, and fall back on a drift."""
+    cadence = loex_cadence()
+    last = now = align(cadence, 1000.0)
+
+    assert abs(cadence.period - PERIOD) < 1
+    assert abs(cadence.phase - PHASE) < 5
+
+    for _ in range(10):
+        poll = cadence.next_poll(now, 10)
+        # Never later than the fixed interval
+        assert poll <= now + 10
+        changed = refreshes(last, poll) > 0
+        if changed:
+            # Just after the refresh
+            assert (poll - PHASE) % PERIOD < 5
+        cadence.add_poll(poll, changed, 10)
+        last = now = poll
+
+    assert cadence.next_poll(now, 10) is not None
+
+    # The device stops refreshing, the next aligned poll misses and fixed
+    # polling resumes
+    while cadence.next_poll(now, 10) is not None:
+        now = cadence.next_poll(now, 10)
+        cadence.add_poll(now, False, 10)
+
+    assert (now - PHASE) % PERIOD < 5
+
+
+def test_cadence_faster_refresh():
+    """Test polls aligned on a period do not lock onto its multiple."""
+    cadence = loex_cadence()
+    last = now = align(cadence, 1000.0, 2 * PERIOD)
+
+    assert abs(cadence.period - 2 * PERIOD) < 1
+
+    # The device now refreshes twice as often
+    for _ in range(60):
+        poll = cadence.next_poll(now, 10) or now + 10
+        cadence.add_poll(poll, refreshes(last, poll) > 0, 10)
+        last = now = poll
+
+    assert abs(cadence.period - PERIOD) < 1
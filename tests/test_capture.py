@@ -0,0 +1,165 @@
+"""Test payload capture and replay."""
+import time
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+import voluptuous as vol
+
+from homeassistant import loader
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.loex_xsmart.capture import (
+    KIND_INPUT,
+    KIND_OUTPUT,
+    async_replay,
+    loex_capture,
+    read_capture,
+)
+from custom_components.loex_xsmart.const import (
+    CAPTURE_FILENAME,
+    DOMAIN,
+    SERVICE_REPLAY_CAPTURE,
+)
+from custom_components.loex_xsmart.coordinator import loex_coordinator
+from custom_components.loex_xsmart.loex_api import (
+    WriteToRemoteDeviceError,
+    loex_api,
+)
+
+from .fake_xsmart import fake_plant, fake_session
+
+PAYLOAD = {
+    "t10011": 85,
+    "t20001": "Home",
+    "t20201": "Kitchen",
+    "t11021": 6,
+    "t11022": 213,
+    "t11023": 205,
+    "t11025": 1,
+    "t11026": 1,
+    "t11027": 480,
+}
+
+
+async def test_capture_replay(hass, tmp_path):
+    """Test a recording is replayed through the parser and the coordinator."""
+    path = str(tmp_path / "capture.jsonl.gz")
+
+    capture = loex_capture(path)
+    capture.record_input(PAYLOAD)
+    capture.record_output("17621=5")
+    capture.record_input({**PAYLOAD, "t11022": 215})
+    capture.close()
+
+    assert [kind for _, kind, _ in read_capture(path)] == [
+        KIND_INPUT,
+        KIND_OUTPUT,
+        KIND_INPUT,
+    ]
+
+    coordinator = loex_coordinator(hass, api=loex_api(), update_interval=10)
+    with patch.object(coordinator.duty_cycle, "async_add_snapshot") as add_snapshot:
+        stats = await async_replay(coordinator, path)
+
+    # The replayed snapshots are not recorded
+    add_snapshot.assert_not_called()
+
+    assert stats["inputs"] == 2
+    assert stats["outputs"] == 1
+    assert stats["parse"]["count"] == 2
+    assert coordinator.data["external"]["ext_temp"] == 8.5
+    assert coordinator.data[0]["temperature"] == 21.5
+
+
+class refusing_session(fake_session):
+    """Fake cloud answering the writes with an error."""
+
+    def post(self, url, data=None, headers=None, auth=None, timeout=None):
+        """Serve a POST request, with an error status."""
+        response = super().post(url, data, headers, auth, timeout)
+        response.status_code = 500
+        return response
+
+
+def test_capture_taken_writes(tmp_path):
+    """Test only the writes the plant took are recorded."""
+    path = str(tmp_path / "capture.jsonl.gz")
+    plants = {"WRITES": fake_plant("WRITES", 2)}
+    api = loex_api(session=fake_session(plants, time.time))
+    api.authenticate("capture-writes", "secret", "WRITES", "Home")
+    api.capture = loex_capture(path)
+
+    api.save_data("17621=5")
+    api.session = refusing_session(plants, time.time)
+    with pytest.raises(WriteToRemoteDeviceError):
+        api.save_data("17621=6")
+
+    api.capture.close()
+    api.release()
+
+    assert [body for _, _, body in read_capture(path)] == ["17621=5"]
+
+
+async def test_replay_service(hass, tmp_path, caplog):
+    """Test the replay service leaves the entities of the plants alone."""
+    hass.config.config_dir = str(tmp_path)
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "replay",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "REPLAY",
+        },
+    )
+    entry.add_to_hass(hass)
+
+    capture = loex_capture(hass.config.path(CAPTURE_FILENAME.format("field")))
+    capture.record_input(PAYLOAD)
+    capture.close()
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=fake_session({"REPLAY": fake_plant("REPLAY", 2)}, time.time),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        data = coordinator.data
+
+        entity_id = er.async_get(hass).async_get_entity_id(
+            "climate", DOMAIN, f"{DOMAIN}-0-{coordinator.api.host}"
+        )
+        state = hass.states.get(entity_id)
+
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_REPLAY_CAPTURE,
+            {"file": CAPTURE_FILENAME.format("field")},
+            blocking=True,
+        )
+        await hass.async_block_till_done()
+
+        assert "'inputs': 1" in caplog.text
+        assert coordinator.data is data
+        assert hass.states.get(entity_id) == state
+
+        with pytest.raises(HomeAssistantError):
+            await hass.services.async_call(
+                DOMAIN, SERVICE_REPLAY_CAPTURE, {"file": "missing.gz"}, blocking=True
+            )
+        with pytest.raises(vol.Invalid):
+            await hass.services.async_call(
+                DOMAIN,
+                SERVICE_REPLAY_CAPTURE,
+                {"file": "../secrets.yaml"},
+                blocking=True,
+            )
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
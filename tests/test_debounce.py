@@ -0,0 +1,209 @@
+"""Test the debouncing of the writes of interactive controls."""
+import asyncio
+import time
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+import pytest
+
+from homeassistant import loader
+from homeassistant.components.climate import DOMAIN as CLIMATE_DOMAIN
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.loex_xsmart.const import DOMAIN
+from custom_components.loex_xsmart.debounce import loex_write_debouncer
+
+from .fake_xsmart import fake_plant, fake_session, room_index
+
+
+async def test_burst_written_once(hass):
+    """Test a burst of writes is coalesced into its last value."""
+    debouncer = loex_write_debouncer(hass, delay=0.05, max_delay=1)
+    written = []
+
+    def write(value):
+        async def async_write():
+            written.append(value)
+
+        return async_write
+
+    callers = [
+        hass.async_create_task(debouncer.async_write("target", write(value)))
+        for value in range(10)
+    ]
+    await asyncio.gather(*callers)
+
+    assert written == [9]
+    assert debouncer.diagnostics()["coalesced"] == 9
+
+
+async def test_max_delay(hass):
+    """Test a control that keeps moving is written every max_delay."""
+    debouncer = loex_write_debouncer(hass, delay=0.05, max_delay=0.15)
+    written = []
+
+    async def async_write():
+        written.append(time.monotonic())
+
+    start = time.monotonic()
+    callers = []
+    while time.monotonic() - start < 1:
+        callers.append(
+            hass.async_create_task(debouncer.async_write("target", async_write))
+        )
+        await asyncio.sleep(0.02)
+    await asyncio.gather(*callers)
+
+    assert len(written) >= 4
+    assert written[0] - start < 0.5
+
+
+async def test_superseded_in_flight(hass):
+    """Test a write in flight is cancelled by a newer one, whose outcome it gets."""
+    debouncer = loex_write_debouncer(hass, delay=0.01, max_delay=1)
+    started = asyncio.Event()
+    cancelled = []
+    written = []
+
+    async def async_slow_write():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def async_write():
+        written.append(True)
+
+    first = hass.async_create_task(debouncer.async_write("target", async_slow_write))
+    await started.wait()
+    await debouncer.async_write("target", async_write)
+    await first
+
+    assert cancelled == [True]
+    assert written == [True]
+    assert debouncer.diagnostics()["superseded"] == 1
+
+
+async def test_error_reaches_every_caller(hass):
+    """Test the callers of coalesced writes all get the outcome of the last one."""
+    debouncer = loex_write_debouncer(hass, delay=0.01, max_delay=1)
+
+    async def async_write():
+        raise ValueError("rejected")
+
+    callers = [
+        hass.async_create_task(debouncer.async_write("target", async_write))
+        for _ in range(3)
+    ]
+
+    for caller in callers:
+        with pytest.raises(ValueError):
+            await caller
+
+
+async def test_slider_drag(hass):
+    """Test dragging a thermostat shows every value and writes the last one."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    plant = fake_plant("DRAG", 2)
+    session = fake_session({"DRAG": plant}, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "drag",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "DRAG",
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        coordinator.debouncer.delay = 0.05
+
+        room_id = next(iter(coordinator.rooms))
+        entity_id = er.async_get(hass).async_get_entity_id(
+            CLIMATE_DOMAIN, DOMAIN, f"{DOMAIN}-{room_id}-{coordinator.api.host}"
+        )
+        base = coordinator.data[room_id]["target_temperature"]
+        outputs = plant.outputs
+
+        for step in range(1, 6):
+            temperature = base + step / 10
+            await hass.services.async_call(
+                CLIMATE_DOMAIN,
+                "set_temperature",
+                {"entity_id": entity_id, "temperature": temperature},
+            )
+            await asyncio.sleep(0.01)
+            # Shown before it is written
+            state = hass.states.get(entity_id)
+            assert state.attributes["temperature"] == temperature
+
+        await hass.async_block_till_done()
+        assert plant.outputs == outputs + 1
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+async def test_written_value_expires(hass):
+    """Test setpoints are rounded, and shown until the next poll only."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    plant = fake_plant("EXPIRE", 2)
+    session = fake_session({"EXPIRE": plant}, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "expire",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "EXPIRE",
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        coordinator.debouncer.delay = 0.01
+
+        room_id = next(iter(coordinator.rooms))
+        entity_id = er.async_get(hass).async_get_entity_id(
+            CLIMATE_DOMAIN, DOMAIN, f"{DOMAIN}-{room_id}-{coordinator.api.host}"
+        )
+        register = 11023 + 10 * room_index(room_id)
+
+        # A correction of 0.7 °C on a circuit at 20 °C
+        await hass.services.async_call(
+            CLIMATE_DOMAIN,
+            "set_temperature",
+            {"entity_id": entity_id, "temperature": 20.7},
+            blocking=True,
+        )
+        assert plant.registers[register] == 207
+        assert hass.states.get(entity_id).attributes["temperature"] == 20.7
+
+        # The plant does not keep the value, the next poll shows it
+        plant.registers[register] = 200
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+        assert hass.states.get(entity_id).attributes["temperature"] == 20.0
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
@@ -0,0 +1,260 @@
+"""Test the config entries holding several devices."""
+import time
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+import requests
+
+from homeassistant import loader
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.loex_xsmart.capture import read_capture
+from custom_components.loex_xsmart.config_flow import validate_input
+from custom_components.loex_xsmart.const import (
+    CAPTURE_FILENAME,
+    CONF_CAPTURE,
+    CONF_HISTORY,
+    DOMAIN,
+    HISTORY_DIRNAME,
+)
+from custom_components.loex_xsmart.loex_api import loex_api, parse_device_ids
+from custom_components.loex_xsmart.ratelimit import loex_rate_limiter
+
+from .fake_xsmart import fake_plant, fake_session
+
+
+class flaky_session(fake_session):
+    """Fake cloud failing to serve some of the devices."""
+
+    failing: set[str] = set()
+
+    def get(self, url, headers=None, auth=None, timeout=None):
+        """Serve a GET request, unless it is for a failing device."""
+        plant, _ = self._plant(url)
+
+        if plant is not None and plant.device_id in self.failing:
+            self.requests += 1
+            raise requests.exceptions.ConnectionError("device not served")
+
+        return super().get(url, headers, auth, timeout)
+
+
+class closing_session(fake_session):
+    """Fake cloud session remembering it was closed."""
+
+    closed = False
+
+    def close(self):
+        """Close the session."""
+        self.closed = True
+
+
+def test_parse_device_ids():
+    """Test the device ids of an entry are split, trimmed and deduplicated."""
+    assert parse_device_ids("A1B2") == ["A1B2"]
+    assert parse_device_ids(" A1B2, C3D4 ,,A1B2") == ["A1B2", "C3D4"]
+    assert parse_device_ids(" , ") == []
+
+
+async def test_devices_validated(hass):
+    """Test the config flow logs every device in once, over one session."""
+    plants = {device_id: fake_plant(device_id, 2) for device_id in ("V1", "V2", "V3")}
+    session = closing_session(plants, time.time)
+    limiter = loex_rate_limiter()
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ) as session_class, patch(
+        "custom_components.loex_xsmart.loex_api.get_rate_limiter",
+        return_value=limiter,
+    ):
+        info = await validate_input(
+            hass,
+            {
+                "username": "validated",
+                "password": "secret",
+                "plant": "Home",
+                "deviceId": "V1, V2, V3",
+            },
+        )
+
+    assert info == {"title": "Home"}
+    assert session_class.call_count == 1
+    assert session.requests == 3
+    assert session.closed
+    # No login was charged as a login again, no plant is counted
+    assert limiter.stats["writes"] == 0
+    assert limiter.plants == 0
+
+
+async def test_devices_refreshed_together(hass):
+    """Test the devices share a session and a cycle, and fail on their own."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    plants = {
+        "FIRST": fake_plant("FIRST", 2),
+        "SECOND": fake_plant("SECOND", 3),
+    }
+    session = flaky_session(plants, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "devices",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "FIRST, SECOND",
+        },
+        options={"staleness_budget": 0},
+    )
+    entry.add_to_hass(hass)
+    registry = er.async_get(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ) as session_class:
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+
+        assert session_class.call_count == 1
+        assert [plant.inputs for plant in plants.values()] == [1, 1]
+        assert set(coordinator.snapshots) == {"FIRST", "SECOND"}
+
+        # The first device keeps the ids of a single device entry
+        host = loex_api().host
+        first = registry.async_get_entity_id(
+            "climate", DOMAIN, f"{DOMAIN}-main_circuit-{host}"
+        )
+        second = registry.async_get_entity_id(
+            "climate", DOMAIN, f"{DOMAIN}-main_circuit-{host}-SECOND"
+        )
+        assert registry.async_get_entity_id(
+            "climate", DOMAIN, f"{DOMAIN}-2-{host}-SECOND"
+        )
+        assert registry.async_get(first).device_id != registry.async_get(
+            second
+        ).device_id
+
+        session.failing = {"SECOND"}
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        assert plants["FIRST"].inputs == 2
+        assert coordinator.last_update_success
+        assert not coordinator.devices[0].last_update_success
+        assert hass.states.get(first).state != STATE_UNAVAILABLE
+        assert hass.states.get(second).state == STATE_UNAVAILABLE
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+async def test_device_down_at_setup(hass):
+    """Test a device down during the setup joins the entry once it answers."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    plants = {
+        "UP": fake_plant("UP", 2),
+        "DOWN": fake_plant("DOWN", 3),
+    }
+    session = flaky_session(plants, time.time)
+    session.failing = {"DOWN"}
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "down",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "UP, DOWN",
+        },
+    )
+    entry.add_to_hass(hass)
+    registry = er.async_get(hass)
+    host = loex_api().host
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        device = coordinator.devices[0]
+
+        assert registry.async_get_entity_id(
+            "climate", DOMAIN, f"{DOMAIN}-main_circuit-{host}"
+        )
+        assert not device.last_update_success
+        assert not registry.async_get_entity_id(
+            "climate", DOMAIN, f"{DOMAIN}-main_circuit-{host}-DOWN"
+        )
+
+        # Its first good poll logs in and builds its entities
+        session.failing = set()
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        assert device.last_update_success
+        assert device.api.authorization is not None
+        for unique_id in ("main_circuit", "2"):
+            entity_id = registry.async_get_entity_id(
+                "climate", DOMAIN, f"{DOMAIN}-{unique_id}-{host}-DOWN"
+            )
+            assert hass.states.get(entity_id).state != STATE_UNAVAILABLE
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+async def test_many_devices(hass, tmp_path):
+    """Test an entry with many devices sets up and records each on its own."""
+    hass.config.config_dir = str(tmp_path)
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    device_ids = [f"MANY{index}" for index in range(6)]
+    plants = {device_id: fake_plant(device_id, 2) for device_id in device_ids}
+    session = fake_session(plants, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "many",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": ", ".join(device_ids),
+        },
+        options={CONF_CAPTURE: True, CONF_HISTORY: True},
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+
+        assert len(coordinator.entry_devices) == 6
+        assert [plant.inputs for plant in plants.values()] == [1] * 6
+
+        await coordinator.async_refresh()
+        assert [plant.inputs for plant in plants.values()] == [2] * 6
+
+        histories = {device.history.directory for device in coordinator.entry_devices}
+        assert len(histories) == 6
+        assert hass.config.path(HISTORY_DIRNAME.format(entry.entry_id)) in histories
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+    # Closed on unload, so complete
+    for device_id in device_ids[1:]:
+        file_id = f"{entry.entry_id}_{device_id}"
+        path = hass.config.path(CAPTURE_FILENAME.format(file_id))
+        assert len(list(read_capture(path))) == 2
@@ -0,0 +1,105 @@
+"""Test the valve duty-cycle rolling windows."""
+from datetime import datetime, timedelta, timezone
+
+from custom_components.loex_xsmart.duty_cycle import (
+    PLANT,
+    loex_duty_cycle,
+    loex_rolling_window,
+)
+
+ROOMS = {0: "Kitchen", 1: "Living"}
+
+
+def snapshot(*valves) -> dict:
+    """Return a snapshot with the valve outputs of the rooms."""
+    return {room_id: {"output_valve": valve} for room_id, valve in enumerate(valves)}
+
+
+def at(minute: int) -> datetime:
+    """Return a time, in minutes after 10:00."""
+    return datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc) + timedelta(minutes=minute)
+
+
+def test_rolling_window():
+    """Test open time is integrated and expires with the window."""
+    window = loex_rolling_window(3600, 60)
+
+    window.add(0, 900, True)
+    window.add(900, 1800, False)
+    assert window.ratio(1800) == 0.5
+
+    # The first quarter of an hour leaves the window
+    window.add(1800, 4500, False)
+    assert window.ratio(4500) == 0
+
+    restored = loex_rolling_window(3600, 60)
+    restored.restore(window.as_dict())
+    assert restored.ratio(4500) == 0
+    assert restored.ratio(9000) is None
+
+
+async def test_snapshots_integrated(hass, hass_storage):
+    """Test valve states are held until the next snapshot, gaps are skipped."""
+    duty_cycle = loex_duty_cycle(hass, "VALVES")
+    assert duty_cycle.duty_cycle(0, "hour", at(0)) is None
+
+    duty_cycle.async_add_snapshot(snapshot(1, 0), ROOMS, at(0))
+    duty_cycle.async_add_snapshot(snapshot(1, 0), ROOMS, at(5))
+    duty_cycle.async_add_snapshot(snapshot(0, 0), ROOMS, at(10))
+    # A missing reading is not integrated
+    duty_cycle.async_add_snapshot(snapshot(0, "N/A"), ROOMS, at(15))
+    duty_cycle.async_add_snapshot(snapshot(0, 0), ROOMS, at(20))
+
+    assert duty_cycle.duty_cycle(0, "hour", at(20)) == 50.0
+    assert duty_cycle.duty_cycle(1, "hour", at(20)) == 0.0
+    assert duty_cycle.duty_cycle(PLANT, "hour", at(20)) == 50.0
+
+    # Beyond the maximum gap, the polls in between are missing
+    duty_cycle.async_add_snapshot(snapshot(1, 1), ROOMS, at(40))
+    assert duty_cycle.duty_cycle(0, "hour", at(40)) == 50.0
+    duty_cycle.async_add_snapshot(snapshot(1, 1), ROOMS, at(45))
+
+    assert duty_cycle.duty_cycle(0, "hour", at(45)) == 60.0
+    assert duty_cycle.duty_cycle(1, "hour", at(45)) == 25.0
+    assert duty_cycle.duty_cycle(PLANT, "hour", at(45)) == 60.0
+    assert duty_cycle.duty_cycle(PLANT, "day", at(45)) == 60.0
+    assert duty_cycle.duty_cycle(2, "hour", at(45)) is None
+
+
+async def test_windows_survive_restart(hass, hass_storage):
+    """Test the windows are saved and restored across a restart."""
+    duty_cycle = loex_duty_cycle(hass, "RESTART")
+    await duty_cycle.async_load()
+    duty_cycle.async_add_snapshot(snapshot(1, 0), ROOMS, at(0))
+    duty_cycle.async_add_snapshot(snapshot(0, 0), ROOMS, at(5))
+    await duty_cycle.async_save()
+
+    duty_cycle = loex_duty_cycle(hass, "RESTART")
+    await duty_cycle.async_load()
+    assert duty_cycle.duty_cycle(0, "hour", at(5)) == 100.0
+    assert duty_cycle.duty_cycle(PLANT, "day", at(5)) == 100.0
+
+    # The valve states during the restart are unknown, they are not integrated
+    duty_cycle.async_add_snapshot(snapshot(0, 0), ROOMS, at(10))
+    duty_cycle.async_add_snapshot(snapshot(0, 0), ROOMS, at(15))
+
+    assert duty_cycle.duty_cycle(0, "hour", at(15)) == 50.0
+    assert duty_cycle.duty_cycle(1, "hour", at(15)) == 0.0
+
+
+async def test_room_retired_mid_window(hass, hass_storage):
+    """Test a retired room keeps its duty cycle until it leaves the window."""
+    duty_cycle = loex_duty_cycle(hass, "RETIRED")
+    duty_cycle.async_add_snapshot(snapshot(0, 1), ROOMS, at(0))
+    duty_cycle.async_add_snapshot(snapshot(0, 1), ROOMS, at(5))
+    # The living room is retired, its valve is no longer followed
+    duty_cycle.async_add_snapshot(snapshot(0, 1), {0: "Kitchen"}, at(10))
+    duty_cycle.async_add_snapshot(snapshot(0), {0: "Kitchen"}, at(15))
+
+    assert duty_cycle.duty_cycle(0, "hour", at(15)) == 0.0
+    assert duty_cycle.duty_cycle(1, "hour", at(15)) == 100.0
+    assert duty_cycle.duty_cycle(PLANT, "hour", at(15)) == 66.7
+
+    assert duty_cycle.duty_cycle(1, "hour", at(30)) == 100.0
+    assert duty_cycle.duty_cycle(1, "hour", at(75)) is None
+    assert duty_cycle.duty_cycle(1, "day", at(75)) == 100.0
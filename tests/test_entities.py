@@ -0,0 +1,68 @@
+"""Test the entities described by the description tables."""
+import time
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant import loader
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.loex_xsmart.const import DOMAIN
+from custom_components.loex_xsmart.loex_api import loex_api
+
+from .fake_xsmart import fake_plant, fake_session
+
+
+async def test_extras_decoded_while_enabled(hass):
+    """Test the extras are disabled, and their fields decoded once enabled."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    plant = fake_plant("EXTRAS", 2)
+    plant.registers[10107] = 1
+    session = fake_session({"EXTRAS": plant}, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "extras",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "EXTRAS",
+        },
+    )
+    entry.add_to_hass(hass)
+    registry = er.async_get(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+
+        host = loex_api().host
+        entity_id = registry.async_get_entity_id(
+            "binary_sensor", DOMAIN, f"{DOMAIN}-deumidification_active-{host}"
+        )
+        disabled_by = registry.async_get(entity_id).disabled_by
+        assert disabled_by is er.RegistryEntryDisabler.INTEGRATION
+        assert registry.async_get_entity_id(
+            "sensor", DOMAIN, f"{DOMAIN}-1_target_temperature-{host}"
+        )
+        assert "deumidification_active" not in coordinator.data["circuit"]
+
+        registry.async_update_entity(entity_id, disabled_by=None)
+        await hass.config_entries.async_reload(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+        assert coordinator.data["circuit"]["deumidification_active"] == 1
+        assert hass.states.get(entity_id).state == "on"
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        assert coordinator.api.decode_fields == frozenset()
+
@@ -0,0 +1,90 @@
+"""Test the headless poller and its Prometheus endpoint."""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import requests
+
+from custom_components.loex_xsmart import headless
+from custom_components.loex_xsmart.headless import loex_exporter
+
+from .fake_xsmart import fake_plant, fake_xsmart_server
+
+
+def plants_config(server: fake_xsmart_server, device_ids: list[str]) -> list[dict]:
+    """Return the configuration of plants served by the fake cloud."""
+    return [
+        {
+            "username": "user",
+            "password": "secret",
+            "deviceId": device_id,
+            "plant": "Home",
+            "host": server.plant_url(device_id),
+        }
+        for device_id in device_ids
+    ]
+
+
+def test_exporter_metrics(socket_enabled, monkeypatch):
+    """Test plants are polled concurrently and scrapes return the cached buffer."""
+    server = fake_xsmart_server([fake_plant("DEV1", 3), fake_plant("DEV2", 2)])
+    server.start()
+
+    exporter = loex_exporter(plants_config(server, ["DEV1", "DEV2", "NONE"]), 10)
+    metrics = exporter.serve("127.0.0.1", 0)
+
+    try:
+        asyncio.run(exporter.async_poll_all())
+
+        renders = []
+        monkeypatch.setattr(exporter, "render", lambda: renders.append(1))
+        url = f"http://127.0.0.1:{metrics.server_address[1]}/metrics"
+        body = requests.get(url, timeout=5).text
+        assert requests.get(url, timeout=5).text == body
+        assert not renders
+    finally:
+        metrics.shutdown()
+        exporter.close()
+        server.stop()
+
+    assert 'loex_up{device="DEV1",plant="Home"} 1.0' in body
+    assert 'loex_up{device="NONE",plant="Home"} 0.0' in body
+    assert 'loex_poll_failures_total{device="NONE",plant="Home"} 1.0' in body
+    assert (
+        'loex_room_temperature_celsius{device="DEV1",plant="Home",room_id="2",'
+        'room="Room 2"} 20.2' in body
+    )
+    assert body.count("# TYPE loex_room_temperature_celsius gauge") == 1
+    assert body.count("loex_room_temperature_celsius{") == 5
+
+
+def test_headless_without_home_assistant(socket_enabled, tmp_path):
+    """Test the poller runs as a script when Home Assistant is not installed."""
+    server = fake_xsmart_server([fake_plant("DEV1", 1)])
+    server.start()
+
+    config = tmp_path / "plants.json"
+    config.write_text(json.dumps(plants_config(server, ["DEV1"])))
+    script = os.path.join(os.path.dirname(headless.__file__), "run_headless.py")
+    # A None module makes every import of Home Assistant fail
+    code = (
+        "import runpy, sys; sys.modules['homeassistant'] = None; "
+        f"sys.argv = ['run_headless.py', {str(config)!r}, '--once']; "
+        f"runpy.run_path({script!r}, run_name='__main__')"
+    )
+
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            timeout=60,
+            check=False,
+        )
+    finally:
+        server.stop()
+
+    assert result.returncode == 0, result.stderr
+    assert 'loex_up{device="DEV1",plant="Home"} 1.0' in result.stdout
@@ -0,0 +1,88 @@
+"""Test the hedged reads."""
+import itertools
+import threading
+import time
+
+from custom_components.loex_xsmart.hedge import loex_hedge
+
+
+class response:
+    """Response stand-in."""
+
+    def __init__(self, name: str) -> None:
+        """Initialize."""
+        self.name = name
+        self.closed = False
+
+    def close(self) -> None:
+        """Close the response."""
+        self.closed = True
+
+
+def test_hedge_slow_request():
+    """Test a slow request is hedged and the hedge wins."""
+    hedge = loex_hedge()
+
+    for _ in range(20):
+        assert hedge.fetch(lambda: response("fast"), lambda: True).name == "fast"
+
+    counter = itertools.count()
+    responses = []
+
+    def request():
+        attempt = next(counter)
+        if attempt == 0:
+            time.sleep(0.8)
+        responses.append(response(f"attempt {attempt}"))
+        return responses[-1]
+
+    assert hedge.fetch(request, lambda: True).name == "attempt 1"
+
+    # Let the primary request finish
+    time.sleep(0.6)
+
+    diagnostics = hedge.diagnostics()
+    assert diagnostics["hedges"] == 1
+    assert diagnostics["hedge_wins"] == 1
+    assert diagnostics["saved_seconds"] > 0
+    assert responses[-1].closed
+
+    hedge.close()
+
+
+def test_hedge_vetoed():
+    """Test no hedge is sent when the caller vetoes it."""
+    hedge = loex_hedge()
+
+    for _ in range(20):
+        hedge.fetch(lambda: response("fast"), lambda: True)
+
+    def request():
+        time.sleep(0.6)
+        return response("slow")
+
+    assert hedge.fetch(request, lambda: False).name == "slow"
+    assert hedge.diagnostics()["hedges"] == 0
+
+    hedge.close()
+
+
+def test_hedge_threads_reused():
+    """Test the fetches share two threads instead of starting their own."""
+    hedge = loex_hedge()
+    threads = set()
+
+    def request():
+        threads.add(threading.current_thread())
+        return response("fast")
+
+    for _ in range(50):
+        hedge.fetch(request, lambda: True)
+
+    # The first fetches run in the calling thread, then in a worker
+    assert len(threads) <= 3
+    assert threading.current_thread() in threads
+
+    hedge.close()
+    threads.discard(threading.current_thread())
+    assert not any(thread.is_alive() for thread in threads)
@@ -0,0 +1,75 @@
+"""Test the on-disk poll log."""
+import csv
+import os
+
+from custom_components.loex_xsmart import history as history_module
+from custom_components.loex_xsmart.history import (
+    export_history,
+    history_channels,
+    loex_history,
+    read_history,
+    snapshot_values,
+)
+from custom_components.loex_xsmart.loex_api import loex_api
+
+PAYLOAD = {
+    "t10011": -25,
+    "t20001": "Home",
+    "t20201": "Kitchen",
+    "t11021": 6,
+    "t11022": 213,
+    "t11023": 205,
+    "t11025": 1,
+    "t11026": 1,
+}
+
+
+def test_history_roundtrip(tmp_path, monkeypatch):
+    """Test snapshots are logged, rotated, recovered and exported."""
+    monkeypatch.setattr(history_module, "HISTORY_SEGMENT_ROWS", 10)
+    monkeypatch.setattr(history_module, "HISTORY_FILE_SEGMENTS", 2)
+    directory = str(tmp_path / "history")
+    api = loex_api()
+
+    log = loex_history(directory, max_bytes=10**6)
+    for minute in range(100):
+        data = api.extract_from_api_data({**PAYLOAD, "t11022": 213 + minute % 3})
+        if log.add(60 * minute, snapshot_values(data, {0: "Kitchen"})):
+            log.flush()
+
+    # 10 segments in 5 files
+    assert log.diagnostics()["segments_written"] == 10
+    assert log.diagnostics()["files"] == 5
+
+    rows = list(read_history(directory, 600, 1200))
+    assert [timestamp for timestamp, _ in rows] == list(range(600, 1200, 60))
+    assert rows[0][1]["ext_temp"] == -2.5
+    assert rows[0][1]["room_0_temperature"] == 21.4
+    assert rows[0][1]["room_0_room_mode"] == 1
+    # Humidity and the other "N/A" readings are left out
+    assert "room_0_humidity" not in rows[0][1]
+
+    # An interrupted write is dropped when the log is reopened
+    last = sorted(os.listdir(directory))[-1]
+    with open(os.path.join(directory, last), "ab") as data:
+        data.write(b"partial")
+    log = loex_history(directory, max_bytes=2 * log.diagnostics()["bytes"] // 5)
+    assert log.diagnostics()["bytes"] == sum(
+        os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+    )
+    log.add(6000, {"ext_temp": 10})
+    log.flush()
+
+    # Rotation kept the newest files within the budget
+    assert log.diagnostics()["files_removed"] > 0
+    assert log.diagnostics()["bytes"] <= log.max_bytes
+    assert list(read_history(directory, 6000))[0] == (6000.0, {"ext_temp": 1.0})
+    assert "room_0_temperature" in history_channels(directory)
+
+    path = str(tmp_path / "export.csv")
+    exported = len(list(read_history(directory, end=6000)))
+    assert export_history(directory, path, end=6000) == exported
+    with open(path, encoding="utf-8") as export:
+        header, first = list(csv.reader(export))[:2]
+    assert header[0] == "timestamp"
+    assert first[header.index("ext_temp")] == "-2.5"
@@ -0,0 +1,233 @@
+"""Load test of many plants against a local fake Xsmart server.
+
+A short smoke run is part of the test suite. The full run is opt-in, set
+LOEX_LOAD_PLANTS to the number of plants to simulate, and optionally
+LOEX_LOAD_ROOMS, LOEX_LOAD_DURATION, LOEX_LOAD_POLL_INTERVAL and
+LOEX_LOAD_WRITE_INTERVAL (seconds). Run with -s to see the report:
+
+    LOEX_LOAD_PLANTS=50 pytest -s tests/test_load.py -k capacity
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import tracemalloc
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant import loader
+from homeassistant.components.climate import DOMAIN as CLIMATE_DOMAIN
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.loex_xsmart.const import CONF_SYNC_INTERVAL, DOMAIN, MAX_ROOMS
+
+from .fake_xsmart import fake_plant, fake_xsmart_server
+
+# Period of the event loop lag probe
+LAG_PROBE = 0.05  # seconds
+
+# Time allowed to a poll to confirm a command
+CONFIRM_TIMEOUT = 60  # seconds
+
+
+def _percentiles(samples: list[float]) -> dict:
+    """Summarize a list of durations, in milliseconds."""
+    if not samples:
+        return {"count": 0}
+
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return round(ordered[int(fraction * (len(ordered) - 1))] * 1000, 1)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+async def async_run_load(
+    hass,
+    plants: int,
+    rooms: int,
+    duration: float,
+    poll_interval: int,
+    write_interval: float,
+) -> dict:
+    """Run plants config entries against a fake server and return a report."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    fakes = [fake_plant(f"LOAD{index:04}", rooms) for index in range(plants)]
+    server = fake_xsmart_server(fakes)
+    server.start()
+
+    loop = asyncio.get_running_loop()
+    executor = getattr(loop, "_default_executor", None)
+    lags = []
+    queue_depths = []
+    latencies = []
+    failures = 0
+    entries = []
+
+    async def probe() -> None:
+        """Sample the event loop lag and the executor queue depth."""
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_PROBE)
+            lags.append(max(0.0, loop.time() - start - LAG_PROBE))
+            if executor is not None:
+                queue_depths.append(executor._work_queue.qsize())
+
+    async def command(entry, plant: fake_plant) -> None:
+        """Set a random room setpoint and wait for a poll to confirm it."""
+        nonlocal failures
+
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        room_id = random.choice(list(coordinator.rooms))
+        temperature = coordinator.data["circuit"]["temperature"] + random.randint(
+            -20, 20
+        ) / 10
+        entity_id = er.async_get(hass).async_get_entity_id(
+            CLIMATE_DOMAIN, DOMAIN, f"{DOMAIN}-{room_id}-{coordinator.api.host}"
+        )
+
+        start = time.perf_counter()
+        try:
+            await hass.services.async_call(
+                CLIMATE_DOMAIN,
+                "set_temperature",
+                {"entity_id": entity_id, "temperature": temperature},
+                blocking=True,
+            )
+
+            async with asyncio.timeout(CONFIRM_TIMEOUT):
+                while (
+                    abs(coordinator.data[room_id]["target_temperature"] - temperature)
+                    > 0.05
+                ):
+                    await asyncio.sleep(0.05)
+        except Exception:  # noqa: BLE001
+            failures += 1
+            return
+
+        latencies.append(time.perf_counter() - start)
+
+    async def drive(entry, plant: fake_plant) -> None:
+        """Issue commands to a plant at jittered intervals."""
+        commands = set()
+        try:
+            while True:
+                await asyncio.sleep(write_interval * random.uniform(0.5, 1.5))
+                task = asyncio.create_task(command(entry, plant))
+                commands.add(task)
+                task.add_done_callback(commands.discard)
+        finally:
+            for task in commands:
+                task.cancel()
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    setup_start = time.perf_counter()
+
+    try:
+        for fake in fakes:
+            entry = MockConfigEntry(
+                domain=DOMAIN,
+                data={
+                    "username": f"user-{fake.device_id}",
+                    "password": "secret",
+                    "plant": "Home",
+                    "deviceId": fake.device_id,
+                },
+                options={CONF_SYNC_INTERVAL: poll_interval},
+            )
+            entry.add_to_hass(hass)
+
+            with patch(
+                "custom_components.loex_xsmart.loex_api._ENDPOINT",
+                server.plant_url(fake.device_id),
+            ):
+                assert await hass.config_entries.async_setup(entry.entry_id)
+            entries.append(entry)
+
+        await hass.async_block_till_done()
+        setup_time = time.perf_counter() - setup_start
+        memory = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        inputs_before = sum(fake.inputs for fake in fakes)
+        tasks = [asyncio.create_task(probe())]
+        tasks += [
+            asyncio.create_task(drive(entry, fake))
+            for entry, fake in zip(entries, fakes)
+        ]
+
+        await asyncio.sleep(duration)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        for entry in entries:
+            await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        server.stop()
+
+    return {
+        "plants": plants,
+        "rooms": rooms,
+        "duration_s": duration,
+        "setup_s": round(setup_time, 2),
+        "memory_per_plant_kib": round(memory / plants / 1024, 1),
+        "polls": sum(fake.inputs for fake in fakes) - inputs_before,
+        "writes": sum(fake.outputs for fake in fakes),
+        "loop_lag": _percentiles(lags),
+        "executor_queue": {
+            "max": max(queue_depths, default=0),
+            "mean": round(sum(queue_depths) / len(queue_depths), 2)
+            if queue_depths
+            else 0,
+        },
+        "command_latency": _percentiles(latencies),
+        "command_failures": failures,
+    }
+
+
+async def test_load_smoke(hass, socket_enabled):
+    """Test a couple of plants are polled and commanded through the fake server."""
+    report = await async_run_load(
+        hass, plants=2, rooms=4, duration=4, poll_interval=1, write_interval=1
+    )
+
+    assert report["polls"] > 0
+    assert report["writes"] > 0
+    assert report["command_latency"]["count"] > 0
+    assert report["loop_lag"]["count"] > 0
+
+
+@pytest.mark.skipif(
+    "LOEX_LOAD_PLANTS" not in os.environ, reason="set LOEX_LOAD_PLANTS to run"
+)
+async def test_load_capacity(hass, socket_enabled):
+    """Report capacity numbers for LOEX_LOAD_PLANTS plants."""
+    report = await async_run_load(
+        hass,
+        plants=int(os.environ["LOEX_LOAD_PLANTS"]),
+        rooms=int(os.environ.get("LOEX_LOAD_ROOMS", MAX_ROOMS)),
+        duration=float(os.environ.get("LOEX_LOAD_DURATION", 60)),
+        poll_interval=int(os.environ.get("LOEX_LOAD_POLL_INTERVAL", 10)),
+        write_interval=float(os.environ.get("LOEX_LOAD_WRITE_INTERVAL", 30)),
+    )
+
+    print(json.dumps(report, indent=2))
+
+    assert report["polls"] > 0
@@ -0,0 +1,93 @@
+"""Test the options applied in place, without a reload."""
+import time
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant import loader
+from homeassistant.config_entries import ConfigEntryState
+
+from custom_components.loex_xsmart.const import (
+    CONF_CAPTURE,
+    CONF_OUTBOX_TTL,
+    CONF_ROOM_GROUPS,
+    CONF_SYNC_INTERVAL,
+    CONF_TEMPERATURE_DEADBAND,
+    CONF_TRACE_SLOW_THRESHOLD,
+    DOMAIN,
+)
+
+from .fake_xsmart import fake_plant, fake_session
+
+
+async def test_options_applied_in_place(hass, tmp_path, caplog):
+    """Test runtime options keep the coordinator, room groups reload the entry."""
+    hass.config.config_dir = str(tmp_path)
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    plant = fake_plant("OPTIONS", 2)
+    session = fake_session({"OPTIONS": plant}, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "options",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "OPTIONS",
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+
+        hass.config_entries.async_update_entry(
+            entry,
+            options={
+                CONF_SYNC_INTERVAL: 30,
+                CONF_TEMPERATURE_DEADBAND: 0.5,
+                CONF_TRACE_SLOW_THRESHOLD: 2,
+                CONF_OUTBOX_TTL: 5,
+                CONF_CAPTURE: True,
+            },
+        )
+        await hass.async_block_till_done()
+
+        # Same coordinator, no new poll, the options are live
+        assert hass.data[DOMAIN][entry.entry_id] is coordinator
+        assert plant.inputs == 1
+        assert coordinator.poll_interval.total_seconds() == 30
+        assert coordinator.publish_filter.deadbands["temperature"] == 0.5
+        assert coordinator.tracer.slow_threshold == 2
+        assert coordinator.outbox.ttl == 5 * 60
+        assert coordinator.api.capture is not None
+
+        hass.config_entries.async_update_entry(
+            entry,
+            options={**entry.options, CONF_ROOM_GROUPS: "Zone: Room 0; Attic: Study"},
+        )
+        await hass.async_block_till_done()
+
+        # Room groups have their own sensors, the entry is reloaded
+        assert entry.state is ConfigEntryState.LOADED
+        assert hass.data[DOMAIN][entry.entry_id] is not coordinator
+        assert plant.inputs == 2
+
+        # A group matching no room is logged once
+        await hass.data[DOMAIN][entry.entry_id].async_refresh()
+        warnings = [
+            record.getMessage()
+            for record in caplog.records
+            if "matches no active room" in record.getMessage()
+        ]
+        assert len(warnings) == 1
+        assert "Attic" in warnings[0]
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
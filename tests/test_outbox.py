@@ -0,0 +1,157 @@
+"""Test the outbox of the writes made during a cloud outage."""
+import time
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+import requests
+
+from homeassistant import loader
+
+from custom_components.loex_xsmart import coordinator as coordinator_module
+from custom_components.loex_xsmart.const import DOMAIN
+from custom_components.loex_xsmart.outbox import loex_outbox
+from custom_components.loex_xsmart.ratelimit import loex_rate_limiter
+
+from .fake_xsmart import fake_plant, fake_session
+
+
+class outage_session(fake_session):
+    """Fake cloud rejecting the writes while it is down."""
+
+    down = False
+
+    def post(self, url, data=None, headers=None, auth=None, timeout=None):
+        """Serve a POST request, unless the cloud is down."""
+        if self.down:
+            self.requests += 1
+            raise requests.exceptions.ConnectionError("cloud down")
+
+        return super().post(url, data, headers, auth, timeout)
+
+
+async def test_outbox_replays_after_outage(hass, freezer):
+    """Test writes are queued, collapsed, expired and replayed in one pass."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    plant = fake_plant("OUTBOX", 2)
+    session = outage_session({"OUTBOX": plant}, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "outbox",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "OUTBOX",
+        },
+        options={"outbox_ttl": 10},
+    )
+    entry.add_to_hass(hass)
+
+    # Every failed write logs in again
+    limiter = loex_rate_limiter(capacity=100)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ), patch(
+        "custom_components.loex_xsmart.loex_api.get_rate_limiter",
+        return_value=limiter,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+
+        session.down = True
+        # The calls succeed, the writes wait in the outbox
+        await coordinator.async_set_circuit_mode(1)
+        await coordinator.async_set_room_mode(0, 2)
+        await coordinator.async_set_room_mode(0, 3)
+        await coordinator.async_set_room_mode(1, 2)
+
+        freezer.tick(9 * 60)
+        await coordinator.async_set_room_mode(1, 0)
+
+        # The queue survives a restart
+        await coordinator.outbox.async_save()
+        restored = loex_outbox(hass, "OUTBOX")
+        await restored.async_load()
+        assert len(restored) == 3
+
+        freezer.tick(2 * 60)
+
+        outbox = coordinator.outbox.diagnostics()
+        assert [write["payload"] for write in outbox["pending"]] == [
+            "18001=1",
+            "17622=3",
+            "17632=0",
+        ]
+        assert outbox["collapsed"] == 2
+
+        session.down = False
+        outputs = plant.outputs
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        # The first two expired, room 1 is replayed with its last value
+        assert plant.outputs == outputs + 1
+        assert plant.registers[11036] == 0
+        outbox = coordinator.outbox.diagnostics()
+        assert outbox["pending"] == []
+        assert outbox["expired"] == 2
+        assert outbox["replayed"] == 1
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+class hanging_session(fake_session):
+    """Fake cloud taking its time to answer the writes."""
+
+    hang = 0.0
+
+    def post(self, url, data=None, headers=None, auth=None, timeout=None):
+        """Serve a POST request, late."""
+        time.sleep(self.hang)
+
+        return super().post(url, data, headers, auth, timeout)
+
+
+async def test_deadline_write_queued(hass, monkeypatch):
+    """Test a write sent but past the deadline of its call is queued."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    monkeypatch.setattr(coordinator_module, "WRITE_DEADLINE", 0.2)
+    plant = fake_plant("HANG", 2)
+    session = hanging_session({"HANG": plant}, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "hang",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "HANG",
+        },
+        options={"outbox_ttl": 10},
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+
+        session.hang = 0.5
+        # The call succeeds, the write waits in the outbox
+        assert await coordinator.async_set_circuit_mode(2) is None
+
+        outbox = coordinator.outbox.diagnostics()
+        assert [write["payload"] for write in outbox["pending"]] == ["18001=2"]
+
+        session.hang = 0
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
@@ -0,0 +1,71 @@
+"""Test the on-demand profiler and its service."""
+import asyncio
+import glob
+import threading
+import tracemalloc
+
+import pytest
+
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.loex_xsmart.cadence import loex_cadence
+from custom_components.loex_xsmart.const import DOMAIN, SERVICE_PROFILE
+from custom_components.loex_xsmart.profiler import loex_profiler
+from custom_components.loex_xsmart.services import (
+    async_setup_services,
+    async_unload_services,
+)
+
+
+def test_profiler_samples_integration_code():
+    """Test only the integration frames are sampled, and tracemalloc is restored."""
+    done = threading.Event()
+
+    def busy():
+        cadence = loex_cadence()
+        now = 0.0
+        while not done.is_set():
+            cadence.add_poll(now, True, 10)
+            now += 10
+
+    profiler = loex_profiler(interval=0.001)
+    profiler.start()
+    worker = threading.Thread(target=busy)
+    worker.start()
+    try:
+        done.wait(0.3)
+    finally:
+        done.set()
+        worker.join()
+    report = profiler.stop()
+
+    assert profiler.hits > 0
+    assert "add_poll (cadence.py:" in report
+    assert "profiler.py" not in report
+    assert not tracemalloc.is_tracing()
+
+
+async def test_profile_service(hass, tmp_path):
+    """Test the service writes a report, one profile at a time."""
+    hass.config.config_dir = str(tmp_path)
+    await async_setup_services(hass)
+
+    first = hass.async_create_task(
+        hass.services.async_call(
+            DOMAIN, SERVICE_PROFILE, {"duration": 1}, blocking=True
+        )
+    )
+    await asyncio.sleep(0.1)
+
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_PROFILE, {"duration": 1}, blocking=True
+        )
+
+    await first
+    (path,) = glob.glob(hass.config.path("loex_xsmart_profile_*.txt"))
+    with open(path, encoding="utf-8") as report:
+        assert report.readline().startswith("Loex Xsmart profile")
+
+    await async_unload_services(hass)
+    assert not hass.services.has_service(DOMAIN, SERVICE_PROFILE)
@@ -0,0 +1,106 @@
+"""Test the account-wide rate limiter."""
+import time
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant import loader
+from homeassistant.config_entries import ConfigEntryState
+
+from custom_components.loex_xsmart.const import DOMAIN
+from custom_components.loex_xsmart.loex_api import loex_api
+from custom_components.loex_xsmart.ratelimit import get_rate_limiter, loex_rate_limiter
+
+from .fake_xsmart import fake_plant, fake_session
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        """Initialize."""
+        self.now = 0.0
+
+    def __call__(self):
+        """Return the current time."""
+        return self.now
+
+
+def test_polls_keep_write_reserve():
+    """Test polls are shed before the write reserve is used."""
+    clock = FakeClock()
+    limiter = loex_rate_limiter(rate=1, capacity=5, write_reserve=2, clock=clock)
+
+    assert [limiter.acquire_poll() for _ in range(4)] == [True, True, True, False]
+    assert limiter.acquire_write(0)
+    assert limiter.acquire_write(0)
+    assert not limiter.acquire_write(0)
+
+    clock.now += 4
+    assert limiter.acquire_poll()
+    assert limiter.diagnostics()["polls_shed"] == 1
+    assert limiter.diagnostics()["writes_rejected"] == 1
+
+
+def test_budget_grows_with_plants():
+    """Test every plant of the account adds its own rate and capacity."""
+    clock = FakeClock()
+    limiter = loex_rate_limiter(rate=1, capacity=5, write_reserve=2, clock=clock)
+
+    limiter.add_plant()
+    limiter.add_plant()
+    assert limiter.capacity == 10
+    assert limiter.rate == 2
+    assert [limiter.acquire_poll() for _ in range(9)] == [True] * 8 + [False]
+
+    limiter.remove_plant()
+    clock.now += 60
+    assert limiter.diagnostics()["tokens"] == 5
+    assert limiter.diagnostics()["plants"] == 1
+
+
+async def test_plants_sharing_an_account(hass):
+    """Test many plants of an account set up and poll without being shed."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    device_ids = [f"SHARED{index}" for index in range(6)]
+    plants = {device_id: fake_plant(device_id, 2) for device_id in device_ids}
+    session = fake_session(plants, time.time)
+    entries = [
+        MockConfigEntry(
+            domain=DOMAIN,
+            data={
+                "username": "shared",
+                "password": "secret",
+                "plant": "Home",
+                "deviceId": device_id,
+            },
+        )
+        for device_id in device_ids
+    ]
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        for entry in entries:
+            entry.add_to_hass(hass)
+            assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        assert all(entry.state is ConfigEntryState.LOADED for entry in entries)
+        limiter = get_rate_limiter("shared", loex_api().host)
+        assert limiter.diagnostics()["plants"] == 6
+
+        # A few quick cycles of every plant fit in the budget of the account
+        for _ in range(4):
+            for entry in entries:
+                await hass.data[DOMAIN][entry.entry_id].async_refresh()
+        assert all(plant.inputs >= 5 for plant in plants.values())
+        assert limiter.diagnostics()["polls_shed"] == 0
+
+        for entry in entries:
+            assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        assert limiter.diagnostics()["plants"] == 0
@@ -0,0 +1,108 @@
+"""Test the staggered polling of the plants sharing a host."""
+from datetime import timedelta
+from types import SimpleNamespace
+
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.loex_xsmart.cadence import loex_cadence
+from custom_components.loex_xsmart.const import POLL_PHASE_JITTER
+from custom_components.loex_xsmart.scheduler import loex_scheduler
+
+INTERVAL = 60
+
+
+class fake_coordinator:
+    """Stand-in coordinator counting its refreshes."""
+
+    def __init__(self, username: str, host: str = "https://cloud") -> None:
+        """Initialize."""
+        self.api = SimpleNamespace(username=username, host=host)
+        self.name = username
+        self.poll_interval = timedelta(seconds=INTERVAL)
+        self.cadence = loex_cadence()
+        self.scheduler = None
+        self.refreshes = 0
+
+    async def async_refresh(self) -> None:
+        """Count a refresh."""
+        self.refreshes += 1
+
+
+def gaps(scheduler: loex_scheduler, coordinators: list) -> list[float]:
+    """Return the spacing between the phases of a group, as fractions."""
+    phases = sorted(scheduler.diagnostics(item)["phase"] for item in coordinators)
+    return [(later - earlier) % 1 for earlier, later in zip(phases, phases[1:])]
+
+
+def spread(count: int) -> tuple[float, float]:
+    """Return the bounds of the spacing of count plants, jitter included."""
+    slot = 1 / count
+    # The diagnostics round the phases
+    margin = 2 * POLL_PHASE_JITTER * slot + 0.002
+
+    return slot - margin, slot + margin
+
+
+async def test_phases_staggered(hass):
+    """Test the plants of a host are spread over the interval, and rebalanced."""
+    scheduler = loex_scheduler(hass)
+    group = [fake_coordinator("shared") for _ in range(4)]
+    alone = fake_coordinator("shared", "https://other")
+
+    removes = [scheduler.async_add(coordinator) for coordinator in group]
+    remove_alone = scheduler.async_add(alone)
+
+    low, high = spread(4)
+    assert all(low <= gap <= high for gap in gaps(scheduler, group))
+    assert scheduler.diagnostics(group[0])["group_size"] == 4
+    assert scheduler.diagnostics(alone)["group_size"] == 1
+
+    removes[1]()
+    group.pop(1)
+
+    low, high = spread(3)
+    assert all(low <= gap <= high for gap in gaps(scheduler, group))
+    assert scheduler.diagnostics(group[0])["group_size"] == 3
+
+    for remove in [*removes[:1], *removes[2:], remove_alone]:
+        remove()
+
+
+async def test_accounts_of_a_host_staggered(hass):
+    """Test the plants of two accounts on one host are spread together."""
+    scheduler = loex_scheduler(hass)
+    group = [fake_coordinator(username) for username in ("first", "second") * 2]
+    removes = [scheduler.async_add(coordinator) for coordinator in group]
+
+    low, high = spread(4)
+    assert all(low <= gap <= high for gap in gaps(scheduler, group))
+    assert scheduler.diagnostics(group[0])["group_size"] == 4
+
+    for remove in removes:
+        remove()
+
+
+async def test_polls_at_phase(hass):
+    """Test every plant is polled once per interval, at its own time."""
+    scheduler = loex_scheduler(hass)
+    group = [fake_coordinator("polled") for _ in range(3)]
+    removes = [scheduler.async_add(coordinator) for coordinator in group]
+
+    times = {scheduler.diagnostics(item)["next_poll"] for item in group}
+    assert len(times) == 3
+    assert all(time - dt_util.utcnow() <= timedelta(seconds=INTERVAL) for time in times)
+
+    async_fire_time_changed(hass, max(times) + timedelta(seconds=1))
+    await hass.async_block_till_done()
+
+    assert [item.refreshes for item in group] == [1, 1, 1]
+    # The next polls are one interval later
+    assert {scheduler.diagnostics(item)["next_poll"] for item in group} == {
+        time + timedelta(seconds=INTERVAL) for time in times
+    }
+
+    for remove in removes:
+        remove()
+    assert all(item.scheduler is None for item in group)
@@ -0,0 +1,239 @@
+"""Virtual-clock simulation of plants polled for days.
+
+The coordinators, the scheduler and loex_api run unchanged against fake
+plants with a thermal model, served in-process by fake_session. Time is
+frozen and moved from one scheduled callback to the next, so a simulated week
+takes seconds. Run a longer or denser simulation with LOEX_SIM_DAYS and
+LOEX_SIM_POLL_INTERVAL, -s prints the timeline:
+
+    LOEX_SIM_DAYS=30 LOEX_SIM_POLL_INTERVAL=10 pytest -s tests/test_simulation.py
+"""
+import gc
+import json
+import os
+import random
+import time
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant import loader
+
+from custom_components.loex_xsmart.const import (
+    CADENCE_MARGIN,
+    CONF_SYNC_INTERVAL,
+    DOMAIN,
+)
+from custom_components.loex_xsmart.ratelimit import loex_rate_limiter
+from custom_components.loex_xsmart.scheduler import async_get_scheduler
+
+from .fake_xsmart import fake_plant, fake_session
+
+# Spacing of the timeline samples
+SAMPLE_INTERVAL = 3600  # seconds
+
+# Spacing of the setpoint changes of every plant
+COMMAND_INTERVAL = 6 * 3600  # seconds
+
+# Lifetime of the cloud tokens
+TOKEN_LIFETIME = 12 * 3600  # seconds
+
+
+class virtual_clock:
+    """Frozen time shared with the executor threads.
+
+    freezegun leaves the threads on the real clock, the fake plants and the
+    rate limiters read this one instead.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.now = time.time()
+
+    def __call__(self) -> float:
+        """Return the virtual time."""
+        return self.now
+
+
+def live_objects() -> int:
+    """Return the number of objects tracked by the garbage collector."""
+    # Leaked objects are reachable, cyclic garbage of any generation is noise
+    gc.collect()
+    return len(gc.get_objects())
+
+
+async def async_simulate(
+    hass,
+    freezer,
+    days: float,
+    poll_interval: int,
+    plants: int = 2,
+    rooms: int = 2,
+    seed: int = 0,
+) -> dict:
+    """Simulate plants for a number of days and return the timeline."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    rng = random.Random(seed)
+    # The scheduler jitter draws from the global generator
+    random.seed(seed)
+
+    fakes = {
+        f"SIM{index:04}": fake_plant(f"SIM{index:04}", rooms) for index in range(plants)
+    }
+    clock = virtual_clock()
+    session = fake_session(fakes, clock, TOKEN_LIFETIME)
+    limiters = {}
+    entries = []
+    timeline = []
+    max_data_age = 0.0
+
+    start = time.time()
+    end = start + days * 86400
+    next_sample = start
+    next_command = start + COMMAND_INTERVAL
+    # perf_counter is frozen too, the CPU time of the process is not
+    cpu_start = time.process_time()
+    # The debug mode of the test loop records a stack per callback
+    debug = hass.loop.get_debug()
+    hass.loop.set_debug(False)
+
+    def get_rate_limiter(username: str, host: str) -> loex_rate_limiter:
+        if (username, host) not in limiters:
+            limiters[(username, host)] = loex_rate_limiter(clock=clock)
+        return limiters[(username, host)]
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ), patch(
+        "custom_components.loex_xsmart.loex_api.get_rate_limiter", get_rate_limiter
+    ):
+        try:
+            for device_id in fakes:
+                entry = MockConfigEntry(
+                    domain=DOMAIN,
+                    data={
+                        "username": f"sim-{device_id}",
+                        "password": "secret",
+                        "plant": "Home",
+                        "deviceId": device_id,
+                    },
+                    options={CONF_SYNC_INTERVAL: poll_interval},
+                )
+                entry.add_to_hass(hass)
+                assert await hass.config_entries.async_setup(entry.entry_id)
+                entries.append(entry)
+
+            coordinators = [hass.data[DOMAIN][entry.entry_id] for entry in entries]
+            scheduler = async_get_scheduler(hass)
+
+            while time.time() < end:
+                # Jump to the next scheduled callback
+                pending = [
+                    handle.when()
+                    for handle in hass.loop._scheduled
+                    if not handle.cancelled()
+                ]
+                if pending:
+                    freezer.tick(max(min(pending) - hass.loop.time(), 0) + 0.001)
+                else:
+                    freezer.tick(poll_interval)
+
+                # The loop clock is frozen too, the due callbacks run on their own
+                clock.now = time.time()
+                await hass.async_block_till_done()
+                for task in list(scheduler._tasks.values()):
+                    await task
+
+                now = time.time()
+
+                for coordinator in coordinators:
+                    age = coordinator.data_age()
+                    if age is not None:
+                        max_data_age = max(max_data_age, age)
+
+                if now >= next_command:
+                    next_command += COMMAND_INTERVAL
+                    for coordinator in coordinators:
+                        room_id = rng.choice(list(coordinator.rooms))
+                        await coordinator.async_set_room_target_temperature(
+                            room_id, rng.randint(-15, 15)
+                        )
+
+                if now >= next_sample:
+                    next_sample += SAMPLE_INTERVAL
+                    errors = [
+                        abs(plant.temperatures[room_id] - plant.registers[key] / 10)
+                        for plant in fakes.values()
+                        for room_id in plant.temperatures
+                        for key in [11023 + 10 * (room_id + 2 * (room_id >= 8))]
+                    ]
+                    timeline.append(
+                        {
+                            "hours": round((now - start) / 3600, 2),
+                            "requests": session.requests,
+                            "tokens": len(session.tokens),
+                            "objects": live_objects(),
+                            "max_data_age": round(
+                                max(
+                                    coordinator.data_age() or 0
+                                    for coordinator in coordinators
+                                ),
+                                1,
+                            ),
+                            "available": all(
+                                coordinator.last_update_success
+                                for coordinator in coordinators
+                            ),
+                            "temperature_error": round(sum(errors) / len(errors), 2),
+                        }
+                    )
+        finally:
+            hass.loop.set_debug(debug)
+            for entry in entries:
+                await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_block_till_done()
+
+    return {
+        "days": days,
+        "plants": plants,
+        "poll_interval": poll_interval,
+        "cpu_seconds": round(time.process_time() - cpu_start, 1),
+        "polls": sum(plant.inputs for plant in fakes.values()),
+        "writes": sum(plant.outputs for plant in fakes.values()),
+        "requests": session.requests,
+        "logins": len(session.tokens),
+        "max_data_age": round(max_data_age, 1),
+        "timeline": timeline,
+    }
+
+
+async def test_simulated_week(hass, freezer):
+    """Test a week of polling, token expiry and setpoint changes."""
+    days = float(os.environ.get("LOEX_SIM_DAYS", 7))
+    poll_interval = int(os.environ.get("LOEX_SIM_POLL_INTERVAL", 120))
+    report = await async_simulate(hass, freezer, days, poll_interval)
+
+    if os.environ.get("LOEX_SIM_DAYS"):
+        print(json.dumps(report, indent=2))
+
+    timeline = report["timeline"]
+    expected_polls = report["plants"] * days * 86400 / poll_interval
+
+    # The poll slots are used, aligned polls only shift some of them
+    assert 0.9 * expected_polls <= report["polls"] <= 1.05 * expected_polls
+    assert report["logins"] >= report["plants"] * days * 86400 / TOKEN_LIFETIME
+
+    # Aligned polls stay within the poll interval, a token expiry costs one
+    # poll, and never made the entities unavailable
+    assert report["max_data_age"] < 2 * poll_interval + CADENCE_MARGIN
+    assert all(sample["available"] for sample in timeline)
+
+    # Memory settles after the first day
+    day = timeline[min(24, len(timeline) - 1)]["objects"]
+    assert timeline[-1]["objects"] - day < 0.1 * day
+
+    # The thermal model follows the setpoints
+    assert timeline[-1]["temperature_error"] < 1
@@ -0,0 +1,156 @@
+"""Test the last good snapshot standing in for failed polls."""
+from datetime import timedelta
+import time
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_capture_events,
+)
+import requests
+
+from homeassistant import loader
+from homeassistant.const import EVENT_STATE_CHANGED, STATE_UNAVAILABLE
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.loex_xsmart.const import CONF_STALENESS_BUDGET, DOMAIN
+from custom_components.loex_xsmart.ratelimit import loex_rate_limiter
+
+from .fake_xsmart import fake_plant, fake_session
+
+
+class failing_session(fake_session):
+    """Fake cloud that can stop answering."""
+
+    failing = False
+
+    def get(self, url, headers=None, auth=None, timeout=None):
+        """Serve a GET request, unless the cloud is failing."""
+        if self.failing:
+            self.requests += 1
+            raise requests.exceptions.ConnectionError("cloud unreachable")
+
+        return super().get(url, headers, auth, timeout)
+
+
+async def test_stale_then_unavailable(hass, freezer):
+    """Test failed polls keep the state within the budget, not beyond."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    session = failing_session({"STALE": fake_plant("STALE", 2)}, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "stale",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "STALE",
+        },
+        options={CONF_STALENESS_BUDGET: 300},
+    )
+    entry.add_to_hass(hass)
+
+    # Every failed poll logs in again
+    limiter = loex_rate_limiter(capacity=100)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ), patch(
+        "custom_components.loex_xsmart.loex_api.get_rate_limiter",
+        return_value=limiter,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+
+        room_id = next(iter(coordinator.rooms))
+        entity_id = er.async_get(hass).async_get_entity_id(
+            "climate", DOMAIN, f"{DOMAIN}-{room_id}-{coordinator.api.host}"
+        )
+        state = hass.states.get(entity_id)
+        data_time = coordinator.data_time
+        assert "data_time" not in state.attributes
+
+        # Within the budget the entity keeps its state and shows the time of its
+        # data, written once
+        session.failing = True
+        freezer.tick(timedelta(seconds=120))
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        assert coordinator.stale_polls
+        stale_state = hass.states.get(entity_id)
+        assert stale_state.state == state.state
+        assert stale_state.attributes["data_time"] == data_time
+
+        freezer.tick(timedelta(seconds=60))
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        assert coordinator.stale_polls >= 2
+        assert hass.states.get(entity_id) == stale_state
+
+        # Beyond it the entity is unavailable
+        freezer.tick(timedelta(seconds=140))
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        assert hass.states.get(entity_id).state == STATE_UNAVAILABLE
+
+        # The first good poll brings it back, with the time of the new data
+        session.failing = False
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        state = hass.states.get(entity_id)
+        assert state.state != STATE_UNAVAILABLE
+        assert "data_time" not in state.attributes
+        assert coordinator.data_time > data_time
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+async def test_unchanged_poll_writes_no_state(hass):
+    """Test a poll bringing the same data writes no state."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    # A stopped clock, the thermal model does not move between polls
+    session = fake_session({"STILL": fake_plant("STILL", 2)}, lambda: 1_700_000_000)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "still",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "STILL",
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+
+        # The duty cycles are known from the second snapshot on
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        changes = async_capture_events(hass, EVENT_STATE_CHANGED)
+        polled = coordinator.data_time
+
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        assert coordinator.data_time > polled
+        assert [event.data["entity_id"] for event in changes] == []
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
@@ -0,0 +1,97 @@
+"""Test the import and setup budgets of the integration."""
+import json
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant import loader
+
+from custom_components.loex_xsmart.const import DOMAIN
+
+from .fake_xsmart import fake_plant, fake_session
+
+# Import time of the integration and its platforms, once the Home Assistant
+# modules they build on are imported, best of IMPORT_RUNS fresh interpreters
+IMPORT_BUDGET = 0.05  # seconds
+IMPORT_RUNS = 3
+
+# Setup time of an entry against an in-process cloud
+SETUP_BUDGET = 1.0  # seconds
+
+# Modules only the services and the exports use, imported on first use
+DEFERRED_MODULES = ["mmap", "pyarrow", "tracemalloc"]
+
+
+def test_import_budget():
+    """Test importing the integration stays within budget and defers its extras."""
+    code = (
+        "import json, sys, time; "
+        "import homeassistant.components.binary_sensor; "
+        "import homeassistant.components.climate, homeassistant.components.sensor; "
+        "import homeassistant.helpers.update_coordinator; "
+        f"loaded = {{name for name in {DEFERRED_MODULES!r} if name in sys.modules}}; "
+        "start = time.perf_counter(); "
+        "import custom_components.loex_xsmart.binary_sensor; "
+        "import custom_components.loex_xsmart.climate; "
+        "import custom_components.loex_xsmart.config_flow; "
+        "import custom_components.loex_xsmart.sensor; "
+        "print(json.dumps([time.perf_counter() - start, sorted("
+        f"name for name in {DEFERRED_MODULES!r} "
+        "if name in sys.modules and name not in loaded)]))"
+    )
+    timings = []
+
+    for _ in range(IMPORT_RUNS):
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            timeout=60,
+            check=False,
+        )
+
+        assert result.returncode == 0, result.stderr
+        seconds, imported = json.loads(result.stdout)
+        assert imported == []
+        timings.append(seconds)
+
+    # A busy machine slows down some of the runs, not all of them
+    assert min(timings) < IMPORT_BUDGET
+
+
+async def test_setup_budget(hass):
+    """Test an entry sets up within budget, polling the cloud once."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    plant = fake_plant("BUDGET", 4)
+    session = fake_session({"BUDGET": plant}, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "budget",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "BUDGET",
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        start = time.perf_counter()
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        seconds = time.perf_counter() - start
+
+        # The platforms reuse the first snapshot
+        assert plant.inputs == 1
+        assert seconds < SETUP_BUDGET
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
@@ -0,0 +1,127 @@
+"""Test the hourly long-term statistics of the rooms."""
+from datetime import datetime, timezone
+from functools import partial
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.components.recorder.common import (
+    async_wait_recording_done,
+)
+import pytest
+
+from homeassistant.components.recorder.statistics import (
+    get_metadata,
+    statistics_during_period,
+)
+
+from custom_components.loex_xsmart.statistics import loex_statistics
+
+ROOMS = {0: "Kitchen"}
+
+
+def snapshot(temperature: float) -> dict:
+    """Return a snapshot of the kitchen."""
+    return {
+        0: {
+            "temperature": temperature,
+            "humidity": 50,
+            "target_temperature": 21.0,
+            "output_valve": "N/A",
+        }
+    }
+
+
+def at(hour: int, minute: int) -> datetime:
+    """Return a time of the day."""
+    return datetime(2024, 1, 1, hour, minute, tzinfo=timezone.utc)
+
+
+def imported(add_statistics) -> dict:
+    """Return the imported rows, by statistic id."""
+    return {
+        call.args[1]["statistic_id"]: call.args[2]
+        for call in add_statistics.call_args_list
+    }
+
+
+async def test_open_hour_survives_reload(hass, hass_storage):
+    """Test a reload within the hour imports the whole hour once, when done."""
+    hass.config.components.add("recorder")
+
+    with patch(
+        "homeassistant.components.recorder.statistics.async_add_external_statistics"
+    ) as add_statistics:
+        statistics = loex_statistics(hass, "STATS")
+        await statistics.async_load()
+        statistics.async_add_snapshot(snapshot(20.0), ROOMS, at(10, 5))
+        statistics.async_add_snapshot(snapshot(21.0), ROOMS, at(10, 20))
+        # Unloaded, the open hour is saved, not imported
+        await statistics.async_save()
+        assert not add_statistics.called
+
+        statistics = loex_statistics(hass, "STATS")
+        await statistics.async_load()
+        statistics.async_add_snapshot(snapshot(22.0), ROOMS, at(10, 40))
+        assert not add_statistics.called
+
+        statistics.async_add_snapshot(snapshot(23.0), ROOMS, at(11, 1))
+
+    (row,) = imported(add_statistics)["loex_xsmart:stats_room_0_temperature"]
+    assert row == {"start": at(10, 0), "mean": 21.0, "min": 20.0, "max": 22.0}
+    # Text readings are left out
+    assert "loex_xsmart:stats_room_0_output_valve" not in imported(add_statistics)
+
+
+async def test_stored_hour_done_meanwhile(hass, hass_storage):
+    """Test a stored hour is imported when a later one started before the load."""
+    hass.config.components.add("recorder")
+
+    with patch(
+        "homeassistant.components.recorder.statistics.async_add_external_statistics"
+    ) as add_statistics:
+        statistics = loex_statistics(hass, "LATE")
+        await statistics.async_load()
+        statistics.async_add_snapshot(snapshot(20.0), ROOMS, at(10, 50))
+        await statistics.async_save()
+
+        statistics = loex_statistics(hass, "LATE")
+        statistics.async_add_snapshot(snapshot(19.0), ROOMS, at(11, 10))
+        await statistics.async_load()
+
+    (row,) = imported(add_statistics)["loex_xsmart:late_room_0_temperature"]
+    assert row["start"] == at(10, 0)
+    assert row["mean"] == 20.0
+
+
+async def test_rows_recorded(recorder_mock, hass, hass_storage):
+    """Test the imported hour is read back from the recorder."""
+    statistics = loex_statistics(hass, "RECORDED")
+    await statistics.async_load()
+    statistics.async_add_snapshot(snapshot(20.0), ROOMS, at(10, 5))
+    statistics.async_add_snapshot(snapshot(22.5), ROOMS, at(10, 35))
+    statistics.async_add_snapshot(snapshot(23.0), ROOMS, at(11, 1))
+    await async_wait_recording_done(hass)
+
+    temperature = "loex_xsmart:recorded_room_0_temperature"
+    humidity = "loex_xsmart:recorded_room_0_humidity"
+    rows = await recorder_mock.async_add_executor_job(
+        statistics_during_period,
+        hass,
+        at(9, 0),
+        None,
+        {temperature, humidity},
+        "hour",
+        None,
+        {"mean", "min", "max"},
+    )
+
+    (row,) = rows[temperature]
+    assert row["start"] == at(10, 0).timestamp()
+    assert row["mean"] == pytest.approx(21.25)
+    assert (row["min"], row["max"]) == (20.0, 22.5)
+    assert [row["mean"] for row in rows[humidity]] == [50]
+
+    metadata = await recorder_mock.async_add_executor_job(
+        partial(get_metadata, hass, statistic_ids={temperature})
+    )
+    assert metadata[temperature][1]["name"] == "Kitchen Temperature"
+    assert metadata[temperature][1]["unit_of_measurement"] == "°C"
@@ -0,0 +1,141 @@
+"""Test the publish filter of the entity state writes."""
+from unittest.mock import Mock, patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+import pytest
+
+from homeassistant import loader
+
+from custom_components.loex_xsmart.const import DOMAIN
+from custom_components.loex_xsmart.entity import loex_entity
+from custom_components.loex_xsmart.throttle import loex_publish_filter
+from custom_components.loex_xsmart.websocket_api import websocket_subscribe
+
+from .fake_xsmart import fake_plant, fake_session, room_index
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        """Initialize."""
+        self.now = 0.0
+
+    def __call__(self):
+        """Return the current time."""
+        return self.now
+
+
+def test_deadbands():
+    """Test channel changes are published once beyond their deadband."""
+    clock = FakeClock()
+    publish_filter = loex_publish_filter(
+        {"temperature": 0.2, "humidity": 2}, 0, 600, clock=clock
+    )
+
+    assert publish_filter.should_publish("room", {"temperature": 20.0}, "comfort")
+    clock.now += 10
+    assert not publish_filter.should_publish("room", {"temperature": 20.1}, "comfort")
+    # Drift is measured from the last published value
+    clock.now += 10
+    assert publish_filter.should_publish("room", {"temperature": 20.2}, "comfort")
+
+    assert publish_filter.should_publish("air", {"humidity": 50}, None)
+    clock.now += 10
+    assert not publish_filter.should_publish("air", {"humidity": 51}, None)
+    assert publish_filter.should_publish("air", {"humidity": 48}, None)
+    # A reading going missing is a change
+    assert publish_filter.should_publish("air", {"humidity": "N/A"}, None)
+
+    assert publish_filter.suppressed == 2
+
+
+def test_intervals_and_fingerprint():
+    """Test min and max intervals, and fingerprint changes published at once."""
+    clock = FakeClock()
+    publish_filter = loex_publish_filter({"temperature": 0.2}, 30, 600, clock=clock)
+
+    assert publish_filter.should_publish("room", {"temperature": 20.0}, "comfort")
+    clock.now += 10
+    # Beyond the deadband, but within min_interval
+    assert not publish_filter.should_publish("room", {"temperature": 21.0}, "comfort")
+    # The mode changed
+    assert publish_filter.should_publish("room", {"temperature": 21.0}, "eco")
+
+    clock.now += 600
+    assert publish_filter.should_publish("room", {"temperature": 21.0}, "eco")
+
+    publish_filter.forget("room")
+    assert publish_filter.should_publish("room", {"temperature": 21.0}, "eco")
+
+
+async def test_sub_deadband_poll_notifies_nobody(hass):
+    """Test a change within the deadband reaches no entity and no websocket feed."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    # A stopped clock, the thermal model does not move between polls
+    plant = fake_plant("QUIET", 2)
+    session = fake_session({"QUIET": plant}, lambda: 1_700_000_000)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "quiet",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "QUIET",
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        coordinator.publish_filter.min_interval = 0
+        # The duty cycles are known from the second snapshot on
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        connection = Mock(subscriptions={})
+        websocket_subscribe(
+            hass, connection, {"id": 1, "entry_id": entry.entry_id, "min_interval": 0}
+        )
+        assert connection.send_message.call_count == 1
+
+        room_id = next(iter(coordinator.rooms))
+        register = 11022 + 10 * room_index(room_id)
+
+        with patch.object(loex_entity, "async_write_ha_state", autospec=True) as write:
+            plant.registers[register] += 1
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+            # Only the entities without channels, e.g. the duty cycles
+            written = [call.args[0] for call in write.call_args_list]
+            assert written
+            assert [entity for entity in written if entity.publish_channels()] == []
+            assert connection.send_message.call_count == 1
+
+            write.reset_mock()
+            plant.registers[register] += 2
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+            written = [call.args[0] for call in write.call_args_list]
+            assert f"{DOMAIN}-{room_id}-{coordinator.api.host}" in {
+                entity.unique_id for entity in written
+            }
+            assert connection.send_message.call_count == 2
+            delta = connection.send_message.call_args.args[0]["event"]["delta"]
+            assert delta["rooms"][str(room_id)]["temperature"] == pytest.approx(
+                plant.registers[register] / 10
+            )
+
+        connection.subscriptions.pop(1)()
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
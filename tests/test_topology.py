@@ -0,0 +1,85 @@
+"""Test the rooms enabled, retired or renamed while the entry is loaded."""
+import time
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant import loader
+from homeassistant.components.climate import DOMAIN as CLIMATE_DOMAIN
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.loex_xsmart.const import DOMAIN, ROOM_VALIDITY_ACTIVE
+
+from .fake_xsmart import fake_plant, fake_session, room_index
+
+
+async def test_rooms_follow_the_plant(hass):
+    """Test the listeners get the changes and the thermostats follow them."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    plant = fake_plant("TOPOLOGY", 2)
+    session = fake_session({"TOPOLOGY": plant}, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "topology",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "TOPOLOGY",
+        },
+    )
+    entry.add_to_hass(hass)
+    registry = er.async_get(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        host = coordinator.api.host
+
+        changes = []
+        remove_listener = coordinator.async_add_topology_listener(
+            lambda *change: changes.append(change)
+        )
+
+        def thermostat(room_id: int) -> str | None:
+            return registry.async_get_entity_id(
+                CLIMATE_DOMAIN, DOMAIN, f"{DOMAIN}-{room_id}-{host}"
+            )
+
+        # A poll without changes does not call the listeners
+        await coordinator.async_refresh()
+        assert changes == []
+
+        plant.registers[11021 + 10 * room_index(2)] = ROOM_VALIDITY_ACTIVE
+        plant.registers[20201 + 7 * 2] = "Attic"
+        plant.registers[20201] = "Kitchen"
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        assert changes == [({2: "Attic"}, set(), {0: "Kitchen"})]
+        assert hass.states.get(thermostat(2)) is not None
+        assert hass.states.get(thermostat(0)).name == "Kitchen"
+
+        plant.registers[11021 + 10 * room_index(1)] = 0
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        assert changes[-1] == ({}, {1}, {})
+        assert thermostat(1) is None
+        assert set(coordinator.rooms) == {0, 2}
+
+        remove_listener()
+        plant.registers[11021 + 10 * room_index(1)] = ROOM_VALIDITY_ACTIVE
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        assert len(changes) == 2
+        assert thermostat(1) is not None
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
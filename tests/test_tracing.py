@@ -0,0 +1,121 @@
+"""Test the span tracing of the polls and commands."""
+import asyncio
+import json
+import logging
+import time
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant import loader
+
+from custom_components.loex_xsmart.const import DOMAIN
+from custom_components.loex_xsmart.tracing import loex_tracer, span
+
+from .fake_xsmart import fake_plant, fake_session
+
+
+async def test_span_tree(hass, tmp_path):
+    """Test nested spans share the trace of their root, exported once it ends."""
+    tracer = loex_tracer(hass)
+    tracer.export_path = str(tmp_path / "trace.jsonl")
+
+    with tracer.span("poll", root=True, device="TREE"):
+        with span("http", method="GET"):
+            pass
+        with span("parse"):
+            pass
+    await hass.async_block_till_done()
+
+    with open(tracer.export_path, encoding="utf-8") as export:
+        (trace,) = [json.loads(line) for line in export]
+
+    root, http, parse = trace
+    assert [root["name"], http["name"], parse["name"]] == ["poll", "http", "parse"]
+    assert {item["trace_id"] for item in trace} == {root["trace_id"]}
+    assert root["parent_id"] is None
+    assert http["parent_id"] == parse["parent_id"] == root["span_id"]
+    assert tracer.diagnostics()["open_traces"] == 0
+
+
+async def test_slow_traces_logged(hass, caplog):
+    """Test only the root spans longer than their threshold are logged."""
+    tracer = loex_tracer(hass)
+    tracer.slow_threshold = 0.05
+
+    with caplog.at_level(logging.WARNING):
+        with tracer.span("poll", root=True, device="SLOW"):
+            pass
+
+        with tracer.span("poll", root=True, device="SLOW"):
+            with span("http"):
+                await asyncio.sleep(0.06)
+
+        waiting = tracer.start_span("confirmation", root=True, slow_threshold=1e9)
+        await asyncio.sleep(0.06)
+        tracer.end_span(waiting)
+
+    assert tracer.traces == 3
+    assert tracer.slow_traces == 1
+    assert "Slow poll of SLOW" in caplog.text
+    assert "http=" in caplog.text
+
+
+async def test_command_then_confirmation(hass, tmp_path, caplog):
+    """Test a command ends with its request, its confirmation with the next poll."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    plant = fake_plant("TRACE", 2)
+    session = fake_session({"TRACE": plant}, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "trace",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "TRACE",
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        tracer = coordinator.tracer
+        tracer.export_path = str(tmp_path / "trace.jsonl")
+        tracer.slow_threshold = 0.2
+
+        with caplog.at_level(logging.WARNING):
+            await coordinator.async_set_circuit_mode(2)
+            assert tracer.diagnostics()["open_traces"] == 1
+
+            # A confirmation waiting longer than the threshold is not slow
+            await asyncio.sleep(0.25)
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+        assert tracer.diagnostics()["open_traces"] == 0
+        assert tracer.slow_traces == 0
+        assert "Slow" not in caplog.text
+
+        with open(tracer.export_path, encoding="utf-8") as export:
+            traces = [json.loads(line) for line in export]
+
+        (command,) = [trace for trace in traces if trace[0]["name"] == "command"]
+        assert [item["name"] for item in command] == ["command", "write", "http"]
+        assert command[0]["attributes"]["operation"] == "set_circuit_mode"
+
+        ((confirmation,),) = [
+            trace for trace in traces if trace[0]["name"] == "confirmation"
+        ]
+        polls = [trace[0]["trace_id"] for trace in traces if trace[0]["name"] == "poll"]
+        assert confirmation["attributes"]["command"] == command[0]["trace_id"]
+        assert confirmation["attributes"]["confirmed_by"] in polls
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
@@ -0,0 +1,223 @@
+"""Test the websocket delta feed of the plants."""
+from datetime import timedelta
+import json
+import logging
+import time
+from unittest.mock import Mock, patch
+
+from pytest_homeassistant_custom_component.common import (
+    CLIENT_ID,
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from homeassistant import loader
+from homeassistant.components import websocket_api
+from homeassistant.components.websocket_api.connection import ActiveConnection
+from homeassistant.setup import async_setup_component
+from homeassistant.util import dt as dt_util
+
+from custom_components.loex_xsmart.const import DOMAIN
+from custom_components.loex_xsmart.websocket_api import (
+    snapshot_delta,
+    websocket_subscribe,
+)
+
+from .fake_xsmart import fake_plant, fake_session
+
+
+def test_snapshot_delta():
+    """Test only the changed fields, new and removed rooms are in a delta."""
+    old = {
+        "available": True,
+        "circuit": {"temperature": 21.0, "mode": 1},
+        "external": {"ext_temp": 5.0},
+        "rooms": {
+            "0": {"room_name": "Kitchen", "temperature": 20.5, "humidity": 40},
+            "1": {"room_name": "Bedroom", "temperature": 19.0, "humidity": 45},
+        },
+    }
+    new = {
+        "available": True,
+        "circuit": {"temperature": 21.0, "mode": 2},
+        "external": {"ext_temp": 5.0},
+        "rooms": {
+            "0": {"room_name": "Kitchen", "temperature": 20.7, "humidity": 40},
+            "2": {"room_name": "Bathroom", "temperature": 22.0, "humidity": 60},
+        },
+    }
+
+    assert snapshot_delta(old, new) == {
+        "circuit": {"mode": 2},
+        "rooms": {
+            "0": {"temperature": 20.7},
+            "2": {"room_name": "Bathroom", "temperature": 22.0, "humidity": 60},
+        },
+        "removed_rooms": ["1"],
+    }
+    assert snapshot_delta(new, new) == {}
+
+
+def event(connection) -> dict:
+    """Return the event of the last message sent to a connection."""
+    return connection.send_message.call_args.args[0]["event"]
+
+
+async def test_subscribe(hass):
+    """Test a client gets the snapshot, then rate capped deltas."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    plant = fake_plant("PANEL", 3)
+    session = fake_session({"PANEL": plant}, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "panel",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "PANEL",
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+
+        connection = Mock(subscriptions={})
+        websocket_subscribe(
+            hass,
+            connection,
+            {"id": 1, "entry_id": "missing", "min_interval": 60},
+        )
+        connection.send_error.assert_called_once()
+
+        websocket_subscribe(
+            hass,
+            connection,
+            {"id": 2, "entry_id": entry.entry_id, "min_interval": 60},
+        )
+        connection.send_result.assert_called_once_with(2)
+        assert 2 in connection.subscriptions
+
+        snapshot = event(connection)["snapshot"]
+        assert snapshot["available"]
+        assert set(snapshot["rooms"]) == {str(room_id) for room_id in coordinator.rooms}
+
+        # Two changes within the interval are merged in one message
+        await coordinator.async_set_circuit_mode(2)
+        await coordinator.async_refresh()
+        room_id = next(iter(coordinator.rooms))
+        await coordinator.async_set_room_mode(room_id, 3)
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        assert connection.send_message.call_count == 1
+
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+        await hass.async_block_till_done()
+        assert connection.send_message.call_count == 2
+        delta = event(connection)["delta"]
+        assert delta["circuit"]["mode"] == 2
+        assert delta["rooms"][str(room_id)]["room_mode"] == 3
+        assert "room_name" not in delta["rooms"][str(room_id)]
+
+        connection.subscriptions.pop(2)()
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+def messages(sent: list) -> list[dict]:
+    """Return the messages sent to a connection, decoded."""
+    return [
+        json.loads(message) if isinstance(message, (str, bytes)) else message
+        for message in sent
+    ]
+
+
+async def test_subscription_ends_with_the_entry(hass, hass_admin_user):
+    """Test the websocket commands, and the subscriptions closed on reload."""
+    # Same as the enable_custom_integrations fixture
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+
+    plant = fake_plant("RELOAD", 2)
+    session = fake_session({"RELOAD": plant}, time.time)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "reload",
+            "password": "secret",
+            "plant": "Home",
+            "deviceId": "RELOAD",
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.loex_xsmart.loex_api.requests.Session",
+        return_value=session,
+    ):
+        assert await async_setup_component(hass, "websocket_api", {})
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        # The commands go through the websocket API, minus the HTTP transport
+        token = await hass.auth.async_create_refresh_token(hass_admin_user, CLIENT_ID)
+        sent = []
+        connection = ActiveConnection(
+            logging.getLogger(__name__), hass, sent.append, hass_admin_user, token
+        )
+
+        connection.async_handle(
+            {
+                "id": 1,
+                "type": f"{DOMAIN}/subscribe",
+                "entry_id": entry.entry_id,
+                "min_interval": 0.1,
+            }
+        )
+        assert messages(sent)[-1]["error"]["code"] == websocket_api.ERR_INVALID_FORMAT
+
+        connection.async_handle(
+            {"id": 2, "type": f"{DOMAIN}/subscribe", "entry_id": entry.entry_id}
+        )
+        result, snapshot = messages(sent)[-2:]
+        assert result["success"]
+        rooms = snapshot["event"]["snapshot"]["rooms"]
+        assert rooms
+        for fields in rooms.values():
+            assert fields["room_name"].startswith("Room ")
+            assert "name" not in fields
+
+        # The reload ends the subscription, the client subscribes again
+        sent.clear()
+        assert await hass.config_entries.async_reload(entry.entry_id)
+        await hass.async_block_till_done()
+        assert messages(sent) == [{"id": 2, "type": "event", "event": {"closed": True}}]
+        assert connection.subscriptions == {}
+
+        sent.clear()
+        await hass.data[DOMAIN][entry.entry_id].async_refresh()
+        await hass.async_block_till_done()
+        assert sent == []
+
+        connection.async_handle(
+            {"id": 3, "type": f"{DOMAIN}/subscribe", "entry_id": entry.entry_id}
+        )
+        connection.async_handle(
+            {"id": 4, "type": "unsubscribe_events", "subscription": 3}
+        )
+        assert messages(sent)[-1]["success"]
+        assert connection.subscriptions == {}
+
+        # Left by the client, the subscription is not closed again
+        sent.clear()
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        assert sent == []
@@ -0,0 +1,112 @@
+"""Test the deadlines of the writes."""
+import threading
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from custom_components.loex_xsmart import coordinator as coordinator_module
+from custom_components.loex_xsmart.loex_api import (
+    WriteCancelled,
+    WriteTimeout,
+    WriteUnauthorized,
+    loex_api,
+    loex_deadline,
+    write_deadline,
+)
+from custom_components.loex_xsmart.ratelimit import loex_rate_limiter
+from custom_components.loex_xsmart.tracing import loex_tracer
+
+
+def make_api(post) -> loex_api:
+    """Return an authenticated API posting with post."""
+    api = loex_api()
+    api.device_id = "DEVICE"
+    api.limiter = loex_rate_limiter()
+    api.session = Mock()
+    api.session.post.side_effect = post
+    return api
+
+
+def run_within(deadline: loex_deadline, target, *args):
+    """Run target within a write deadline."""
+    token = write_deadline.set(deadline)
+    try:
+        return target(*args)
+    finally:
+        write_deadline.reset(token)
+
+
+def test_write_timeout_bounded_by_deadline():
+    """Test the request timeout is the remaining budget, and is not retried."""
+    api = make_api(requests.exceptions.ReadTimeout())
+
+    with pytest.raises(WriteTimeout):
+        run_within(loex_deadline(2), api.set_room_mode, 0, 1)
+
+    assert api.session.post.call_count == 1
+    assert 0 < api.session.post.call_args.kwargs["timeout"] <= 2
+    # No login was attempted on the timeout
+    api.session.close.assert_not_called()
+
+
+def test_write_cancelled_is_not_sent():
+    """Test an abandoned write is dropped before it is sent."""
+    api = make_api(lambda *args, **kwargs: Mock(status_code=200))
+    deadline = loex_deadline(10)
+    deadline.cancelled.set()
+
+    with pytest.raises(WriteCancelled):
+        run_within(deadline, api.set_circuit_mode, 1)
+
+    api.session.post.assert_not_called()
+
+
+def test_write_rate_limit_wait_bounded_by_deadline():
+    """Test a write waiting for the rate limiter gives up with its deadline."""
+    api = make_api(lambda *args, **kwargs: Mock(status_code=200))
+    api.limiter = loex_rate_limiter(rate=0.001, capacity=1, write_reserve=1)
+    api.limiter.acquire_write(0)
+
+    with pytest.raises(WriteTimeout):
+        run_within(loex_deadline(0.2), api.set_circuit_mode, 1)
+
+    api.session.post.assert_not_called()
+
+
+def test_write_unauthorized():
+    """Test rejected credentials are told apart from other HTTP errors."""
+    api = make_api(lambda *args, **kwargs: Mock(status_code=401))
+
+    with pytest.raises(WriteUnauthorized):
+        api.set_circuit_mode(1)
+
+    assert api.session.post.call_args.kwargs["timeout"] == 10
+
+
+async def test_write_abandoned_by_caller(hass, monkeypatch):
+    """Test a write past its deadline fails and cancels the executor thread."""
+    release = threading.Event()
+    deadlines = []
+
+    def target():
+        deadlines.append(write_deadline.get())
+        release.wait(5)
+
+    monkeypatch.setattr(coordinator_module, "WRITE_DEADLINE", 0.2)
+    coordinator = Mock()
+    coordinator.hass = hass
+    coordinator.tracer = loex_tracer(hass)
+    coordinator.poll_interval.total_seconds.return_value = 60
+    coordinator._unconfirmed = []
+
+    with pytest.raises(WriteTimeout):
+        await coordinator_module.loex_coordinator._async_write(
+            coordinator, "test", target
+        )
+
+    release.set()
+    assert deadlines[0].cancelled.is_set()
+    assert write_deadline.get() is None
+    assert coordinator.tracer.traces == 1
+    assert not coordinator._unconfirmed